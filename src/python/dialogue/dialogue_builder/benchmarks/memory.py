@@ -0,0 +1,124 @@
+"""
+Benchmark for the memory footprint of tree nodes
+
+Builds the same synthetic trees twice, once with plain frozen dataclasses
+laid out like the original node classes and once with the slotted node
+classes from tree.py, and reports the bytes allocated per node.
+The same nodes are also loaded into a ColumnarTree for comparison.
+Every id is created as a fresh string, the way a JSON load produces them,
+so the effect of interning is included in the comparison.
+
+Usage (from src/python):
+    python -m dialogue.dialogue_builder.benchmarks.memory [nodes]
+"""
+
+import gc
+import sys
+import tracemalloc
+from dataclasses import dataclass, field
+
+from ..columnar import ColumnarTree
+from ..tree import Action, Dialogue, Scene
+from .synthetic import iter_objects
+
+@dataclass(frozen=True)
+class LegacyAction:
+    ctx: dict
+    action_id: str
+    dialogue_id: str
+    next_id: str
+
+@dataclass(frozen=True)
+class LegacyDialogue:
+    ctx: dict
+    dialogue_id: str
+    text: str
+    actions: list = field(default_factory=list)
+
+@dataclass(frozen=True)
+class LegacyScene:
+    ctx: dict
+    scene_id: str
+    dialogue_id: str
+    dialogues: list = field(default_factory=list)
+
+def _fresh(value: any) -> any:
+    """
+    Returns an equal but distinct string, as a JSON decoder would
+    """
+    return "".join(list(value)) if isinstance(value, str) else value
+
+def build_nodes(nodes: int, classes: tuple) -> list:
+    """
+    Creates the nodes of a synthetic tree using the given node classes
+
+    Args:
+        nodes: int
+            The approximate number of nodes to create
+        classes: tuple
+            The (Scene, Dialogue, Action) classes to instantiate
+    Returns:
+        list
+            The created nodes
+    """
+    scene_cls, dialogue_cls, action_cls = classes
+    built = []
+    for _, obj in iter_objects(nodes):
+        if isinstance(obj, Scene):
+            built.append(scene_cls({}, _fresh(obj.scene_id), _fresh(obj.dialogue_id)))
+        elif isinstance(obj, Dialogue):
+            built.append(dialogue_cls({}, _fresh(obj.dialogue_id), _fresh(obj.text)))
+        else:
+            built.append(action_cls(
+                {}, _fresh(obj.action_id), _fresh(obj.dialogue_id), _fresh(obj.next_id)
+            ))
+    return built
+
+def measure(nodes: int, classes: tuple) -> tuple[int, float]:
+    """
+    Measures the bytes allocated per node for the given node classes
+
+    Returns:
+        tuple[int, float]
+            The number of nodes and the bytes allocated per node
+    """
+    gc.collect()
+    tracemalloc.start()
+    built = build_nodes(nodes, classes)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return len(built), size / len(built)
+
+def measure_columnar(nodes: int) -> float:
+    """
+    Measures the bytes per node held by a ColumnarTree of the synthetic tree
+
+    The node objects are created before tracing starts, since the columnar
+    store copies their fields and does not keep them
+    """
+    objects = list(iter_objects(nodes))
+    gc.collect()
+    tracemalloc.start()
+    tree = ColumnarTree(root=False)
+    for identifier, obj in objects:
+        tree.add_object(identifier, obj)
+    tree.actions_for(None)
+    size = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return size / (len(tree.scenes) + len(tree.dialogues) + len(tree.actions))
+
+def run(nodes: int) -> None:
+    """
+    Prints the bytes per node before and after compaction
+    """
+    count, before = measure(nodes, (LegacyScene, LegacyDialogue, LegacyAction))
+    _, after = measure(nodes, (Scene, Dialogue, Action))
+    columnar = measure_columnar(nodes)
+    print(f"nodes:            {count}")
+    print(f"before (bytes):   {before:8.1f} per node")
+    print(f"after (bytes):    {after:8.1f} per node")
+    print(f"saved:            {1 - after / before:8.1%}")
+    print(f"columnar (bytes): {columnar:8.1f} per node")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else 10 ** 5)
@@ -0,0 +1,74 @@
+"""
+Benchmark for Tree.populate_tree
+
+Builds synthetic trees of 10^3 to 10^6 nodes and times both building the
+tree through add_object and serializing it with populate_tree.
+The time per node should stay flat as the tree grows.
+The previous nested scan is timed as well for the smaller sizes.
+
+Usage (from src/python):
+    python -m dialogue.dialogue_builder.benchmarks.populate [max_exponent]
+"""
+
+import sys
+import time
+
+from ..tree import Tree
+from .synthetic import iter_objects
+
+SIZES = [10 ** exponent for exponent in range(3, 7)]
+LEGACY_LIMIT = 10 ** 4
+
+def legacy_populate(tree: Tree) -> dict:
+    """
+    The nested scene x dialogue x action scan populate_tree used to perform
+    """
+    result = {}
+    for scene_id, scene in tree.scenes.items():
+        result[scene_id] = {
+            "dialogue_id": scene.dialogue_id,
+            "dialogues": {}
+        }
+        for dialogue_id, dialogue in tree.dialogues.items():
+            if dialogue.dialogue_id == scene.dialogue_id:
+                result[scene_id]["dialogues"][dialogue_id] = {
+                    "text": dialogue.text,
+                    "actions": {}
+                }
+                for action_id, action in tree.actions.items():
+                    if action.dialogue_id == dialogue_id:
+                        result[scene_id]["dialogues"][dialogue_id]["actions"][action_id] = {
+                            "next_id": action.next_id
+                        }
+    return result
+
+def run(sizes: list[int]) -> None:
+    """
+    Prints a table of build and populate timings for each size
+    """
+    print(f"{'nodes':>10} {'build s':>10} {'populate s':>11} {'us/node':>8} {'legacy s':>10}")
+    for size in sizes:
+        objects = list(iter_objects(size))
+
+        start = time.perf_counter()
+        tree = Tree(root=False)
+        for identifier, obj in objects:
+            tree.add_object(identifier, obj)
+        built = time.perf_counter() - start
+
+        start = time.perf_counter()
+        tree.populate_tree()
+        populated = time.perf_counter() - start
+
+        legacy = "-"
+        if size <= LEGACY_LIMIT:
+            start = time.perf_counter()
+            legacy_populate(tree)
+            legacy = f"{time.perf_counter() - start:10.4f}"
+
+        per_node = (built + populated) / len(objects) * 1e6
+        print(f"{len(objects):>10} {built:10.4f} {populated:11.4f} {per_node:8.3f} {legacy:>10}")
+
+if __name__ == "__main__":
+    max_exponent = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    run([size for size in SIZES if size <= 10 ** max_exponent])
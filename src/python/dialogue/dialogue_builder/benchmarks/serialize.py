@@ -0,0 +1,89 @@
+"""
+Benchmark for the JSON backends of serializer
+
+Times encoding and decoding with every installed backend on two files:
+10k NPCs shaped like prototypes/old_dialogue_builder/data/npc_data.json,
+and a synthetic tree of 10^6 nodes in the format read by read_tree.
+Indented output always uses the standard library, so it is timed once.
+Reading the tree is also timed end to end with read_tree, streamed and
+decoded at once.
+
+Usage (from src/python):
+    python -m dialogue.dialogue_builder.benchmarks.serialize [tree_nodes]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from typing import Callable
+
+from ..serializer import Serializer, available_backends
+from ..tree import read_tree
+from .synthetic import iter_objects
+
+NPCS = 10 ** 4
+TREE_NODES = 10 ** 6
+
+def npc_data(count: int) -> dict:
+    """
+    Builds NPC data with the layout of npc_data.json
+    """
+    moods = ("good", "neutral", "bad")
+    return {
+        f"{npc:04d}": {
+            "name": f"NPC {npc}",
+            "portrait": f"portraits/npc_{npc}.png",
+            "type": "generic",
+            "mood": npc % 7 - 3,
+            "actions": {
+                session: {mood: [f"{session} {mood} line {line}" for line in range(3)] for mood in moods}
+                for session in ("START_SESSION", "END_SESSION")
+            },
+        }
+        for npc in range(count)
+    }
+
+def tree_data(nodes: int) -> dict:
+    """
+    Builds synthetic tree data in the format read by read_tree
+    """
+    data = {"scenes": [], "dialogues": [], "actions": []}
+    for identifier, obj in iter_objects(nodes):
+        kind = type(obj).__name__.lower() + "s"
+        item = {name: getattr(obj, name) for name in obj.__slots__ if name not in ("ctx", "dialogues", "actions")}
+        data[kind].append(item)
+    return data
+
+def _time(function: Callable) -> tuple[float, any]:
+    start = time.perf_counter()
+    result = function()
+    return time.perf_counter() - start, result
+
+def run(tree_nodes: int) -> None:
+    """
+    Prints a table of encode and decode timings per backend and file
+    """
+    files = {"10k npcs": npc_data(NPCS), f"{tree_nodes} nodes": tree_data(tree_nodes)}
+    configurations = [(name, True) for name in available_backends()] + [("json", False)]
+
+    print(f"{'file':>14} {'backend':>8} {'mode':>8} {'MB':>7} {'dump s':>8} {'load s':>8}")
+    with tempfile.TemporaryDirectory() as directory:
+        for label, data in files.items():
+            filename = os.path.join(directory, "data.json")
+            for backend, compact in configurations:
+                serializer = Serializer(backend, compact)
+                dump, _ = _time(lambda: serializer.dump(data, filename))
+                load, _ = _time(lambda: serializer.load(filename))
+                size = os.path.getsize(filename) / 1e6
+                mode = "compact" if compact else "indented"
+                print(f"{label:>14} {backend:>8} {mode:>8} {size:7.1f} {dump:8.3f} {load:8.3f}")
+
+        filename = os.path.join(directory, "tree.json")
+        Serializer(compact=True).dump(files[f"{tree_nodes} nodes"], filename)
+        streamed, _ = _time(lambda: read_tree(filename))
+        whole, _ = _time(lambda: read_tree(filename, stream=False))
+        print(f"read_tree {tree_nodes} nodes: streamed {streamed:.3f}s, decoded at once {whole:.3f}s")
+
+if __name__ == "__main__":
+    run(int(sys.argv[1]) if len(sys.argv) > 1 else TREE_NODES)
@@ -0,0 +1,56 @@
+"""
+Synthetic dialogue trees used by the benchmarks in this package
+
+Trees are made of scenes that each own a block of dialogues.
+Every dialogue branches to the next two dialogues in its block, and the
+last dialogue of a block ends the conversation (next_id of None)
+"""
+
+from ..tree import Action, Dialogue, Scene, Tree
+
+DIALOGUES_PER_SCENE = 10
+ACTIONS_PER_DIALOGUE = 2
+
+def iter_objects(nodes: int):
+    """
+    Yields the objects of a synthetic tree with roughly the given node count
+
+    Args:
+        nodes: int
+            The total number of scenes, dialogues and actions to generate
+    Returns:
+        Generator of tuples of the form (identifier, object)
+    """
+    per_dialogue = 1 + ACTIONS_PER_DIALOGUE + 1 / DIALOGUES_PER_SCENE
+    dialogue_count = max(DIALOGUES_PER_SCENE, int(nodes / per_dialogue))
+    scene_count = dialogue_count // DIALOGUES_PER_SCENE
+
+    for scene in range(scene_count):
+        first = scene * DIALOGUES_PER_SCENE
+        yield f"s{scene}", Scene({}, f"s{scene}", f"d{first}")
+
+        last = first + DIALOGUES_PER_SCENE - 1
+        for index in range(first, last + 1):
+            dialogue_id = f"d{index}"
+            yield dialogue_id, Dialogue({}, dialogue_id, f"Line {index}")
+            for branch in range(1, ACTIONS_PER_DIALOGUE + 1):
+                target = index + branch
+                next_id = f"d{target}" if target <= last else None
+                action_id = f"a{index}_{branch}"
+                yield action_id, Action({}, action_id, dialogue_id, next_id)
+
+def build_tree(nodes: int) -> Tree:
+    """
+    Builds a synthetic Tree with roughly the given node count
+
+    Args:
+        nodes: int
+            The total number of scenes, dialogues and actions to generate
+    Returns:
+        Tree
+            The populated tree, without the default root scene
+    """
+    tree = Tree(root=False)
+    for identifier, obj in iter_objects(nodes):
+        tree.add_object(identifier, obj)
+    return tree
@@ -0,0 +1,64 @@
+"""
+Benchmark for validate_tree
+
+Builds synthetic trees up to 10^6 nodes and times a full validation pass
+with every check enabled, then the first incremental pass, which also
+builds the graph kept for later runs. The time per node of both should
+stay nearly flat: what growth remains comes from dict lookups once the
+indexes outgrow the CPU caches, not from the algorithm. It then times
+incremental passes after two edits, which should not grow with the tree:
+adding a dialogue with an action, and replacing an existing dialogue
+(a remove then an add, like a script update statement).
+
+Usage (from src/python):
+    python -m dialogue.dialogue_builder.benchmarks.validate [max_exponent]
+"""
+
+import sys
+import time
+
+from ..tree import Action, Dialogue, validate_tree
+from .synthetic import build_tree
+
+SIZES = [10 ** exponent for exponent in range(3, 7)]
+
+def run(sizes: list[int]) -> None:
+    """
+    Prints a table of validation timings for each size
+    """
+    print(
+        f"{'nodes':>10} {'validate s':>11} {'us/node':>8} {'issues':>7}"
+        f" {'incr. s':>8} {'us/node':>8} {'add ms':>8} {'replace ms':>10}"
+    )
+    for size in sizes:
+        tree = build_tree(size)
+        nodes = len(tree.scenes) + len(tree.dialogues) + len(tree.actions)
+
+        start = time.perf_counter()
+        issues = validate_tree(tree)
+        elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        validate_tree(tree, incremental=True)
+        first = time.perf_counter() - start
+
+        tree.add_object("edit", Dialogue({}, "edit", "A new line"))
+        tree.add_object("edit_reply", Action({}, "edit_reply", "edit", "d0"))
+        start = time.perf_counter()
+        validate_tree(tree, incremental=True)
+        add = time.perf_counter() - start
+
+        tree.remove_object("d5", Dialogue)
+        tree.add_object("d5", Dialogue({}, "d5", "An edited line"))
+        start = time.perf_counter()
+        validate_tree(tree, incremental=True)
+        replace = time.perf_counter() - start
+
+        print(
+            f"{nodes:>10} {elapsed:11.4f} {elapsed / nodes * 1e6:8.3f} {len(issues):>7}"
+            f" {first:8.4f} {first / nodes * 1e6:8.3f} {add * 1e3:8.3f} {replace * 1e3:10.3f}"
+        )
+
+if __name__ == "__main__":
+    max_exponent = int(sys.argv[1]) if len(sys.argv) > 1 else 6
+    run([size for size in SIZES if size <= 10 ** max_exponent])
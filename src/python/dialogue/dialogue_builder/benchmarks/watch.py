@@ -0,0 +1,77 @@
+"""
+Benchmark for Watcher.rebuild
+
+Writes a project of many script files, each holding many scenes, builds a
+Watcher over it, then edits one file at a time and times the rebuild.
+Every file leads into the next through one action, so each edit also
+revalidates a scene of the previous file. The rebuild should stay well
+under 100 ms and not grow with the number of files.
+
+Usage (from src/python):
+    python -m dialogue.dialogue_builder.benchmarks.watch [files] [scenes_per_file]
+"""
+
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from ..watch import Watcher
+
+FILES = 200
+SCENES_PER_FILE = 500
+EDITS = 20
+
+def write_script(path: str, file: int, files: int, scenes: int, version: int=0) -> None:
+    """
+    Writes one script: scenes of two dialogues, the last leading into the next file
+    """
+    lines = []
+    for scene in range(scenes):
+        base = f"f{file}_{scene}"
+        lines.append(f"create scene s{base} d{base}")
+        lines.append(f'create dialogue d{base} "Hello {version}"')
+        lines.append(f'create dialogue e{base} "Goodbye"')
+        lines.append(f"create action a{base} d{base} e{base}")
+        if scene == scenes - 1 and file + 1 < files:
+            lines.append(f"create action b{base} e{base} df{file + 1}_0")
+        else:
+            lines.append(f"create action b{base} e{base} end")
+    with open(path, "w") as f:
+        f.write("\n".join(lines) + "\n")
+
+def run(files: int, scenes: int) -> None:
+    """
+    Prints the time of the first build and of rebuilds after single file edits
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        paths = [os.path.join(directory, f"script_{file:04}.txt") for file in range(files)]
+        for file, path in enumerate(paths):
+            write_script(path, file, files, scenes)
+
+        start = time.perf_counter()
+        watcher = Watcher(directory, use_inotify=False)
+        build = time.perf_counter() - start
+        nodes = len(watcher.tree.scenes) + len(watcher.tree.dialogues) + len(watcher.tree.actions)
+
+        latencies = []
+        for edit in range(EDITS):
+            file = (edit * 37) % files
+            write_script(paths[file], file, files, scenes, edit + 1)
+            issues = watcher.rebuild(paths[file])
+            assert issues == [], issues
+            latencies.append(watcher.latency)
+        watcher.close()
+
+    print(f"{'files':>6} {'scenes':>8} {'nodes':>9} {'build s':>8} {'median ms':>10} {'max ms':>8}")
+    print(
+        f"{files:>6} {files * scenes:>8} {nodes:>9} {build:8.2f}"
+        f" {statistics.median(latencies) * 1e3:10.1f} {max(latencies) * 1e3:8.1f}"
+    )
+
+if __name__ == "__main__":
+    run(
+        int(sys.argv[1]) if len(sys.argv) > 1 else FILES,
+        int(sys.argv[2]) if len(sys.argv) > 2 else SCENES_PER_FILE,
+    )
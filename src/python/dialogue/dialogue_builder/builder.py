@@ -3,15 +3,73 @@ Build a dialogue tree using a script written by the user
 
 This file contains functions that assist in tokenizing, parsing, and
 adding semantics to user scripts to aid in the creation of dialogue trees.
-An example user script can be found at dialogue_builder/resource/example_script.txt
+An example user script can be found at dialogue/resource/example_script.txt
+
+Script syntax:
+Each statement starts with a command and a node type, followed by its arguments.
+Statements may span lines or share one, and # starts a comment.
+
+    create tree "name"
+    create scene <scene_id> <dialogue_id>
+    create dialogue <dialogue_id> "text"
+    create action <action_id> <dialogue_id> <next_id | end> ["reply text"]
+    update scene | dialogue | action ...    (same arguments as create)
+    delete scene | dialogue | action <id>
+
+Identifiers are words (letters, digits, _, - and .) or whole numbers, and
+text is double quoted with JSON escapes. An action leading to `end` finishes
+the conversation, and its reply text is stored in the action's ctx as "text".
+
+Example:
+    create tree "example"
+    create scene intro greet
+    create dialogue greet "Hello, traveller!"
+    create action greet_bye greet end "Goodbye"
+
+Scripts are compiled as a pipeline of generators, file lines -> tokens ->
+statements -> objects, so a script is processed in constant memory and
+its first objects are available before the rest of the file is read.
+
+By default the first error raises a SyntaxError. Given an errors list, the
+parser instead records a Diagnostic, skips to the next command and carries
+on, so a single run reports every error. From the command line:
+
+    python -m dialogue.dialogue_builder.builder --json scripts/*.txt
+
+Example Usage:
+    tree = parse("dialogue/resource/example_script.txt")
+
+    for statement, obj in iter_script("npc_alice.txt"):
+        print(statement.command, statement.node_type, obj)
+
+    # Many files at once, across worker processes
+    tree = build_all(["npc_alice.txt", "npc_bob.txt"], workers=4)
+
+    for diagnostic in check_scripts(["npc_alice.txt", "npc_bob.txt"]):
+        print(diagnostic.file, diagnostic.line, diagnostic.column, diagnostic.message)
+
+    # Only recompile scripts that changed since the last build
+    tree = build_all(paths, cache=BuildCache(".dialogue_cache"))
 """
 
-import os
+import argparse
+import hashlib
+import json
+import re
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import asdict, dataclass
+from typing import Iterable, Iterator, NamedTuple
+
+from .tree import Action, Dialogue, Scene, Tree
+
+# Bump whenever the grammar or the fragment layout changes, so cached
+# fragments from an older compiler are never reused
+COMPILER_VERSION = "1"
 
 _token_types = [
     "command",
     "node_type",
-    "name",
     "identifier",
     "number",
     "text"
@@ -21,49 +79,714 @@ _tokens_valid = [
     "update",
     "delete",
 ]
+_node_types = [
+    "tree",
+    "scene",
+    "dialogue",
+    "action",
+]
+
+# Arguments of each statement, after the command and node type
+#   id: identifier or number
+#   target: id, or the word end for None
+#   text: quoted text
+#   text?: optional quoted text
+_grammar = {
+    ("create", "tree"): ("text",),
+    ("create", "scene"): ("id", "id"),
+    ("create", "dialogue"): ("id", "text"),
+    ("create", "action"): ("id", "id", "target", "text?"),
+    ("update", "scene"): ("id", "id"),
+    ("update", "dialogue"): ("id", "text"),
+    ("update", "action"): ("id", "id", "target", "text?"),
+    ("delete", "scene"): ("id",),
+    ("delete", "dialogue"): ("id",),
+    ("delete", "action"): ("id",),
+}
+_classes = {"scene": Scene, "dialogue": Dialogue, "action": Action}
+
+# Leading blanks are skipped as part of each token, so one match is one token
+_token_regex = re.compile(r"""[ \t\r\f]*(?:
+    (?P<comment>\#.*)
+  | (?P<text>"(?:[^"\\]|\\.)*")
+  | (?P<number>-?\d+(?![\w.\-]))
+  | (?P<word>\w[\w.\-]*)
+  | (?P<error>\S)
+)""", re.VERBOSE)
+_keywords = dict.fromkeys(_tokens_valid, "command") | dict.fromkeys(_node_types, "node_type")
+
+class Token(NamedTuple):
+    """
+    A token of a user script
+
+    Data:
+        type: str
+            One of _token_types
+        value: any
+            The keyword, identifier, integer or unquoted text
+        line: int
+            The line the token starts on, from 1
+        column: int
+            The column the token starts at, from 1
+    """
+    type: str
+    value: any
+    line: int
+    column: int
 
-def parse(filename: str) -> list[str]:
+@dataclass(frozen=True, slots=True)
+class Diagnostic:
     """
-    Breaks up a user script into individual tokens
-    
+    An error found in a user script
+
+    Data:
+        file: str
+            The script the error is in
+        line: int
+            The line of the error, from 1
+        column: int
+            The column of the error, from 1
+        message: str
+            A description of the error
+    """
+    file: str
+    line: int
+    column: int
+    message: str
+
+    @classmethod
+    def from_error(cls, error: SyntaxError) -> "Diagnostic":
+        return cls(error.filename, error.lineno, error.offset, error.msg)
+
+class Statement(NamedTuple):
+    """
+    A statement of a user script
+
+    Data:
+        command: str
+            create, update or delete
+        node_type: str
+            tree, scene, dialogue or action
+        args: list
+            The argument values, see _grammar
+        line: int
+            The line the statement starts on
+        column: int
+            The column the statement starts at
+    """
+    command: str
+    node_type: str
+    args: list
+    line: int
+    column: int
+
+def tokenize(script: str | Iterable[str], filename: str="<script>",
+             errors: list=None) -> Iterator[Token]:
+    """
+    Splits a user script into tokens, one at a time
+
+    Lines are only read as tokens are requested, so an open file is
+    tokenized without holding more than its current line
+
+    Args:
+        script (str | Iterable[str])
+            The text of a user script, or its lines such as an open file
+        filename (str)
+            The name reported in errors
+        errors (list)
+            If given, errors are appended to it as Diagnostics instead of
+            raised: unknown characters are skipped, and text with a bad
+            escape is kept as written
+    Returns:
+        Generator of Tokens
+    Raises:
+        SyntaxError: if the script contains a character that starts no token
+    """
+    if isinstance(script, str):
+        script = script.split("\n")
+    for line, text in enumerate(script, 1):
+        for match in _token_regex.finditer(text):
+            kind = match.lastgroup
+            if kind == "comment":
+                continue
+            value = match.group(kind)
+            column = match.start(kind) + 1
+            if kind == "word":
+                kind = _keywords.get(value, "identifier")
+            elif kind == "number":
+                value = int(value)
+            elif kind == "text":
+                if "\\" not in value:
+                    value = value[1:-1]
+                else:
+                    try:
+                        value = json.loads(value)
+                    except json.JSONDecodeError:
+                        error = SyntaxError(
+                            f"Invalid escape in text {value}", (filename, line, column, None)
+                        )
+                        if errors is None:
+                            raise error from None
+                        errors.append(Diagnostic.from_error(error))
+                        value = value[1:-1]
+            else:
+                error = SyntaxError(
+                    f"Unexpected character {value!r}", (filename, line, column, None)
+                )
+                if errors is None:
+                    raise error
+                errors.append(Diagnostic.from_error(error))
+                continue
+            yield Token(kind, value, line, column)
+
+class _Parser:
+    """
+    Reads statements from a token stream with one token of lookahead
+    """
+    def __init__(self, tokens: Iterator[Token], filename: str) -> None:
+        self.tokens = iter(tokens)
+        self.filename = filename
+        self.current = next(self.tokens, None)
+        self.last = None
+
+    def error(self, message: str, token: Token=None) -> SyntaxError:
+        token = token or self.current or self.last
+        return _error(message, self.filename, token)
+
+    def advance(self) -> Token:
+        token = self.current
+        if token is None:
+            raise self.error("Unexpected end of script")
+        self.last = token
+        self.current = next(self.tokens, None)
+        return token
+
+    def expect(self, kind: str, description: str) -> Token:
+        if self.current is None or self.current.type != kind:
+            found = repr(self.current.value) if self.current else "end of script"
+            raise self.error(f"Expected {description} but found {found}")
+        return self.advance()
+
+    def argument(self, kind: str) -> any:
+        if kind == "text?":
+            if self.current is not None and self.current.type == "text":
+                return self.advance().value
+            return None
+        if kind == "text":
+            return self.expect("text", "quoted text").value
+        if self.current is None or self.current.type not in ("identifier", "number"):
+            found = repr(self.current.value) if self.current else "end of script"
+            raise self.error(f"Expected an identifier but found {found}")
+        value = self.advance().value
+        if kind == "target" and value == "end":
+            return None
+        return value
+
+    def statement(self) -> Statement:
+        """
+        Reads one statement
+        """
+        start = self.expect("command", "a command (create, update or delete)")
+        node_type = self.expect("node_type", "a node type").value
+        args = _grammar.get((start.value, node_type))
+        if args is None:
+            raise self.error(f"Cannot {start.value} a {node_type}", start)
+        values = [self.argument(kind) for kind in args]
+        return Statement(start.value, node_type, values, start.line, start.column)
+
+    def synchronize(self) -> None:
+        """
+        Skips to the next command, where the next statement can start
+        """
+        while self.current is not None and self.current.type != "command":
+            self.current = next(self.tokens, None)
+
+def _error(message: str, filename: str, where: Token | Statement=None) -> SyntaxError:
+    location = (where.line, where.column) if where else (1, 1)
+    return SyntaxError(message, (filename, *location, None))
+
+def _build(node_type: str, values: list) -> any:
+    """
+    Creates the object a create or update statement describes
+    """
+    if node_type == "scene":
+        scene_id, dialogue_id = values
+        return Scene({}, scene_id, dialogue_id)
+    if node_type == "dialogue":
+        dialogue_id, text = values
+        return Dialogue({}, dialogue_id, text)
+    action_id, dialogue_id, next_id, text = values
+    ctx = {"text": text} if text is not None else {}
+    return Action(ctx, action_id, dialogue_id, next_id)
+
+def parse(filename: str) -> Tree:
+    """
+    Builds a dialogue tree from a user script
+
+    The file is read line by line while the tree is built, so memory use
+    does not grow with the size of the script beyond the tree itself
+
     Args:
         filename (str)
             The name of the user script to be parsed
     Returns:
-        List of parsed tokens
+        The Tree described by the script
+    Raises:
+        SyntaxError: if the script is malformed
     """
     with open(filename, 'r') as f:
-        script = f.read()
-    return script.split()
+        return interpret(tokenize(f, filename), filename=filename)
 
-def tokenize(tokens: list[str]) -> list[tuple[str, str]]:
+def iter_script(filename: str) -> Iterator[tuple[Statement, any]]:
     """
-    Assigns tokens to each part of script
-    These tokens are then used to create a tree
+    Compiles a user script into objects, yielding each one as soon as the
+    line that completes it has been read
 
     Args:
-        tokens (list[str])
-            A list of user script tokens
+        filename (str)
+            The name of the user script to be compiled
     Returns:
-        A list of tuples of the form (token, part of script)
+        Generator of (Statement, object) pairs, see iter_objects
     Raises:
         SyntaxError: if the script is malformed
     """
-    # TODO: decide script syntax
-    for token in tokens:
-        if token not in _tokens_valid:
+    with open(filename, 'r') as f:
+        yield from iter_objects(iter_statements(tokenize(f, filename), filename))
+
+def iter_statements(tokens: Iterable[Token], filename: str="<script>",
+                    errors: list=None, max_errors: int=None) -> Iterator[Statement]:
+    """
+    Groups tokens into statements, one at a time
+
+    Args:
+        tokens (Iterable[Token])
+            The tokens of a user script
+        filename (str)
+            The name reported in errors
+        errors (list)
+            If given, malformed statements are appended to it as Diagnostics
+            and skipped, resuming at the next command, instead of raised
+        max_errors (int)
+            Stop once errors holds this many Diagnostics, if given
+    Returns:
+        Generator of Statements
+    Raises:
+        SyntaxError: if the tokens do not form valid statements
+    """
+    parser = _Parser(tokens, filename)
+    while parser.current is not None:
+        try:
+            statement = parser.statement()
+        except SyntaxError as e:
+            if errors is None:
+                raise
+            errors.append(Diagnostic.from_error(e))
+            if max_errors is not None and len(errors) >= max_errors:
+                return
+            parser.synchronize()
             continue
+        yield statement
+
+def iter_objects(statements: Iterable[Statement]) -> Iterator[tuple[Statement, any]]:
+    """
+    Creates the object each statement describes
+
+    Args:
+        statements (Iterable[Statement])
+            The statements of a user script
+    Returns:
+        Generator of (Statement, object) pairs. The object is the Scene,
+        Dialogue or Action to create or update, or None for delete and
+        tree statements
+    """
+    for statement in statements:
+        if statement.command == "delete" or statement.node_type == "tree":
+            yield statement, None
         else:
+            yield statement, _build(statement.node_type, statement.args)
+
+def apply_object(tree: Tree, statement: Statement, obj: any, filename: str="<script>") -> None:
+    """
+    Applies a compiled statement to a tree
+
+    Args:
+        tree (Tree)
+            The tree to modify
+        statement (Statement)
+            The statement
+        obj (any)
+            The object built for the statement by iter_objects
+        filename (str)
+            The name reported in errors
+    Raises:
+        SyntaxError: if the statement conflicts with the tree (creating an
+            existing object, updating or deleting a missing one, renaming the tree)
+    """
+    command, node_type, args = statement.command, statement.node_type, statement.args
+    if node_type == "tree":
+        if tree.name is not None and tree.name != args[0]:
+            raise _error(
+                f"Tree is already named {tree.name!r}, cannot rename it to {args[0]!r}",
+                filename, statement
+            )
+        tree.name = args[0]
+        return
+
+    identifier = args[0]
+    try:
+        if command != "create":
+            tree.remove_object(identifier, _classes[node_type])
+        if obj is not None:
+            tree.add_object(identifier, obj)
+    except KeyError:
+        raise _error(
+            f"Cannot {command} {node_type} {identifier}, it does not exist", filename, statement
+        ) from None
+    except ValueError as e:
+        raise _error(str(e), filename, statement) from None
+
+def interpret(tokens: Iterable[Token], tree: Tree=None, filename: str="<script>",
+              errors: list=None, max_errors: int=None) -> Tree:
+    """
+    Interprets the tokens, applying each statement to a tree as it is read
+
+    Args:
+        tokens (Iterable[Token])
+            The tokens of a user script
+        tree (Tree)
+            The tree to modify, a new empty one if not given
+        filename (str)
+            The name reported in errors
+        errors (list)
+            If given, every error is appended to it as a Diagnostic and the
+            bad statement skipped, instead of raising on the first one.
+            Pass the same list to tokenize to also collect its errors
+        max_errors (int)
+            Stop once errors holds this many Diagnostics, if given
+    Returns:
+        The modified Tree
+    Raises:
+        SyntaxError: if the script is malformed, or a statement conflicts
+            with the tree (creating an existing object, updating or
+            deleting a missing one)
+    """
+    if tree is None:
+        tree = Tree(root=False)
+    statements = iter_statements(tokens, filename, errors, max_errors)
+    for statement, obj in iter_objects(statements):
+        if errors is None:
+            apply_object(tree, statement, obj, filename)
+            continue
+        try:
+            apply_object(tree, statement, obj, filename)
+        except SyntaxError as e:
+            errors.append(Diagnostic.from_error(e))
+        if max_errors is not None and len(errors) >= max_errors:
+            break
+    if errors is not None and max_errors is not None:
+        del errors[max_errors:]
+    return tree
+
+def check_scripts(paths: Iterable[str], max_errors: int=100) -> list[Diagnostic]:
+    """
+    Finds every error in some user scripts in one pass, without stopping
+    at the first
+
+    The scripts are checked the way build_all builds them: each one is
+    interpreted on its own, so a script cannot update or delete what
+    another one defines, then identifiers defined in more than one script
+    and conflicting tree names are reported as merging would reject them
+
+    Args:
+        paths (Iterable[str])
+            The user scripts to check
+        max_errors (int)
+            Stop after this many errors, None for no limit
+    Returns:
+        list[Diagnostic]
+            The errors found, in file order then line order
+    """
+    errors = []
+    owners = {}
+    named = None
+    for path in paths:
+        start = len(errors)
+        tree = Tree(root=False)
+        # (kind, identifier) -> the statement that last created or updated it
+        defined = {}
+        naming = None
+        with open(path, 'r') as f:
+            statements = iter_statements(tokenize(f, path, errors), path, errors, max_errors)
+            for statement, obj in iter_objects(statements):
+                try:
+                    apply_object(tree, statement, obj, path)
+                except SyntaxError as e:
+                    errors.append(Diagnostic.from_error(e))
+                else:
+                    if statement.node_type == "tree":
+                        naming = naming or statement
+                    elif obj is not None:
+                        defined[(statement.node_type, statement.args[0])] = statement
+                if max_errors is not None and len(errors) >= max_errors:
+                    break
+
+        # Conflicts with the scripts before, as merge_fragments finds them
+        index = {"scene": tree.scenes, "dialogue": tree.dialogues, "action": tree.actions}
+        for (kind, identifier), statement in defined.items():
+            if identifier not in index[kind]:
+                continue
+            owner = owners.setdefault((kind, identifier), path)
+            if owner != path:
+                errors.append(Diagnostic(
+                    path, statement.line, statement.column,
+                    _conflict(kind, identifier, owner, path)
+                ))
+        if tree.name is not None:
+            if named is None:
+                named = tree.name
+            elif named != tree.name:
+                errors.append(Diagnostic(
+                    path, naming.line, naming.column, _renamed(path, tree.name, named)
+                ))
+        errors[start:] = sorted(errors[start:], key=lambda d: (d.line, d.column))
+        if max_errors is not None and len(errors) >= max_errors:
             break
-            # normalize
-            # add to return list
-    # tokenize based on list
-    # return errors
-            
-        
+    if max_errors is not None:
+        del errors[max_errors:]
+    return errors
+
+def format_diagnostics(diagnostics: list[Diagnostic], fmt: str="text") -> str:
+    """
+    Formats diagnostics for people or for tools
+
+    Args:
+        diagnostics (list[Diagnostic])
+            The errors to format
+        fmt (str)
+            "text" for one file:line:column: message per line, or "json"
+            for a JSON array of objects with file, line, column and message
+    Returns:
+        The formatted diagnostics
+    Raises:
+        ValueError: if the format is not known
+    """
+    if fmt == "json":
+        return json.dumps([asdict(diagnostic) for diagnostic in diagnostics])
+    if fmt == "text":
+        return "\n".join(
+            f"{d.file}:{d.line}:{d.column}: {d.message}" for d in diagnostics
+        )
+    raise ValueError(f"Unknown diagnostics format {fmt!r}, expected text or json")
+
+def _fragment(tree: Tree) -> tuple:
+    """
+    Packs the objects of a tree into plain tuples, which pickle far smaller
+    and faster than the objects themselves. An empty ctx is stored as None
+
+    Returns:
+        (name, scenes, dialogues, actions) where the rows are
+            scenes: (scene_id, dialogue_id, ctx)
+            dialogues: (dialogue_id, text, ctx)
+            actions: (action_id, dialogue_id, next_id, ctx)
+    """
+    return (
+        tree.name,
+        tuple((s.scene_id, s.dialogue_id, dict(s.ctx) or None) for s in tree.scenes.values()),
+        tuple((d.dialogue_id, d.text, dict(d.ctx) or None) for d in tree.dialogues.values()),
+        tuple(
+            (a.action_id, a.dialogue_id, a.next_id, dict(a.ctx) or None)
+            for a in tree.actions.values()
+        ),
+    )
+
+def _digest() -> "hashlib._Hash":
+    """
+    Starts a content hash, seeded with the compiler version
+    """
+    return hashlib.sha256(f"dialogue_builder {COMPILER_VERSION}\n".encode())
+
+def script_key(filename: str) -> str:
+    """
+    Hashes a user script with the compiler version, for use as a cache key
+
+    Args:
+        filename (str)
+            The name of the user script
+    Returns:
+        The hex digest
+    """
+    digest = _digest()
+    with open(filename, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def compile_hashed(filename: str) -> tuple[str, tuple]:
+    """
+    Compiles a user script into a fragment, hashing the lines as they are parsed
+
+    The key is computed from the content that was actually compiled, so the
+    file changing between hashing and parsing cannot store a stale entry
+
+    Args:
+        filename (str)
+            The name of the user script
+    Returns:
+        The key of the script (see script_key) and its fragment (see _fragment)
+    Raises:
+        SyntaxError: if the script is malformed
+    """
+    digest = _digest()
+    with open(filename, 'rb') as f:
+        def lines() -> Iterator[str]:
+            for line in f:
+                digest.update(line)
+                yield line.decode("utf-8")
+        tree = interpret(tokenize(lines(), filename), filename=filename)
+    return digest.hexdigest(), _fragment(tree)
+
+def compile_fragment(filename: str, cache: any=None) -> tuple:
+    """
+    Compiles a user script into a compact picklable fragment
+
+    Args:
+        filename (str)
+            The name of the user script
+        cache (BuildCache)
+            A cache to load the fragment from when the script is unchanged,
+            and to store it in otherwise
+    Returns:
+        The fragment, see _fragment
+    Raises:
+        SyntaxError: if the script is malformed
+    """
+    if cache is None:
+        return _fragment(parse(filename))
+    fragment = cache.get(script_key(filename))
+    if fragment is None:
+        key, fragment = compile_hashed(filename)
+        cache.put(key, fragment)
+    return fragment
+
+def _conflict(kind: str, identifier: any, owner: str, filename: str) -> str:
+    return f"{kind.capitalize()} {identifier} is defined in both {owner} and {filename}"
+
+def _renamed(filename: str, name: str, current: str) -> str:
+    return f"{filename} names the tree {name!r} but it is already named {current!r}"
 
-def interpret(tokens: list[tuple[str, str]]) -> list[str]:
+def merge_fragments(fragments: Iterable[tuple[str, tuple]], tree: Tree=None,
+                    owners: dict=None) -> Tree:
     """
-    Interprets the tokens and returns the result
+    Merges compiled fragments into one tree
+
+    Args:
+        fragments (Iterable[tuple[str, tuple]])
+            (filename, fragment) pairs, merged in order
+        tree (Tree)
+            The tree to merge into, a new empty one if not given
+        owners (dict)
+            (kind, identifier) -> filename of every object merged so far,
+            updated in place. Pass the same dict to later merges into the
+            same tree to keep detecting conflicts
+    Returns:
+        The merged Tree
+    Raises:
+        ValueError: if two files define the same identifier, or name the tree differently
+    """
+    if tree is None:
+        tree = Tree(root=False)
+    if owners is None:
+        owners = {}
+
+    def claim(kind: str, identifier: any, filename: str) -> None:
+        owner = owners.setdefault((kind, identifier), filename)
+        if owner != filename:
+            raise ValueError(_conflict(kind, identifier, owner, filename))
+
+    for filename, (name, scenes, dialogues, actions) in fragments:
+        if name is not None:
+            if tree.name is not None and tree.name != name:
+                raise ValueError(_renamed(filename, name, tree.name))
+            tree.name = name
+        for scene_id, dialogue_id, ctx in scenes:
+            claim("scene", scene_id, filename)
+            tree.add_object(scene_id, Scene(ctx or {}, scene_id, dialogue_id))
+        for dialogue_id, text, ctx in dialogues:
+            claim("dialogue", dialogue_id, filename)
+            tree.add_object(dialogue_id, Dialogue(ctx or {}, dialogue_id, text))
+        for action_id, dialogue_id, next_id, ctx in actions:
+            claim("action", action_id, filename)
+            tree.add_object(action_id, Action(ctx or {}, action_id, dialogue_id, next_id))
+    return tree
+
+def build_all(paths: Iterable[str], workers: int=None, cache: any=None,
+              owners: dict=None, tree: Tree=None) -> Tree:
+    """
+    Builds one tree from many user scripts, compiling them in parallel
+
+    Each file is parsed and interpreted on its own in a worker process and
+    sent back as a fragment of plain tuples. Fragments are merged in the
+    order of paths, so the result does not depend on which worker finishes
+    first. With a cache, unchanged scripts are loaded from it and only the
+    others are sent to the workers
+
+    Args:
+        paths (Iterable[str])
+            The user scripts to build
+        workers (int)
+            The number of worker processes, os.cpu_count() if None.
+            With 1 worker, or a single file to compile, everything runs in this process
+        cache (BuildCache)
+            The cache of compiled fragments to use, if any
+        owners (dict)
+            Filled with the file defining each object, see merge_fragments
+        tree (Tree)
+            The tree to build into, a new empty one if not given
+    Returns:
+        The merged Tree
+    Raises:
+        SyntaxError: if a script is malformed
+        ValueError: if two files define the same identifier, or workers is less than 1
     """
+    paths = list(paths)
+    if workers is not None and workers < 1:
+        raise ValueError("workers must be at least 1")
+
+    fragments = [None] * len(paths)
+    if cache is not None:
+        for position, path in enumerate(paths):
+            fragments[position] = cache.get(script_key(path))
+    missing = [position for position, fragment in enumerate(fragments) if fragment is None]
+
+    if workers == 1 or len(missing) <= 1:
+        for position in missing:
+            key, fragments[position] = compile_hashed(paths[position])
+            if cache is not None:
+                cache.put(key, fragments[position])
+        return merge_fragments(zip(paths, fragments), tree, owners)
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        results = executor.map(compile_hashed, [paths[position] for position in missing])
+
+        def ordered() -> Iterator[tuple[str, tuple]]:
+            # Results arrive in path order, so each is merged as soon as it is ready
+            for path, fragment in zip(paths, fragments):
+                if fragment is None:
+                    key, fragment = next(results)
+                    if cache is not None:
+                        cache.put(key, fragment)
+                yield path, fragment
+
+        return merge_fragments(ordered(), tree, owners)
+
+if __name__ == "__main__":
+    arguments = argparse.ArgumentParser(description="Check dialogue scripts for errors")
+    arguments.add_argument("paths", nargs="+", help="the scripts to check")
+    arguments.add_argument("--json", action="store_true", help="print the errors as JSON")
+    arguments.add_argument("--max-errors", type=int, default=100, help="stop after this many errors")
+    options = arguments.parse_args()
 
+    found = check_scripts(options.paths, options.max_errors)
+    if found or options.json:
+        print(format_diagnostics(found, "json" if options.json else "text"))
+    sys.exit(1 if found else 0)
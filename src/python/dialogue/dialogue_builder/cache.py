@@ -0,0 +1,197 @@
+"""
+This module is used to keep compiled script fragments on disk between builds
+
+Entries are keyed by a hash of the script's content and the compiler
+version (see builder.script_key), so an entry is only ever reused for the
+exact script it was compiled from, by the same compiler. Each entry is one
+pickle file in the cache directory.
+
+The cache is bounded by the total size of its entries. Reading an entry
+refreshes its modification time, and the least recently used entries
+(oldest modification time) are deleted once the bound is exceeded.
+
+Example Usage:
+    cache = BuildCache(".dialogue_cache", max_bytes=64 << 20)
+    tree = build_all(script_paths, cache=cache)
+    print(cache.stats())
+"""
+
+import os
+import pickle
+import tempfile
+
+_SUFFIX = ".pickle"
+
+class BuildCache:
+    """
+    This class stores compiled fragments in a directory, keyed by content hash
+
+    Data:
+        directory: str
+            The directory holding the entries
+        max_bytes: int
+            The most bytes the entries may take, or None for no limit
+        hits: int
+            Lookups that found an entry
+        misses: int
+            Lookups that found none
+        evictions: int
+            Entries deleted to stay within max_bytes
+    """
+    def __init__(self, directory: str, max_bytes: int=64 << 20) -> None:
+        """
+        Opens a cache directory, creating it if needed
+
+        Raises:
+            ValueError: If max_bytes is less than one
+        """
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        os.makedirs(directory, exist_ok=True)
+        self._bytes = sum(size for _, size, _ in self._entries())
+        if max_bytes is not None and self._bytes > max_bytes:
+            self._evict()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def _entries(self) -> list[tuple[str, int, float]]:
+        """
+        Lists (path, size, modification time) of every entry
+        """
+        entries = []
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.name.endswith(_SUFFIX):
+                    try:
+                        stat = entry.stat()
+                    except FileNotFoundError:
+                        continue
+                    entries.append((entry.path, stat.st_size, stat.st_mtime))
+        return entries
+
+    def get(self, key: str) -> any:
+        """
+        Loads the fragment stored under a key
+
+        Args:
+            key: str
+                The content key of the script
+        Returns:
+            any
+                The fragment, or None if there is no usable entry
+        """
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                fragment = pickle.load(f)
+        except FileNotFoundError:
+            self.misses += 1
+            return None
+        except Exception:
+            # Unreadable, corrupted on disk or written by an incompatible
+            # version: any failure is a miss, and the entry is dropped
+            self._discard(path)
+            self.misses += 1
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        self.hits += 1
+        return fragment
+
+    def _discard(self, path: str) -> None:
+        """
+        Deletes one entry, if it still exists
+        """
+        try:
+            size = os.path.getsize(path)
+            os.unlink(path)
+        except OSError:
+            return
+        self._bytes -= size
+
+    def put(self, key: str, fragment: any) -> None:
+        """
+        Stores a fragment under a key, evicting old entries if the cache is full
+
+        Args:
+            key: str
+                The content key of the script
+            fragment: any
+                The compiled fragment, anything picklable
+        """
+        path = self._path(key)
+        try:
+            replaced = os.path.getsize(path)
+        except OSError:
+            replaced = 0
+        # Write to a temporary file and rename, so readers never see half an entry
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix=".tmp")
+        try:
+            with os.fdopen(handle, "wb") as f:
+                pickle.dump(fragment, f, protocol=pickle.HIGHEST_PROTOCOL)
+                size = f.tell()
+            os.replace(temporary, path)
+        except BaseException:
+            os.unlink(temporary)
+            raise
+        self._bytes += size - replaced
+        if self.max_bytes is not None and self._bytes > self.max_bytes:
+            self._evict(keep=path)
+
+    def _evict(self, keep: str=None) -> None:
+        """
+        Deletes the least recently used entries until the cache fits in max_bytes,
+        never deleting the entry at keep, the one just written
+        """
+        entries = self._entries()
+        self._bytes = sum(size for _, size, _ in entries)
+        entries.sort(key=lambda entry: entry[2])
+        for path, size, _ in entries:
+            if self._bytes <= self.max_bytes:
+                break
+            if path == keep:
+                continue
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            self._bytes -= size
+            self.evictions += 1
+
+    def clear(self) -> None:
+        """
+        Deletes every entry
+        """
+        for path, _, _ in self._entries():
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+        self._bytes = 0
+
+    def stats(self) -> dict[str, any]:
+        """
+        Returns the hit and miss counters and the current size of the cache
+
+        Returns:
+            dict
+                hits, misses, evictions, hit_rate, entries and bytes
+        """
+        entries = self._entries()
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries": len(entries),
+            "bytes": sum(size for _, size, _ in entries),
+        }
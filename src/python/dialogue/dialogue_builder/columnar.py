@@ -0,0 +1,481 @@
+"""
+This module is used to store a Dialogue Tree in columnar form
+
+ColumnarTree is an alternative backend to Tree for very large dialogue databases.
+It exposes the same surface as Tree (add_object, get_scene, get_dialogue,
+get_action, actions_for, populate_tree and the scenes / dialogues / actions mappings)
+but does not keep a Python object per node.
+
+Every identifier is stored once in an identifier table and every piece of
+text once in a string table, and nodes refer to both by integer code.
+Scenes, dialogues and actions are rows in parallel integer arrays, and the
+actions of each dialogue are found through a CSR-style offsets array:
+
+    actions of dialogue row r = action rows order[offsets[r]:offsets[r + 1]]
+
+Node objects are only created when they are looked up.
+If NumPy is installed, columns() returns the arrays as NumPy arrays so that
+reachability and validation passes can be vectorized.
+
+Example Usage:
+    tree = ColumnarTree(root=False)
+    tree.add_object("d1", Dialogue({}, "d1", "Hello"))
+    tree.add_object("a1", Action({}, "a1", "d1", None))
+    tree.actions_for("d1")
+"""
+
+from array import array
+from collections.abc import Mapping
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from .tree import Action, Dialogue, Scene, Tree
+
+# Code used for a missing reference, such as the next_id of a final action
+_NONE = -1
+
+def _hash(value: any) -> int:
+    """
+    Returns the hash of a value truncated to fit a 32 bit column
+    """
+    return hash(value) & 0x7FFFFFFF
+
+class _StringTable:
+    """
+    Stores each distinct identifier or text once and hands out integer codes
+
+    Strings are kept as UTF-8 in a single buffer and found through an
+    open-addressing hash index, so no Python object is kept per string.
+    Values that are not strings (such as the integer ids of the root scene)
+    are rare and kept as objects on the side
+
+    Data:
+        blob: bytearray
+            The encoded strings, one after another
+        ends: array
+            The end offset of each code's bytes in blob
+        hashes: array
+            The 31 bit hash of each code's value, used when the index grows
+        slots: array
+            The open-addressing index, hash slot -> code (or _NONE)
+        objects: dict
+            Maps codes of non-string values to the values
+    """
+    def __init__(self) -> None:
+        self.blob = bytearray()
+        self.ends = array("q")
+        self.hashes = array("i")
+        self.slots = array("i", [_NONE]) * 8
+        self.objects = {}
+
+    def __len__(self) -> int:
+        return len(self.ends)
+
+    def _find(self, value: any, encoded: bytes) -> tuple[int, int]:
+        """
+        Returns the code of a value (or _NONE) and the slot it is or would be in
+        """
+        mask = len(self.slots) - 1
+        slot = _hash(value) & mask
+        while True:
+            code = self.slots[slot]
+            if code == _NONE:
+                return _NONE, slot
+            if encoded is None:
+                if code in self.objects and self.objects[code] == value:
+                    return code, slot
+            elif code not in self.objects:
+                start = self.ends[code - 1] if code else 0
+                if self.blob[start:self.ends[code]] == encoded:
+                    return code, slot
+            slot = (slot + 1) & mask
+
+    def _grow(self) -> None:
+        """
+        Doubles the hash index and reinserts every code
+        """
+        slots = array("i", [_NONE]) * (len(self.slots) * 2)
+        mask = len(slots) - 1
+        for code, value_hash in enumerate(self.hashes):
+            slot = value_hash & mask
+            while slots[slot] != _NONE:
+                slot = (slot + 1) & mask
+            slots[slot] = code
+        self.slots = slots
+
+    def encode(self, value: any) -> int:
+        """
+        Returns the code of a value, adding it to the table if needed
+        """
+        if value is None:
+            return _NONE
+        encoded = value.encode() if type(value) is str else None
+        code, slot = self._find(value, encoded)
+        if code != _NONE:
+            return code
+
+        code = len(self.ends)
+        if encoded is None:
+            self.objects[code] = value
+        else:
+            self.blob += encoded
+        self.ends.append(len(self.blob))
+        self.hashes.append(_hash(value))
+        self.slots[slot] = code
+        if len(self.ends) * 3 > len(self.slots) * 2:
+            self._grow()
+        return code
+
+    def lookup(self, value: any) -> int:
+        """
+        Returns the code of a value, or _NONE if it is not in the table
+        """
+        if value is None:
+            return _NONE
+        encoded = value.encode() if type(value) is str else None
+        return self._find(value, encoded)[0]
+
+    def decode(self, code: int) -> any:
+        """
+        Returns the value for a code
+        """
+        if code == _NONE:
+            return None
+        if code in self.objects:
+            return self.objects[code]
+        start = self.ends[code - 1] if code else 0
+        return self.blob[start:self.ends[code]].decode()
+
+    def values(self) -> list:
+        """
+        Returns every stored value, indexed by code
+        """
+        return [self.decode(code) for code in range(len(self.ends))]
+
+class _NodeView(Mapping):
+    """
+    A read-only identifier -> object mapping over one kind of node
+
+    This lets code written against Tree.scenes, Tree.dialogues and
+    Tree.actions run unchanged against a ColumnarTree
+    """
+    def __init__(self, tree: "ColumnarTree", kind: str) -> None:
+        self._tree = tree
+        self._kind = kind
+
+    def __getitem__(self, identifier: any) -> any:
+        row = self._tree._row(self._kind, identifier)
+        if row == _NONE:
+            raise KeyError(identifier)
+        return self._tree._build(self._kind, row)
+
+    def __contains__(self, identifier: any) -> bool:
+        return self._tree._row(self._kind, identifier) != _NONE
+
+    def __iter__(self):
+        decode = self._tree._strings.decode
+        for code in self._tree._ids[self._kind]:
+            yield decode(code)
+
+    def __len__(self) -> int:
+        return len(self._tree._ids[self._kind])
+
+class ColumnarTree:
+    """
+    This class stores the information for a Tree in integer columns.
+
+    Data:
+        scenes, dialogues, actions: Mapping
+            Read-only identifier -> object views, like the dicts on Tree
+        tree: dict
+            The nested dictionary built by populate_tree
+    """
+    def __init__(self, data: dict=None, root: bool=True) -> None:
+        """
+        Initializes the ColumnarTree object
+
+        If data is present, it will be used to populate the tree
+        Otherwise a root scene is created, unless root is False
+        """
+        self.tree = {} # To be populated
+
+        self._strings = _StringTable() # identifiers
+        self._text = _StringTable()
+
+        # Identifier codes per kind, row -> code
+        self._ids = {
+            "scene": array("i"),
+            "dialogue": array("i"),
+            "action": array("i"),
+        }
+        # Row lookup per kind, identifier code -> row (or _NONE)
+        self._rows = {
+            "scene": array("i"),
+            "dialogue": array("i"),
+            "action": array("i"),
+        }
+
+        self._scene_dialogue = array("i")
+        self._dialogue_text = array("i")
+        self._action_dialogue = array("i")
+        self._action_next = array("i")
+
+        # Contexts are rare, so only non-empty ones are kept, (kind, row) -> ctx
+        self._ctx = {}
+
+        # CSR index from dialogue rows to action rows, rebuilt when stale
+        self._offsets = array("i")
+        self._order = array("i")
+        self._orphans = {}
+        self._csr_stale = False
+
+        self.scenes = _NodeView(self, "scene")
+        self.dialogues = _NodeView(self, "dialogue")
+        self.actions = _NodeView(self, "action")
+
+        self._trackers = []
+
+        if data: # Initialize tree with user data
+            for identifier, obj in self.parse_data(data):
+                self.add_object(identifier, obj)
+        elif root: # Initialize root
+            self.add_object(1, Scene({}, 1, 1))
+
+    # Parsing and change tracking do not depend on the storage, so they are shared with Tree
+    parse_data = Tree.parse_data
+    track_changes = Tree.track_changes
+    untrack_changes = Tree.untrack_changes
+    _touch = Tree._touch
+
+    def _row(self, kind: str, identifier: any) -> int:
+        """
+        Returns the row of a node, or _NONE if there is no such node
+        """
+        code = self._strings.lookup(identifier)
+        rows = self._rows[kind]
+        if code == _NONE or code >= len(rows):
+            return _NONE
+        return rows[code]
+
+    def _encode(self, value: any) -> int:
+        """
+        Encodes a value, growing the code -> row arrays along with the table
+        """
+        code = self._strings.encode(value)
+        if code != _NONE:
+            for rows in self._rows.values():
+                if len(rows) <= code:
+                    rows.extend(array("i", [_NONE]) * (code + 1 - len(rows)))
+        return code
+
+    def _build(self, kind: str, row: int) -> any:
+        """
+        Creates the node object stored at a row
+        """
+        decode = self._strings.decode
+        identifier = decode(self._ids[kind][row])
+        ctx = self._ctx.get((kind, row), {})
+        if kind == "scene":
+            return Scene(ctx, identifier, decode(self._scene_dialogue[row]))
+        if kind == "dialogue":
+            return Dialogue(ctx, identifier, self._text.decode(self._dialogue_text[row]))
+        return Action(
+            ctx, identifier,
+            decode(self._action_dialogue[row]), decode(self._action_next[row])
+        )
+
+    def add_object(self, identifier: str, obj: any) -> None:
+        """
+        Adds an object to the tree data structure
+
+        Args:
+            identifier: str
+                The identifier for the object
+            obj: any
+                The object to add to the tree
+        Returns:
+            None
+        Raises:
+            TypeError: If the object is not a valid type
+            ValueError: If an object of the same type already uses the identifier
+        """
+        if isinstance(obj, Scene):
+            kind = "scene"
+        elif isinstance(obj, Dialogue):
+            kind = "dialogue"
+        elif isinstance(obj, Action):
+            kind = "action"
+        else:
+            raise TypeError("Object is not a valid type")
+
+        code = self._encode(identifier)
+        if self._rows[kind][code] != _NONE:
+            raise ValueError(f"{type(obj).__name__} {identifier} already exists")
+
+        ids = self._ids[kind]
+        row = len(ids)
+        if kind == "scene":
+            self._scene_dialogue.append(self._encode(obj.dialogue_id))
+        elif kind == "dialogue":
+            self._dialogue_text.append(self._text.encode(obj.text))
+        else:
+            self._action_dialogue.append(self._encode(obj.dialogue_id))
+            self._action_next.append(self._encode(obj.next_id))
+        self._csr_stale = True
+
+        ids.append(code)
+        self._rows[kind][code] = row
+        if obj.ctx:
+            self._ctx[(kind, row)] = obj.ctx
+        self._touch(kind, identifier)
+
+    def _build_csr(self) -> None:
+        """
+        Rebuilds the dialogue -> actions offsets with a counting sort over action rows
+
+        Actions whose dialogue does not exist are kept aside in _orphans
+        """
+        dialogue_rows = self._rows["dialogue"]
+        counts = array("q", bytes(8 * (len(self._ids["dialogue"]) + 1)))
+        owners = array("q", bytes(8 * len(self._action_dialogue)))
+        orphans = {}
+        for action_row, code in enumerate(self._action_dialogue):
+            owner = dialogue_rows[code]
+            owners[action_row] = owner
+            if owner == _NONE:
+                orphans.setdefault(code, []).append(action_row)
+            else:
+                counts[owner + 1] += 1
+
+        for row in range(1, len(counts)):
+            counts[row] += counts[row - 1]
+        # Row numbers fit in int32, like every other column
+        offsets = array("i", counts)
+
+        order = array("i", bytes(4 * counts[-1]))
+        for action_row, owner in enumerate(owners):
+            if owner != _NONE:
+                order[counts[owner]] = action_row
+                counts[owner] += 1
+
+        self._offsets = offsets
+        self._order = order
+        self._orphans = orphans
+        self._csr_stale = False
+
+    def _action_rows(self, dialogue_id: any) -> list[int]:
+        """
+        Returns the action rows that belong to a dialogue, in insertion order
+        """
+        if self._csr_stale:
+            self._build_csr()
+        row = self._row("dialogue", dialogue_id)
+        if row == _NONE:
+            return self._orphans.get(self._strings.lookup(dialogue_id), [])
+        return self._order[self._offsets[row]:self._offsets[row + 1]]
+
+    def get_scene(self, scene_id: str) -> Scene:
+        """
+        Looks up a scene by identifier
+
+        Raises:
+            KeyError: If no scene has the identifier
+        """
+        return self.scenes[scene_id]
+
+    def get_dialogue(self, dialogue_id: str) -> Dialogue:
+        """
+        Looks up a dialogue by identifier
+
+        Raises:
+            KeyError: If no dialogue has the identifier
+        """
+        return self.dialogues[dialogue_id]
+
+    def get_action(self, action_id: str) -> Action:
+        """
+        Looks up an action by identifier
+
+        Raises:
+            KeyError: If no action has the identifier
+        """
+        return self.actions[action_id]
+
+    def actions_for(self, dialogue_id: str) -> list[Action]:
+        """
+        Lists the actions that belong to a dialogue, in insertion order
+
+        Args:
+            dialogue_id: str
+                The identifier of the dialogue
+        Returns:
+            list[Action]
+                The actions of the dialogue, empty if it has none
+        """
+        return [self._build("action", row) for row in self._action_rows(dialogue_id)]
+
+    def populate_tree(self) -> None:
+        """
+        Populates the tree data structure with current data
+
+        The result is the same nested dictionary Tree.populate_tree builds
+        """
+        decode = self._strings.decode
+        action_ids = self._ids["action"]
+        for row, code in enumerate(self._ids["scene"]):
+            dialogue_id = decode(self._scene_dialogue[row])
+            dialogues = {}
+            dialogue_row = self._row("dialogue", dialogue_id)
+            if dialogue_row != _NONE:
+                dialogues[dialogue_id] = {
+                    "text": self._text.decode(self._dialogue_text[dialogue_row]),
+                    "actions": {
+                        decode(action_ids[action_row]): {
+                            "next_id": decode(self._action_next[action_row])
+                        }
+                        for action_row in self._action_rows(dialogue_id)
+                    }
+                }
+            self.tree[decode(code)] = {
+                "dialogue_id": dialogue_id,
+                "dialogues": dialogues
+            }
+
+    def columns(self) -> dict:
+        """
+        Returns the integer columns for vectorized passes
+
+        Identifier codes index into "strings", text codes into "text",
+        rows index into the columns of their kind, and -1 marks a missing
+        reference. Arrays are NumPy copies when NumPy is installed, otherwise
+        the underlying array objects, which must not be kept across add_object
+
+        Returns:
+            dict
+                The column name -> array mapping, plus the "strings" and "text" lists
+        """
+        if self._csr_stale:
+            self._build_csr()
+        columns = {
+            "scene_id": self._ids["scene"],
+            "scene_dialogue": self._scene_dialogue,
+            "dialogue_id": self._ids["dialogue"],
+            "dialogue_text": self._dialogue_text,
+            "action_id": self._ids["action"],
+            "action_dialogue": self._action_dialogue,
+            "action_next": self._action_next,
+            "dialogue_row": self._rows["dialogue"],
+            "offsets": self._offsets,
+            "order": self._order,
+        }
+        if numpy is not None:
+            columns = {
+                name: numpy.frombuffer(column, dtype=column.typecode).copy()
+                for name, column in columns.items()
+            }
+        columns["strings"] = self._strings.values()
+        columns["text"] = self._text.values()
+        return columns
@@ -0,0 +1,405 @@
+"""
+This module is used to compile a Dialogue Tree into a binary file that can be
+opened with mmap and queried without being parsed
+
+compile_tree writes the file and load_compiled_tree opens it.
+Opening a compiled tree only reads the header, so startup time does not
+depend on how much dialogue the file holds. Nodes are decoded when they are
+looked up, and scenes that are never visited are never read.
+
+File layout (all integers little-endian):
+
+    header          magic, version, counts and the offset of every section
+    string offsets  u64 end offset of each string in the string data
+    string data     UTF-8 text of every identifier, text and ctx (as JSON)
+    scenes          (id, dialogue_id, ctx) u32 string codes, sorted by id
+    dialogues       (id, text, ctx) u32 string codes, sorted by id
+    action offsets  u32 per dialogue plus one, the slice of actions it owns
+    actions         (id, dialogue_id, next_id, ctx) u32 string codes, grouped
+                    by dialogue; actions whose dialogue does not exist come
+                    last, sorted by dialogue_id
+    action index    (id, action record) u32 pairs, sorted by id
+
+Identifiers are stored as strings, so a compiled tree returns str ids even
+if the source tree used other types. Lookups accept either form.
+
+Example Usage:
+    compile_tree(tree, "dialogue.bin")
+    with load_compiled_tree("dialogue.bin") as compiled:
+        dialogue = compiled.get_dialogue("greeting")
+        replies = compiled.actions_for("greeting")
+"""
+
+import json
+import mmap
+import struct
+from collections.abc import Mapping
+
+from .tree import EMPTY_CTX, Action, Dialogue, Scene
+
+MAGIC = b"DLGT"
+FORMAT_VERSION = 1
+
+_HEADER = struct.Struct("<4sHH5I7Q")
+_SCENE = struct.Struct("<III")
+_DIALOGUE = struct.Struct("<III")
+_ACTION = struct.Struct("<IIII")
+_INDEX = struct.Struct("<II")
+_U32 = struct.Struct("<I")
+_U64 = struct.Struct("<Q")
+
+# String code used for a missing value, such as an empty ctx or a final next_id
+_NONE = 0xFFFFFFFF
+
+def _key(identifier: any) -> bytes:
+    """
+    Returns the byte string records are sorted and searched by
+    """
+    return str(identifier).encode()
+
+def compile_tree(tree: any, filename: str) -> None:
+    """
+    Writes a tree to a compiled binary file
+
+    Args:
+        tree: Tree
+            The tree to compile (a Tree or any object with the same surface)
+        filename: str
+            The name of the file to write to
+    Returns:
+        None
+    Raises:
+        ValueError: If the tree is too large for the format
+    """
+    codes = {}
+    blob = bytearray()
+    ends = bytearray()
+
+    def encode(value: any, is_ctx: bool=False) -> int:
+        if value is None or (is_ctx and not value):
+            return _NONE
+        text = json.dumps(value, sort_keys=True) if is_ctx else str(value)
+        code = codes.get(text)
+        if code is None:
+            code = len(codes)
+            if code >= _NONE:
+                raise ValueError("Tree has too many strings to compile")
+            codes[text] = code
+            blob.extend(text.encode())
+            ends.extend(_U64.pack(len(blob)))
+        return code
+
+    scenes = bytearray()
+    for identifier in sorted(tree.scenes, key=_key):
+        scene = tree.scenes[identifier]
+        scenes.extend(_SCENE.pack(
+            encode(identifier), encode(scene.dialogue_id), encode(scene.ctx, True)
+        ))
+
+    dialogue_ids = sorted(tree.dialogues, key=_key)
+    dialogue_keys = {_key(identifier) for identifier in dialogue_ids}
+    dialogues = bytearray()
+    offsets = bytearray(_U32.pack(0))
+    actions = bytearray()
+    index = []
+
+    def add_actions(owned: list[Action]) -> None:
+        for action in owned:
+            index.append((_key(action.action_id), len(index)))
+            actions.extend(_ACTION.pack(
+                encode(action.action_id), encode(action.dialogue_id),
+                encode(action.next_id), encode(action.ctx, True)
+            ))
+
+    for identifier in dialogue_ids:
+        dialogue = tree.dialogues[identifier]
+        dialogues.extend(_DIALOGUE.pack(
+            encode(identifier), encode(dialogue.text), encode(dialogue.ctx, True)
+        ))
+        add_actions(tree.actions_for(identifier))
+        offsets.extend(_U32.pack(len(index)))
+
+    orphan_start = len(index)
+    orphans = [
+        action for action in tree.actions.values()
+        if _key(action.dialogue_id) not in dialogue_keys
+    ]
+    orphans.sort(key=lambda action: _key(action.dialogue_id))
+    add_actions(orphans)
+
+    action_index = bytearray()
+    for key, record in sorted(index):
+        action_index.extend(_INDEX.pack(codes[key.decode()], record))
+
+    sections = [ends, blob, scenes, dialogues, offsets, actions, action_index]
+    section_offsets = []
+    position = _HEADER.size
+    for section in sections:
+        section_offsets.append(position)
+        position += len(section)
+
+    with open(filename, "wb") as f:
+        f.write(_HEADER.pack(
+            MAGIC, FORMAT_VERSION, 0,
+            len(codes), len(scenes) // _SCENE.size, len(dialogue_ids),
+            len(index), orphan_start,
+            *section_offsets
+        ))
+        for section in sections:
+            f.write(section)
+
+class _CompiledView(Mapping):
+    """
+    A read-only identifier -> object mapping over one kind of compiled node
+    """
+    def __init__(self, tree: "CompiledTree", kind: str) -> None:
+        self._tree = tree
+        self._kind = kind
+
+    def __getitem__(self, identifier: any) -> any:
+        record = self._tree._find(self._kind, identifier)
+        if record is None:
+            raise KeyError(identifier)
+        return self._tree._build(self._kind, record)
+
+    def __contains__(self, identifier: any) -> bool:
+        return self._tree._find(self._kind, identifier) is not None
+
+    def __iter__(self):
+        for record in range(len(self)):
+            yield self._tree._record_id(self._kind, record)
+
+    def __len__(self) -> int:
+        return self._tree._counts[self._kind]
+
+class CompiledTree:
+    """
+    This class gives read-only access to a compiled tree file through mmap
+
+    It offers the lookup surface of Tree (get_scene, get_dialogue, get_action,
+    actions_for, populate_tree and the scenes / dialogues / actions mappings).
+    Call close() or use it as a context manager to release the file
+
+    Data:
+        version: int
+            The format version of the file
+        tree: dict
+            The nested dictionary built by populate_tree
+    """
+    def __init__(self, filename: str) -> None:
+        """
+        Opens a compiled tree file and reads its header
+
+        Raises:
+            ValueError: If the file is not a compiled tree of a supported version
+        """
+        self.tree = {} # To be populated
+
+        with open(filename, "rb") as f:
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self._map) < _HEADER.size:
+            self._map.close()
+            raise ValueError(f"{filename} is not a compiled tree")
+        (magic, self.version, _, self._string_count, scenes, dialogues, actions,
+         self._orphan_start, self._string_ends, self._strings, *sections) = \
+            _HEADER.unpack_from(self._map)
+        if magic != MAGIC:
+            self._map.close()
+            raise ValueError(f"{filename} is not a compiled tree")
+        if self.version != FORMAT_VERSION:
+            self._map.close()
+            raise ValueError(
+                f"{filename} uses format version {self.version}, expected {FORMAT_VERSION}"
+            )
+        (self._scene_records, self._dialogue_records, self._action_offsets,
+         self._action_records, self._action_index) = sections
+
+        self._counts = {"scene": scenes, "dialogue": dialogues, "action": actions}
+        self.scenes = _CompiledView(self, "scene")
+        self.dialogues = _CompiledView(self, "dialogue")
+        self.actions = _CompiledView(self, "action")
+
+    def __enter__(self) -> "CompiledTree":
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+    def close(self) -> None:
+        """
+        Releases the memory map
+        """
+        self._map.close()
+
+    def _bytes(self, code: int) -> bytes:
+        """
+        Returns the raw UTF-8 bytes of a string code
+        """
+        start = _U64.unpack_from(self._map, self._string_ends + 8 * (code - 1))[0] if code else 0
+        end = _U64.unpack_from(self._map, self._string_ends + 8 * code)[0]
+        return self._map[self._strings + start:self._strings + end]
+
+    def _string(self, code: int) -> any:
+        return None if code == _NONE else self._bytes(code).decode()
+
+    def _ctx(self, code: int) -> dict:
+        return EMPTY_CTX if code == _NONE else json.loads(self._bytes(code))
+
+    def _record_id(self, kind: str, record: int) -> str:
+        """
+        Returns the identifier of a record
+        """
+        return self._string(self._id_code(kind, record))
+
+    def _id_code(self, kind: str, record: int) -> int:
+        if kind == "scene":
+            return _U32.unpack_from(self._map, self._scene_records + _SCENE.size * record)[0]
+        if kind == "dialogue":
+            return _U32.unpack_from(self._map, self._dialogue_records + _DIALOGUE.size * record)[0]
+        return _INDEX.unpack_from(self._map, self._action_index + _INDEX.size * record)[0]
+
+    def _search(self, key: bytes, low: int, high: int, code_at) -> int:
+        """
+        Binary searches records low..high, ordered by the string code_at returns
+        """
+        while low < high:
+            middle = (low + high) // 2
+            if self._bytes(code_at(middle)) < key:
+                low = middle + 1
+            else:
+                high = middle
+        return low
+
+    def _find(self, kind: str, identifier: any) -> int:
+        """
+        Returns the record of a node, or None if there is no such node
+        """
+        key = _key(identifier)
+        count = self._counts[kind]
+        position = self._search(key, 0, count, lambda record: self._id_code(kind, record))
+        if position == count or self._bytes(self._id_code(kind, position)) != key:
+            return None
+        if kind == "action":
+            return _INDEX.unpack_from(self._map, self._action_index + _INDEX.size * position)[1]
+        return position
+
+    def _build(self, kind: str, record: int) -> any:
+        """
+        Decodes the node object stored in a record
+        """
+        if kind == "scene":
+            identifier, dialogue_id, ctx = _SCENE.unpack_from(
+                self._map, self._scene_records + _SCENE.size * record
+            )
+            return Scene(self._ctx(ctx), self._string(identifier), self._string(dialogue_id))
+        if kind == "dialogue":
+            identifier, text, ctx = _DIALOGUE.unpack_from(
+                self._map, self._dialogue_records + _DIALOGUE.size * record
+            )
+            return Dialogue(self._ctx(ctx), self._string(identifier), self._string(text))
+        identifier, dialogue_id, next_id, ctx = _ACTION.unpack_from(
+            self._map, self._action_records + _ACTION.size * record
+        )
+        return Action(
+            self._ctx(ctx), self._string(identifier),
+            self._string(dialogue_id), self._string(next_id)
+        )
+
+    def _action_range(self, dialogue_id: any) -> range:
+        """
+        Returns the action records owned by a dialogue
+        """
+        record = self._find("dialogue", dialogue_id)
+        if record is not None:
+            start, end = struct.unpack_from("<II", self._map, self._action_offsets + 4 * record)
+            return range(start, end)
+
+        # Actions of a missing dialogue are grouped at the end, by dialogue_id
+        key = _key(dialogue_id)
+        count = self._counts["action"]
+        owner = lambda action: _ACTION.unpack_from(
+            self._map, self._action_records + _ACTION.size * action
+        )[1]
+        start = self._search(key, self._orphan_start, count, owner)
+        end = start
+        while end < count and self._bytes(owner(end)) == key:
+            end += 1
+        return range(start, end)
+
+    def get_scene(self, scene_id: str) -> Scene:
+        """
+        Looks up a scene by identifier
+
+        Raises:
+            KeyError: If no scene has the identifier
+        """
+        return self.scenes[scene_id]
+
+    def get_dialogue(self, dialogue_id: str) -> Dialogue:
+        """
+        Looks up a dialogue by identifier
+
+        Raises:
+            KeyError: If no dialogue has the identifier
+        """
+        return self.dialogues[dialogue_id]
+
+    def get_action(self, action_id: str) -> Action:
+        """
+        Looks up an action by identifier
+
+        Raises:
+            KeyError: If no action has the identifier
+        """
+        return self.actions[action_id]
+
+    def actions_for(self, dialogue_id: str) -> list[Action]:
+        """
+        Lists the actions that belong to a dialogue, in insertion order
+
+        Args:
+            dialogue_id: str
+                The identifier of the dialogue
+        Returns:
+            list[Action]
+                The actions of the dialogue, empty if it has none
+        """
+        return [self._build("action", record) for record in self._action_range(dialogue_id)]
+
+    def populate_tree(self) -> None:
+        """
+        Populates the tree data structure with current data
+
+        This reads every scene, so it is meant for tooling rather than runtime use
+        """
+        for record in range(self._counts["scene"]):
+            scene = self._build("scene", record)
+            dialogues = {}
+            dialogue = self.dialogues.get(scene.dialogue_id)
+            if dialogue is not None:
+                dialogues[dialogue.dialogue_id] = {
+                    "text": dialogue.text,
+                    "actions": {
+                        action.action_id: {"next_id": action.next_id}
+                        for action in self.actions_for(scene.dialogue_id)
+                    }
+                }
+            self.tree[scene.scene_id] = {
+                "dialogue_id": scene.dialogue_id,
+                "dialogues": dialogues
+            }
+
+def load_compiled_tree(filename: str) -> CompiledTree:
+    """
+    Opens a compiled tree file
+
+    Args:
+        filename: str
+            The name of the file to open
+    Returns:
+        CompiledTree
+            The memory mapped tree
+    Raises:
+        ValueError: If the file is not a compiled tree of a supported version
+    """
+    return CompiledTree(filename)
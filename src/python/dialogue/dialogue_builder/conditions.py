@@ -0,0 +1,217 @@
+"""
+This module is used to compile the conditions stored in the ctx of Dialogue
+and Action objects into Python closures
+
+A condition is kept in ctx["condition"] as a JSON friendly expression.
+Lists are operations, with the operator first; everything else is a constant.
+
+    ["var", "relationship.alice"]   state["relationship"]["alice"], None if missing
+    ["has", "key"]                  "key" in state["inventory"]
+    ["not", x]
+    ["and", x, y, ...]
+    ["or", x, y, ...]
+    ["==", x, y]  ["!=", x, y]  ["<", x, y]  ["<=", x, y]  [">", x, y]  [">=", x, y]
+    ["in", x, y]                    x in y
+    ["list", x, y, ...]             [x, y, ...], each element evaluated
+    ["quote", value]                value, as is, even if it is a list
+
+Since lists are operations, a literal list is written with "list" or "quote":
+
+    ["in", ["var", "location"], ["list", "tavern", "inn"]]
+    ["in", ["var", "location"], ["quote", ["tavern", "inn"]]]
+
+For example, an action only offered with the key and a good relationship:
+
+    {"condition": ["and", ["has", "key"], [">=", ["var", "relationship.alice"], 3]]}
+
+Conditions are compiled once, when the object is added to a Tree.
+Constant sub-expressions are folded, and identical sub-expressions anywhere
+in the tree share one compiled closure. Evaluating a condition is then a
+call with the game state, a mapping defined by the developer.
+
+Example Usage:
+    compiler = ConditionCompiler()
+    check = compiler.compile(["has", "key"])
+    check({"inventory": ["key"]})  # True
+"""
+
+import operator
+from typing import Callable
+
+CONDITION_KEY = "condition"
+
+_comparisons = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    "<": operator.lt,
+    "<=": operator.le,
+    ">": operator.gt,
+    ">=": operator.ge,
+    "in": lambda item, container: container is not None and item in container,
+}
+
+def _always(value: any) -> Callable[[dict], any]:
+    def constant(state: dict) -> any:
+        return value
+    constant.constant = True
+    constant.value = value
+    return constant
+
+def _freeze(expression: any) -> any:
+    """
+    Returns a hashable form of an expression, used as its cache key
+    """
+    if isinstance(expression, list):
+        return tuple(_freeze(part) for part in expression)
+    if isinstance(expression, dict):
+        raise ValueError(f"Conditions cannot contain objects: {expression}")
+    return (type(expression).__name__, expression)
+
+class ConditionCompiler:
+    """
+    This class compiles condition expressions into closures
+
+    Data:
+        cache: dict
+            Frozen expression -> compiled closure, shared by every expression
+            this compiler has seen
+    """
+    def __init__(self) -> None:
+        self.cache = {}
+
+    def compile(self, expression: any) -> Callable[[dict], any]:
+        """
+        Compiles an expression into a function of the game state
+
+        Args:
+            expression: any
+                The condition, see the module documentation for the syntax
+        Returns:
+            Callable[[dict], any]
+                The compiled condition
+        Raises:
+            ValueError: If the expression is not valid
+        """
+        key = _freeze(expression)
+        compiled = self.cache.get(key)
+        if compiled is None:
+            compiled = self._compile(expression)
+            self.cache[key] = compiled
+        return compiled
+
+    def _compile(self, expression: any) -> Callable[[dict], any]:
+        if not isinstance(expression, list):
+            return _always(expression)
+        if not expression or not isinstance(expression[0], str):
+            raise ValueError(f"Condition {expression} must start with an operator")
+
+        op, args = expression[0], expression[1:]
+        if op == "var":
+            self._arity(expression, 1)
+            return self._var(args[0])
+        if op == "has":
+            self._arity(expression, 1)
+            item = args[0]
+            def has(state: dict) -> bool:
+                return item in (state.get("inventory") or ())
+            return has
+        if op == "quote":
+            self._arity(expression, 1)
+            return _always(args[0])
+
+        compiled = [self.compile(arg) for arg in args]
+        constant = all(getattr(arg, "constant", False) for arg in compiled)
+
+        if op == "list":
+            if constant:
+                return _always([arg.value for arg in compiled])
+            compiled = tuple(compiled)
+            def elements(state: dict) -> list:
+                return [arg(state) for arg in compiled]
+            return elements
+
+        if op == "not":
+            self._arity(expression, 1)
+            inner = compiled[0]
+            if constant:
+                return _always(not inner.value)
+            def negate(state: dict) -> bool:
+                return not inner(state)
+            return negate
+
+        if op in ("and", "or"):
+            # Fold constant operands: they either decide the result or drop out
+            deciding = op == "or"
+            remaining = []
+            for arg in compiled:
+                if getattr(arg, "constant", False):
+                    if bool(arg.value) == deciding:
+                        return _always(deciding)
+                else:
+                    remaining.append(arg)
+            if not remaining:
+                return _always(not deciding)
+            if len(remaining) == 1:
+                only = remaining[0]
+                def single(state: dict) -> bool:
+                    return bool(only(state))
+                return single
+            remaining = tuple(remaining)
+            if op == "and":
+                def conjunction(state: dict) -> bool:
+                    for arg in remaining:
+                        if not arg(state):
+                            return False
+                    return True
+                return conjunction
+            def disjunction(state: dict) -> bool:
+                for arg in remaining:
+                    if arg(state):
+                        return True
+                return False
+            return disjunction
+
+        compare = _comparisons.get(op)
+        if compare is None:
+            raise ValueError(f"Unknown condition operator {op!r}")
+        self._arity(expression, 2)
+        left, right = compiled
+        if constant:
+            return _always(self._safe(compare, left.value, right.value))
+        def comparison(state: dict) -> bool:
+            return self._safe(compare, left(state), right(state))
+        return comparison
+
+    @staticmethod
+    def _safe(compare: Callable, left: any, right: any) -> bool:
+        """
+        Compares two values, treating values that cannot be ordered as not matching
+        """
+        try:
+            return compare(left, right)
+        except TypeError:
+            return False
+
+    @staticmethod
+    def _arity(expression: list, count: int) -> None:
+        if len(expression) != count + 1:
+            raise ValueError(f"Condition {expression} expects {count} argument(s)")
+
+    @staticmethod
+    def _var(path: any) -> Callable[[dict], any]:
+        if not isinstance(path, str):
+            raise ValueError(f"Variable name {path!r} must be a string")
+        parts = tuple(path.split("."))
+        if len(parts) == 1:
+            name = parts[0]
+            def variable(state: dict) -> any:
+                return state.get(name)
+            return variable
+        def nested(state: dict) -> any:
+            value = state
+            for part in parts:
+                if not isinstance(value, dict):
+                    return None
+                value = value.get(part)
+            return value
+        return nested
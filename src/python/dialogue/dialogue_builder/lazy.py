@@ -0,0 +1,204 @@
+"""
+This module is used to load a Dialogue Tree one scene at a time
+
+A LazyTree keeps no dialogue in memory up front. The first time a scene is
+accessed, its starting dialogue and every dialogue and action reachable from
+it are read from the source and placed in a small Tree of their own.
+Resident scenes are kept in least recently used order, and the oldest are
+evicted once the count or byte budget is exceeded.
+
+The source is usually a CompiledTree, which is itself read lazily, but any
+object with the Tree lookup surface (scenes, dialogues, actions_for) works.
+
+Example Usage:
+    with open_lazy_tree("dialogue.bin", max_scenes=4) as lazy:
+        scene = lazy.scene("tavern")
+        greeting = scene.get_dialogue(lazy.get_scene("tavern").dialogue_id)
+"""
+
+import sys
+from collections import OrderedDict
+from typing import Callable
+
+from .compiled import load_compiled_tree
+from .tree import Tree
+
+def _node_size(obj: any) -> int:
+    """
+    Estimates the bytes held by a node and its string fields
+    """
+    size = sys.getsizeof(obj)
+    for name in obj.__slots__:
+        value = getattr(obj, name)
+        # Empty containers, such as the shared EMPTY_CTX, cost nothing extra
+        if isinstance(value, str) or value:
+            size += sys.getsizeof(value)
+    return size
+
+class LazyTree:
+    """
+    This class loads the scenes of a tree on first access and holds them in an LRU
+
+    Data:
+        source: any
+            The tree nodes are read from
+        max_scenes: int
+            The most scenes kept resident, or None for no limit
+        max_bytes: int
+            The most estimated bytes kept resident, or None for no limit
+        on_evict: Callable[[str, Tree], None]
+            Called with the scene id and its Tree whenever a scene is evicted
+    """
+    def __init__(self, source: any, max_scenes: int=None, max_bytes: int=None,
+                 on_evict: Callable[[str, Tree], None]=None) -> None:
+        """
+        Initializes the LazyTree without loading any scene
+
+        Raises:
+            ValueError: If a budget is less than one
+        """
+        if max_scenes is not None and max_scenes < 1:
+            raise ValueError("max_scenes must be at least 1")
+        if max_bytes is not None and max_bytes < 1:
+            raise ValueError("max_bytes must be at least 1")
+        self.source = source
+        self.max_scenes = max_scenes
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+
+        # scene id -> (Tree, estimated bytes), least recently used first
+        self._resident = OrderedDict()
+        self.resident_bytes = 0
+
+    def __contains__(self, scene_id: str) -> bool:
+        return scene_id in self.source.scenes
+
+    @property
+    def resident(self) -> list[str]:
+        """
+        The ids of the scenes currently in memory, least recently used first
+        """
+        return list(self._resident)
+
+    def get_scene(self, scene_id: str) -> any:
+        """
+        Looks up a scene from the index without loading its dialogue
+
+        Raises:
+            KeyError: If no scene has the identifier
+        """
+        return self.source.scenes[scene_id]
+
+    def scene(self, scene_id: str) -> Tree:
+        """
+        Returns the Tree holding a scene and everything reachable from it,
+        loading it if it is not resident
+
+        Args:
+            scene_id: str
+                The identifier of the scene
+        Returns:
+            Tree
+                A tree containing the scene, its dialogues and their actions
+        Raises:
+            KeyError: If no scene has the identifier
+        """
+        entry = self._resident.get(scene_id)
+        if entry is not None:
+            self._resident.move_to_end(scene_id)
+            return entry[0]
+
+        tree, size = self._load(scene_id)
+        self._resident[scene_id] = (tree, size)
+        self.resident_bytes += size
+        self._enforce_budget()
+        return tree
+
+    def _load(self, scene_id: str) -> tuple[Tree, int]:
+        """
+        Reads a scene and the dialogues and actions reachable from its start
+        """
+        scene = self.source.scenes[scene_id]
+        tree = Tree(root=False)
+        tree.add_object(scene_id, scene)
+        size = _node_size(scene)
+
+        pending = [scene.dialogue_id]
+        seen = {scene.dialogue_id}
+        while pending:
+            dialogue_id = pending.pop()
+            dialogue = self.source.dialogues.get(dialogue_id)
+            if dialogue is None:
+                continue
+            tree.add_object(dialogue_id, dialogue)
+            size += _node_size(dialogue)
+            for action in self.source.actions_for(dialogue_id):
+                tree.add_object(action.action_id, action)
+                size += _node_size(action)
+                if action.next_id is not None and action.next_id not in seen:
+                    seen.add(action.next_id)
+                    pending.append(action.next_id)
+        return tree, size
+
+    def _enforce_budget(self) -> None:
+        """
+        Evicts least recently used scenes until the budgets are met,
+        always keeping the most recently used one
+        """
+        while len(self._resident) > 1 and (
+            (self.max_scenes is not None and len(self._resident) > self.max_scenes)
+            or (self.max_bytes is not None and self.resident_bytes > self.max_bytes)
+        ):
+            self.evict(next(iter(self._resident)))
+
+    def evict(self, scene_id: str) -> None:
+        """
+        Removes a scene from memory, calling on_evict if it was resident
+        """
+        entry = self._resident.pop(scene_id, None)
+        if entry is None:
+            return
+        tree, size = entry
+        self.resident_bytes -= size
+        if self.on_evict:
+            self.on_evict(scene_id, tree)
+
+    def clear(self) -> None:
+        """
+        Evicts every resident scene
+        """
+        for scene_id in list(self._resident):
+            self.evict(scene_id)
+
+    def close(self) -> None:
+        """
+        Evicts every resident scene and closes the source, if it can be closed
+        """
+        self.clear()
+        close = getattr(self.source, "close", None)
+        if close is not None:
+            close()
+
+    def __enter__(self) -> "LazyTree":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+def open_lazy_tree(filename: str, max_scenes: int=None, max_bytes: int=None,
+                   on_evict: Callable[[str, Tree], None]=None) -> LazyTree:
+    """
+    Opens a compiled tree file for lazy, per-scene loading
+
+    Args:
+        filename: str
+            A file written by compile_tree
+        max_scenes, max_bytes, on_evict:
+            The budgets and eviction callback, see LazyTree
+    Returns:
+        LazyTree
+            The lazily loaded tree, to be closed when no longer needed
+    Raises:
+        ValueError: If the file is not a compiled tree of a supported version
+    """
+    return LazyTree(load_compiled_tree(filename), max_scenes, max_bytes, on_evict)
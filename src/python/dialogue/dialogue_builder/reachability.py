@@ -0,0 +1,287 @@
+"""
+This module is used to answer reachability and routing questions about a
+Dialogue Tree in constant time at runtime
+
+A ReachabilityIndex is built once from a tree, for example at load time.
+For every scene it precomputes, over the dialogues reachable from the
+scene's starting dialogue:
+
+- the BFS distance of each dialogue from the start
+- a reachable-set bitset per dialogue, so "can the player still get from
+  here to there" is a single bit test
+- whether an ending can still be reached from each dialogue
+- next-hop tables towards the endings of the scene (dialogues with an action
+  that ends the conversation), so the shortest route is walked one action
+  per step. Routes to other dialogues are computed on first use and cached
+
+Example Usage:
+    index = ReachabilityIndex(tree)
+    scene = index.scene("tavern")
+    if scene.can_reach(current, "ending_good"):
+        hint = scene.next_hop(current, "ending_good")
+"""
+
+from collections import deque
+
+class SceneIndex:
+    """
+    This class holds the precomputed reachability data of one scene
+
+    Data:
+        scene_id: str
+            The identifier of the scene
+        start: str
+            The identifier of the starting dialogue
+        distances: dict
+            Dialogue id -> number of actions from the start
+        endings: list
+            The dialogues of the scene with an action that ends the conversation
+    """
+    def __init__(self, tree: any, scene_id: any) -> None:
+        """
+        Precomputes the index for a scene of the tree
+
+        Raises:
+            KeyError: If the scene does not exist
+        """
+        self.scene_id = scene_id
+        self.start = tree.scenes[scene_id].dialogue_id
+
+        # Dialogues in BFS order from the start; a dialogue's bit is its position
+        self._order = []
+        self._bits = {}
+        # Per bit: [(action id, next bit)]
+        self._edges = []
+        self.distances = {}
+        self.endings = []
+
+        if self.start in tree.dialogues:
+            self._bits[self.start] = 0
+            self._order.append(self.start)
+            self.distances[self.start] = 0
+        position = 0
+        while position < len(self._order):
+            dialogue_id = self._order[position]
+            edges = []
+            for action in tree.actions_for(dialogue_id):
+                next_id = action.next_id
+                if next_id is None:
+                    if not self.endings or self.endings[-1] != dialogue_id:
+                        self.endings.append(dialogue_id)
+                    continue
+                if next_id not in tree.dialogues:
+                    continue
+                if next_id not in self._bits:
+                    self._bits[next_id] = len(self._order)
+                    self._order.append(next_id)
+                    self.distances[next_id] = self.distances[dialogue_id] + 1
+                edges.append((action.action_id, self._bits[next_id]))
+            self._edges.append(edges)
+            position += 1
+
+        self._reach = self._build_reach()
+        # Per bit: whether an ending can be reached from the dialogue
+        endings = 0
+        for ending in self.endings:
+            endings |= 1 << self._bits[ending]
+        self._can_end = [bool(reach & endings) for reach in self._reach]
+        self._incoming = None
+        # Target bit -> per source bit, (action id, distance) of the first step
+        self._hops = {}
+        for ending in self.endings:
+            self._hop_table(self._bits[ending])
+
+    def __contains__(self, dialogue_id: any) -> bool:
+        return dialogue_id in self._bits
+
+    def _build_reach(self) -> list[int]:
+        """
+        Computes the reachable-set bitset of every dialogue
+
+        Strongly connected components are found with an iterative Tarjan
+        search, which emits them in reverse topological order, so each
+        component's set is its own bits plus the sets of components it leads to
+        """
+        count = len(self._order)
+        reach = [0] * count
+        index = [-1] * count
+        low = [0] * count
+        on_stack = [False] * count
+        stack = []
+        counter = 0
+
+        for root in range(count):
+            if index[root] != -1:
+                continue
+            work = [(root, 0)]
+            while work:
+                node, edge = work.pop()
+                if edge == 0:
+                    index[node] = low[node] = counter
+                    counter += 1
+                    stack.append(node)
+                    on_stack[node] = True
+                edges = self._edges[node]
+                while edge < len(edges):
+                    target = edges[edge][1]
+                    edge += 1
+                    if index[target] == -1:
+                        work.append((node, edge))
+                        work.append((target, 0))
+                        break
+                    if on_stack[target]:
+                        low[node] = min(low[node], index[target])
+                else:
+                    if low[node] == index[node]:
+                        members = []
+                        while True:
+                            member = stack.pop()
+                            on_stack[member] = False
+                            members.append(member)
+                            if member == node:
+                                break
+                        mask = 0
+                        for member in members:
+                            mask |= 1 << member
+                        for member in members:
+                            for _, target in self._edges[member]:
+                                mask |= reach[target]
+                        for member in members:
+                            reach[member] = mask
+                    if work:
+                        parent = work[-1][0]
+                        low[parent] = min(low[parent], low[node])
+        return reach
+
+    def _hop_table(self, target: int) -> dict[int, tuple[any, int]]:
+        """
+        Returns the first step and distance of the shortest route from every
+        dialogue to a target, computing it with a reverse BFS if needed
+        """
+        table = self._hops.get(target)
+        if table is not None:
+            return table
+
+        incoming = self._incoming_edges()
+        table = {target: (None, 0)}
+        pending = deque([target])
+        while pending:
+            node = pending.popleft()
+            distance = table[node][1] + 1
+            for action_id, source in incoming[node]:
+                if source not in table:
+                    table[source] = (action_id, distance)
+                    pending.append(source)
+        self._hops[target] = table
+        return table
+
+    def _incoming_edges(self) -> list[list[tuple[any, int]]]:
+        """
+        Returns the reversed edges, built on first use
+        """
+        if self._incoming is None:
+            self._incoming = [[] for _ in self._order]
+            for source, edges in enumerate(self._edges):
+                for action_id, target in edges:
+                    self._incoming[target].append((action_id, source))
+        return self._incoming
+
+    def reachable(self, dialogue_id: any) -> list[any]:
+        """
+        Lists the dialogues reachable from a dialogue, including itself
+
+        Raises:
+            KeyError: If the dialogue is not part of the scene
+        """
+        mask = self._reach[self._bits[dialogue_id]]
+        return [self._order[bit] for bit in range(mask.bit_length()) if mask >> bit & 1]
+
+    def can_reach(self, source: any, target: any) -> bool:
+        """
+        Returns whether target can still be reached from source
+
+        Args:
+            source: str
+                The current dialogue
+            target: str
+                The dialogue to reach
+        Returns:
+            bool
+                True if some sequence of actions leads from source to target
+        """
+        source_bit = self._bits.get(source)
+        target_bit = self._bits.get(target)
+        if source_bit is None or target_bit is None:
+            return False
+        return bool(self._reach[source_bit] >> target_bit & 1)
+
+    def can_end(self, source: any) -> bool:
+        """
+        Returns whether any ending of the scene can be reached from source
+        """
+        bit = self._bits.get(source)
+        return bit is not None and self._can_end[bit]
+
+    def distance(self, source: any, target: any) -> int:
+        """
+        Returns the number of actions on the shortest route, or None if there is none
+        """
+        if not self.can_reach(source, target):
+            return None
+        return self._hop_table(self._bits[target])[self._bits[source]][1]
+
+    def next_hop(self, source: any, target: any) -> any:
+        """
+        Returns the action to take from source on the shortest route to target
+
+        Returns:
+            str
+                The action id, or None if target is unreachable or source is target
+        """
+        if not self.can_reach(source, target):
+            return None
+        return self._hop_table(self._bits[target])[self._bits[source]][0]
+
+    def route(self, source: any, target: any) -> list[any]:
+        """
+        Returns the action ids of the shortest route from source to target
+
+        Returns:
+            list[str]
+                The actions in order, empty if source is target, or None if
+                target is unreachable
+        """
+        if not self.can_reach(source, target):
+            return None
+        table = self._hop_table(self._bits[target])
+        target_bit = self._bits[target]
+        actions = []
+        node = self._bits[source]
+        while node != target_bit:
+            action_id = table[node][0]
+            actions.append(action_id)
+            node = next(bit for action, bit in self._edges[node] if action == action_id)
+        return actions
+
+class ReachabilityIndex:
+    """
+    This class holds a SceneIndex for every scene of a tree
+
+    Data:
+        scenes: dict
+            Scene id -> SceneIndex
+    """
+    def __init__(self, tree: any) -> None:
+        """
+        Precomputes the index for every scene of the tree
+        """
+        self.scenes = {scene_id: SceneIndex(tree, scene_id) for scene_id in tree.scenes}
+
+    def scene(self, scene_id: any) -> SceneIndex:
+        """
+        Returns the index of a scene
+
+        Raises:
+            KeyError: If the scene does not exist
+        """
+        return self.scenes[scene_id]
@@ -0,0 +1,188 @@
+"""
+This module is used to read and write JSON data through the fastest
+JSON library installed
+
+The backends, in order of preference, are orjson, msgspec, ujson and the
+standard library json module, which is always available. A Serializer
+picks the first one installed unless told otherwise.
+
+Output is compact in production mode, and indented by 4 spaces otherwise
+so files stay readable and diff well. Indented output always comes from
+the standard library, so a file is the same bytes whichever backend a
+machine has installed. Production mode is on when the DIALOGUE_PRODUCTION
+environment variable is set to anything but "" or "0".
+
+Files are read and written whole, as bytes, through buffered files that
+are always closed.
+
+Example Usage:
+    serializer = get_serializer()
+    data = serializer.load("npc_data.json")
+    serializer.dump(data, "npc_data.json")
+
+    print(Serializer("json", compact=True).dumps({"b": 1, "a": 2}, sort_keys=True))
+"""
+
+import json
+import os
+from typing import Callable
+
+BACKENDS = ("orjson", "msgspec", "ujson", "json")
+
+def _orjson() -> tuple[Callable, Callable]:
+    import orjson
+
+    def dumps(obj: any, sort_keys: bool) -> bytes:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        return orjson.dumps(obj, option=option)
+    return dumps, orjson.loads
+
+def _msgspec() -> tuple[Callable, Callable]:
+    import msgspec
+
+    encoders = {
+        False: msgspec.json.Encoder(),
+        True: msgspec.json.Encoder(order="sorted"),
+    }
+    decoder = msgspec.json.Decoder()
+
+    def dumps(obj: any, sort_keys: bool) -> bytes:
+        return encoders[sort_keys].encode(obj)
+
+    def loads(data: bytes | str) -> any:
+        try:
+            return decoder.decode(data)
+        except msgspec.DecodeError as e:
+            raise ValueError(str(e)) from None
+    return dumps, loads
+
+def _ujson() -> tuple[Callable, Callable]:
+    import ujson
+
+    def dumps(obj: any, sort_keys: bool) -> bytes:
+        return ujson.dumps(
+            obj, ensure_ascii=False, sort_keys=sort_keys, escape_forward_slashes=False
+        ).encode()
+    return dumps, ujson.loads
+
+def _json() -> tuple[Callable, Callable]:
+    def dumps(obj: any, sort_keys: bool) -> bytes:
+        return json.dumps(
+            obj, ensure_ascii=False, sort_keys=sort_keys, separators=(",", ":")
+        ).encode()
+    return dumps, json.loads
+
+_loaders = {"orjson": _orjson, "msgspec": _msgspec, "ujson": _ujson, "json": _json}
+
+def available_backends() -> list[str]:
+    """
+    Lists the installed backends, in order of preference
+    """
+    names = []
+    for name in BACKENDS:
+        try:
+            _loaders[name]()
+        except (ImportError, TypeError):
+            # TypeError: a msgspec too old for sorted output
+            continue
+        names.append(name)
+    return names
+
+def production_mode() -> bool:
+    """
+    Returns whether DIALOGUE_PRODUCTION asks for compact output
+    """
+    return os.environ.get("DIALOGUE_PRODUCTION", "") not in ("", "0")
+
+class Serializer:
+    """
+    This class encodes and decodes JSON with one backend
+
+    Data:
+        backend: str
+            The name of the backend used, one of BACKENDS
+        compact: bool
+            Whether output is compact rather than indented
+    """
+    def __init__(self, backend: str=None, compact: bool=None) -> None:
+        """
+        Selects a backend
+
+        Args:
+            backend: str
+                The backend to use, the first installed one of BACKENDS if None
+            compact: bool
+                Whether output is compact, production_mode() if None
+        Raises:
+            ValueError: If the backend is not known
+            ImportError: If the backend is not installed
+        """
+        if backend is None:
+            backend = available_backends()[0]
+        if backend not in _loaders:
+            raise ValueError(f"Unknown JSON backend {backend!r}, expected one of {list(BACKENDS)}")
+        self.backend = backend
+        self.compact = production_mode() if compact is None else compact
+        self._dumps, self._loads = _loaders[backend]()
+
+    def dumps(self, obj: any, sort_keys: bool=False) -> bytes:
+        """
+        Encodes an object as UTF-8 JSON
+
+        Args:
+            obj: any
+                The object to encode
+            sort_keys: bool
+                Whether to write the keys of objects in sorted order
+        Returns:
+            bytes
+                The encoded JSON
+        """
+        if self.compact:
+            return self._dumps(obj, sort_keys)
+        return json.dumps(obj, ensure_ascii=False, sort_keys=sort_keys, indent=4).encode()
+
+    def loads(self, data: bytes | str) -> any:
+        """
+        Decodes JSON
+
+        Raises:
+            ValueError: If the data is not valid JSON
+        """
+        return self._loads(data)
+
+    def load(self, filename: str) -> any:
+        """
+        Reads and decodes a JSON file
+
+        Raises:
+            ValueError: If the file is not valid JSON
+        """
+        with open(filename, "rb") as f:
+            return self._loads(f.read())
+
+    def dump(self, obj: any, filename: str, sort_keys: bool=False) -> None:
+        """
+        Encodes an object and writes it to a JSON file
+        """
+        data = self.dumps(obj, sort_keys)
+        with open(filename, "wb") as f:
+            f.write(data)
+
+_default = {}
+
+def get_serializer(compact: bool=None) -> Serializer:
+    """
+    Returns a shared Serializer using the preferred installed backend
+
+    Args:
+        compact: bool
+            Whether output is compact, production_mode() if None
+    """
+    compact = production_mode() if compact is None else compact
+    serializer = _default.get(compact)
+    if serializer is None:
+        serializer = _default[compact] = Serializer(compact=compact)
+    return serializer
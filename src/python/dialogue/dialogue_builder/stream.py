@@ -0,0 +1,166 @@
+"""
+This module is used to read large JSON documents incrementally
+
+Tree files are a single JSON object holding "scenes", "dialogues" and
+"actions" arrays. Rather than loading the whole document, iter_array_items
+reads the file in fixed size chunks and decodes one array element at a time,
+so memory use is bounded by the chunk size and the largest single element.
+
+Example Usage:
+    with open("tree.json", "r") as f:
+        for key, item in iter_array_items(f, ("scenes", "dialogues", "actions")):
+            ...
+"""
+
+import json
+from typing import Iterator, TextIO
+
+CHUNK_SIZE = 1 << 16
+
+_decoder = json.JSONDecoder()
+_whitespace = " \t\n\r"
+_number = frozenset("0123456789.eE+-")
+
+class _Reader:
+    """
+    A buffered cursor over a text file that decodes JSON values on demand
+
+    Data:
+        buffer: str
+            The text read but not yet consumed
+        pos: int
+            The position of the cursor within buffer
+        eof: bool
+            Whether the whole file has been read
+    """
+    def __init__(self, fp: TextIO, chunk_size: int) -> None:
+        self.fp = fp
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        """
+        Reads another chunk, dropping consumed text
+
+        Returns:
+            bool
+                False if the file has been fully read
+        """
+        if self.eof:
+            return False
+        chunk = self.fp.read(self.chunk_size)
+        if not chunk:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + chunk
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Skips whitespace and returns the next character, or "" at the end of the file
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos] in _whitespace:
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self.fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        """
+        Consumes the given character
+
+        Raises:
+            ValueError: If the next character is something else
+        """
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} but found {found or 'end of file'!r}")
+        self.pos += 1
+
+    def value(self) -> any:
+        """
+        Decodes the next JSON value, reading more of the file as needed
+
+        A value is only accepted once a character after it has been read.
+        A number is only accepted once a character that cannot continue it
+        has been read, so "1.5" split after "1." is not decoded as 1
+
+        Raises:
+            ValueError: If the value is not valid JSON
+        """
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError as e:
+                if self.fill():
+                    continue
+                raise ValueError(f"Invalid JSON: {e}") from e
+            if isinstance(value, (int, float)) and not isinstance(value, bool):
+                if _number.issuperset(self.buffer[end:]) and self.fill():
+                    continue
+            elif end == len(self.buffer) and self.fill():
+                continue
+            self.pos = end
+            return value
+
+def iter_array_items(fp: TextIO, keys: tuple[str, ...], chunk_size: int=CHUNK_SIZE,
+                     found: set=None) -> Iterator[tuple[str, any]]:
+    """
+    Yields the elements of the top level arrays stored under the given keys
+
+    Values under other keys are decoded and discarded
+
+    Args:
+        fp: TextIO
+            The file to read, positioned at the start of a JSON object
+        keys: tuple[str, ...]
+            The keys whose arrays should be streamed
+        chunk_size: int
+            The number of characters read at a time
+        found: set
+            If given, every one of keys met in the document is added to it,
+            even when its array is empty
+    Returns:
+        Generator of tuples of the form (key, element)
+    Raises:
+        ValueError: If the document is not a JSON object or is malformed
+    """
+    reader = _Reader(fp, chunk_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise ValueError("Expected an object key")
+        reader.expect(":")
+        if found is not None and key in keys:
+            found.add(key)
+
+        if key in keys and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.pos += 1
+            else:
+                while True:
+                    yield key, reader.value()
+                    if reader.peek() == ",":
+                        reader.pos += 1
+                        continue
+                    reader.expect("]")
+                    break
+        else:
+            reader.value()
+
+        if reader.peek() == ",":
+            reader.pos += 1
+            continue
+        reader.expect("}")
+        return
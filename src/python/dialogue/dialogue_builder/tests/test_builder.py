@@ -0,0 +1,116 @@
+"""
+Tests for compiling user scripts
+"""
+
+import random
+
+import pytest
+
+from ..builder import build_all, check_scripts, parse
+from ..tree import Dialogue, Tree
+
+def _scripts(tmp_path, **scripts: str) -> list[str]:
+    paths = []
+    for name, text in scripts.items():
+        path = tmp_path / f"{name}.txt"
+        path.write_text(text)
+        paths.append(str(path))
+    return paths
+
+def test_check_scripts_matches_build_across_files(tmp_path) -> None:
+    paths = _scripts(
+        tmp_path,
+        a='create dialogue d0 "Hello"\ncreate action a0 d0 end\n',
+        b='create scene s0 d0\nupdate dialogue d0 "Hi"\n',
+    )
+    diagnostics = check_scripts(paths)
+    assert [(d.file, d.line, d.message) for d in diagnostics] == [
+        (paths[1], 2, "Cannot update dialogue d0, it does not exist"),
+    ]
+    with pytest.raises(SyntaxError, match="Cannot update dialogue d0"):
+        build_all(paths, workers=1)
+
+def test_check_scripts_reports_merge_conflicts(tmp_path) -> None:
+    paths = _scripts(
+        tmp_path,
+        a='create tree "one"\ncreate dialogue d0 "Hello"\n',
+        b='create dialogue d1 "Hi"\ncreate tree "two"\n\ncreate dialogue d0 "Again"\n',
+        c='create dialogue d1 "Bye"\ndelete dialogue d1\n',
+    )
+    diagnostics = check_scripts(paths)
+    assert [(d.file, d.line, d.message) for d in diagnostics] == [
+        (paths[1], 2, f"{paths[1]} names the tree 'two' but it is already named 'one'"),
+        (paths[1], 4, f"Dialogue d0 is defined in both {paths[0]} and {paths[1]}"),
+    ]
+    with pytest.raises(ValueError, match="names the tree"):
+        build_all(paths, workers=1)
+    # Without the conflicting files, both agree there is nothing wrong
+    assert check_scripts([paths[0], paths[2]]) == []
+    assert set(build_all([paths[0], paths[2]], workers=1).dialogues) == {"d0"}
+
+def _random_scripts(tmp_path, seed: int, files: int=4) -> list[str]:
+    """
+    Writes scripts that each create, update and delete only their own objects
+    """
+    rnd = random.Random(seed)
+    scripts = {}
+    for file in range(files):
+        lines = ['create tree "game"'] if rnd.random() < 0.5 else []
+        for i in range(rnd.randint(0, 6)):
+            lines.append(f'create dialogue d{file}_{i} "Line {i} \\u00e9"')
+            lines.append(f"create action a{file}_{i} d{file}_{i} {rnd.choice(['end', f'd{file}_0'])}")
+            if rnd.random() < 0.3:
+                lines.append(f"create scene s{file}_{i} d{file}_{i}")
+            if rnd.random() < 0.2:
+                lines.append(f'update dialogue d{file}_{i} "Changed"')
+            if rnd.random() < 0.2:
+                lines.append(f"delete action a{file}_{i}")
+        scripts[f"f{file}"] = "\n".join(lines) + "\n"
+    return _scripts(tmp_path, **scripts)
+
+@pytest.mark.parametrize("seed", range(5))
+def test_build_all_matches_parsing_one_script(tmp_path, seed: int) -> None:
+    paths = _random_scripts(tmp_path, seed)
+    combined = tmp_path / "combined.script"
+    combined.write_text("".join(open(path).read() for path in paths))
+    expected = parse(str(combined))
+
+    for workers in (1, 2):
+        owners = {}
+        tree = build_all(paths, workers=workers, owners=owners)
+        assert tree.name == expected.name
+        assert tree.scenes == expected.scenes
+        assert tree.dialogues == expected.dialogues
+        assert tree.actions == expected.actions
+        for kind, index in (("scene", tree.scenes), ("dialogue", tree.dialogues), ("action", tree.actions)):
+            for identifier in index:
+                # Identifiers are <letter><file>_<i>
+                assert owners.pop((kind, identifier)) == paths[int(identifier[1:].split("_")[0])]
+        assert owners == {}
+
+def test_build_all_into_an_existing_tree(tmp_path) -> None:
+    paths = _scripts(tmp_path, a='create dialogue d0 "Again"\n', b='create dialogue d1 "Hi"\n')
+    tree = Tree(root=False)
+    tree.add_object("d0", Dialogue({}, "d0", "Hello"))
+    with pytest.raises(ValueError, match="Dialogue d0 already exists"):
+        build_all(paths, workers=1, tree=tree)
+    assert build_all(paths[1:], workers=1, tree=tree) is tree
+    assert tree.dialogues == {"d0": Dialogue({}, "d0", "Hello"), "d1": Dialogue({}, "d1", "Hi")}
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_build_all_raises_the_first_syntax_error(tmp_path, workers: int) -> None:
+    paths = _scripts(
+        tmp_path,
+        a='create dialogue d0 "Hello"\n',
+        b='create dialogue d1 "Hi"\ncreate scene s1\n',
+        c='create dialogue d2\n',
+    )
+    with pytest.raises(SyntaxError) as info:
+        build_all(paths, workers=workers)
+    assert (info.value.filename, info.value.lineno) == (paths[1], 2)
+
+def test_build_all_arguments(tmp_path) -> None:
+    with pytest.raises(ValueError, match="workers"):
+        build_all([], workers=0)
+    tree = build_all([])
+    assert (len(tree.scenes), len(tree.dialogues), len(tree.actions)) == (0, 0, 0)
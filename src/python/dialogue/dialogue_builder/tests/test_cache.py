@@ -0,0 +1,79 @@
+"""
+Tests for the compiled fragment cache and its use by build_all
+"""
+
+import os
+import pickle
+
+import pytest
+
+from ..builder import build_all, script_key
+from ..cache import BuildCache
+
+SCRIPTS = {
+    "a": 'create scene s0 d0\ncreate dialogue d0 "Hello"\ncreate action a0 d0 d1\n',
+    "b": 'create dialogue d1 "Bye"\ncreate action a1 d1 end\n',
+}
+
+def _scripts(tmp_path, scripts: dict[str, str]) -> list[str]:
+    paths = []
+    for name, text in scripts.items():
+        path = tmp_path / f"{name}.txt"
+        path.write_text(text)
+        paths.append(str(path))
+    return paths
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"not a pickle",
+    pickle.dumps(("tree", [], [], []))[:-3],
+    # A pickle of a class that no longer exists
+    b"\x80\x04\x95\x1b\x00\x00\x00\x00\x00\x00\x00\x8c\x07missing\x94\x8c\x05Thing\x94\x93\x94)\x81\x94.",
+])
+def test_corrupted_entry_is_a_miss_and_is_deleted(tmp_path, content: bytes) -> None:
+    cache = BuildCache(str(tmp_path / "cache"))
+    cache.put("key", ("tree", [], [], []))
+    path = os.path.join(cache.directory, "key.pickle")
+    with open(path, "wb") as f:
+        f.write(content)
+
+    assert cache.get("key") is None
+    assert not os.path.exists(path)
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert cache.get("missing") is None
+    assert cache.misses == 2
+
+def test_build_all_hits_and_misses(tmp_path) -> None:
+    paths = _scripts(tmp_path, SCRIPTS)
+    expected = build_all(paths, workers=1)
+    cache = BuildCache(str(tmp_path / "cache"))
+
+    tree = build_all(paths, workers=1, cache=cache)
+    assert (cache.hits, cache.misses) == (0, 2)
+    assert tree.dialogues == expected.dialogues
+
+    tree = build_all(paths, workers=1, cache=cache)
+    assert (cache.hits, cache.misses) == (2, 2)
+    assert tree.scenes == expected.scenes
+    assert tree.dialogues == expected.dialogues
+    assert tree.actions == expected.actions
+
+    # An edited script misses, the other still hits
+    with open(paths[1], "a") as f:
+        f.write('create dialogue d2 "Again"\ncreate action a2 d2 end\n')
+    tree = build_all(paths, workers=1, cache=cache)
+    assert (cache.hits, cache.misses) == (3, 3)
+    assert set(tree.dialogues) == {"d0", "d1", "d2"}
+    assert cache.stats()["entries"] == 3
+
+def test_build_all_recompiles_a_corrupted_entry(tmp_path) -> None:
+    paths = _scripts(tmp_path, SCRIPTS)
+    cache = BuildCache(str(tmp_path / "cache"))
+    expected = build_all(paths, workers=1, cache=cache)
+    with open(os.path.join(cache.directory, script_key(paths[0]) + ".pickle"), "wb") as f:
+        f.write(b"\x80\x04garbage")
+
+    tree = build_all(paths, workers=1, cache=cache)
+    assert (cache.hits, cache.misses) == (1, 3)
+    assert tree.dialogues == expected.dialogues
+    assert cache.get(script_key(paths[0])) is not None
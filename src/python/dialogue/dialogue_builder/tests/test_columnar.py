@@ -0,0 +1,106 @@
+"""
+Tests that ColumnarTree answers every lookup the same way Tree does
+
+Random trees are built in both backends, including scenes starting at
+missing dialogues, actions of missing dialogues (orphans), final actions
+and non-empty contexts, and every lookup is compared.
+"""
+
+import random
+
+import pytest
+
+from ..columnar import ColumnarTree
+from ..tree import Action, Dialogue, Scene, Tree
+
+def _objects(rnd: random.Random) -> list[tuple[str, any]]:
+    """
+    Returns random (identifier, object) pairs; some references are to missing dialogues
+    """
+    dialogues = [f"d{i}" for i in range(rnd.randint(0, 12))]
+    targets = dialogues + ["missing", "gone"]
+    ctx = lambda: rnd.choice([{}, {}, {"mood": rnd.choice(["calm", "angry"])}])
+    objects = []
+    for i in range(rnd.randint(0, 5)):
+        objects.append((f"s{i}", Scene(ctx(), f"s{i}", rnd.choice(targets))))
+    for dialogue_id in dialogues:
+        objects.append((dialogue_id, Dialogue(ctx(), dialogue_id, "x" * rnd.randint(0, 5))))
+    for i in range(rnd.randint(0, 30)):
+        next_id = rnd.choice(targets + [None])
+        objects.append((f"a{i}", Action(ctx(), f"a{i}", rnd.choice(targets), next_id)))
+    rnd.shuffle(objects)
+    return objects
+
+def _assert_same(columnar: ColumnarTree, tree: Tree) -> None:
+    assert dict(columnar.scenes) == tree.scenes
+    assert dict(columnar.dialogues) == tree.dialogues
+    assert dict(columnar.actions) == tree.actions
+    assert list(columnar.actions) == list(tree.actions)
+    owners = {action.dialogue_id for action in tree.actions.values()}
+    for dialogue_id in set(tree.dialogues) | owners | {"unknown"}:
+        assert columnar.actions_for(dialogue_id) == tree.actions_for(dialogue_id), dialogue_id
+    for identifier in tree.scenes:
+        assert columnar.get_scene(identifier) == tree.get_scene(identifier)
+    for identifier in tree.actions:
+        assert columnar.get_action(identifier) == tree.get_action(identifier)
+    columnar.populate_tree()
+    tree.populate_tree()
+    assert columnar.tree == tree.tree
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_tree(seed: int) -> None:
+    rnd = random.Random(seed)
+    columnar = ColumnarTree(root=False)
+    tree = Tree(root=False)
+    for position, (identifier, obj) in enumerate(_objects(rnd)):
+        columnar.add_object(identifier, obj)
+        tree.add_object(identifier, obj)
+        if position % 7 == 0:
+            # Lookups between additions, so the action index goes stale and is rebuilt
+            _assert_same(columnar, tree)
+    _assert_same(columnar, tree)
+
+def test_empty_tree() -> None:
+    columnar = ColumnarTree(root=False)
+    _assert_same(columnar, Tree(root=False))
+    assert len(columnar.scenes) == len(columnar.dialogues) == len(columnar.actions) == 0
+    assert "s0" not in columnar.scenes
+    with pytest.raises(KeyError):
+        columnar.get_dialogue("d0")
+
+def test_root_and_data_match_tree() -> None:
+    _assert_same(ColumnarTree(), Tree())
+    data = {
+        "scenes": [{"scene_id": "s0", "dialogue_id": "d0"}],
+        "dialogues": [{"dialogue_id": "d0", "text": "Hi", "ctx": {"mood": "calm"}}],
+        "actions": [
+            {"action_id": "a0", "dialogue_id": "d0", "next_id": "d1"},
+            {"action_id": "a1", "dialogue_id": "d9"},
+        ],
+    }
+    _assert_same(ColumnarTree(data), Tree(data))
+
+def test_duplicate_and_invalid_objects() -> None:
+    columnar = ColumnarTree(root=False)
+    columnar.add_object("d0", Dialogue({}, "d0", "Hi"))
+    # The same identifier may be used by objects of different kinds
+    columnar.add_object("d0", Scene({}, "d0", "d0"))
+    with pytest.raises(ValueError):
+        columnar.add_object("d0", Dialogue({}, "d0", "Again"))
+    with pytest.raises(TypeError):
+        columnar.add_object("x", "not a node")
+
+@pytest.mark.parametrize("seed", range(5))
+def test_columns_follow_the_action_index(seed: int) -> None:
+    columnar = ColumnarTree(root=False)
+    tree = Tree(root=False)
+    for identifier, obj in _objects(random.Random(seed)):
+        columnar.add_object(identifier, obj)
+        tree.add_object(identifier, obj)
+    columns = columnar.columns()
+    assert len(columns["offsets"]) == len(tree.dialogues) + 1
+    strings = columns["strings"]
+    for row, code in enumerate(columns["dialogue_id"]):
+        action_rows = columns["order"][columns["offsets"][row]:columns["offsets"][row + 1]]
+        assert [strings[columns["action_id"][action_row]] for action_row in action_rows] == \
+            [action.action_id for action in tree.actions_for(strings[code])]
@@ -0,0 +1,80 @@
+"""
+Tests that a compiled tree file answers every lookup the same way its Tree does
+
+Random trees, including scenes starting at missing dialogues, actions of
+missing dialogues (orphans), final actions, contexts and non-ASCII
+identifiers, are compiled and every lookup is compared.
+"""
+
+import random
+import struct
+
+import pytest
+
+from ..compiled import FORMAT_VERSION, compile_tree, load_compiled_tree
+from ..tree import Action, Dialogue, Scene, Tree
+
+def _tree(rnd: random.Random) -> Tree:
+    tree = Tree(root=False)
+    dialogues = [f"d{i}" for i in range(rnd.randint(0, 12))] + ["é", "日本"][:rnd.randint(0, 2)]
+    targets = dialogues + ["missing", "gone"]
+    ctx = lambda: rnd.choice([{}, {}, {"mood": rnd.choice(["calm", "angry"]), "n": 1}])
+    for i in range(rnd.randint(0, 5)):
+        tree.add_object(f"s{i}", Scene(ctx(), f"s{i}", rnd.choice(targets)))
+    for dialogue_id in dialogues:
+        tree.add_object(dialogue_id, Dialogue(ctx(), dialogue_id, "ü" * rnd.randint(0, 5)))
+    for i in rnd.sample(range(100), rnd.randint(0, 30)):
+        next_id = rnd.choice(targets + [None])
+        tree.add_object(f"a{i}", Action(ctx(), f"a{i}", rnd.choice(targets), next_id))
+    return tree
+
+def _assert_same(compiled: any, tree: Tree) -> None:
+    assert dict(compiled.scenes) == tree.scenes
+    assert dict(compiled.dialogues) == tree.dialogues
+    assert dict(compiled.actions) == tree.actions
+    owners = {action.dialogue_id for action in tree.actions.values()}
+    for dialogue_id in set(tree.dialogues) | owners | {"unknown"}:
+        assert compiled.actions_for(dialogue_id) == tree.actions_for(dialogue_id), dialogue_id
+    for identifier in tree.dialogues:
+        assert compiled.get_dialogue(identifier) == tree.get_dialogue(identifier)
+    for kind in ("scenes", "dialogues", "actions"):
+        assert "unknown" not in getattr(compiled, kind)
+    compiled.populate_tree()
+    tree.populate_tree()
+    assert compiled.tree == tree.tree
+
+@pytest.mark.parametrize("seed", range(50))
+def test_matches_tree(tmp_path, seed: int) -> None:
+    tree = _tree(random.Random(seed))
+    filename = str(tmp_path / "tree.bin")
+    compile_tree(tree, filename)
+    with load_compiled_tree(filename) as compiled:
+        _assert_same(compiled, tree)
+
+def test_empty_tree(tmp_path) -> None:
+    filename = str(tmp_path / "tree.bin")
+    compile_tree(Tree(root=False), filename)
+    with load_compiled_tree(filename) as compiled:
+        _assert_same(compiled, Tree(root=False))
+        assert len(compiled.scenes) == len(compiled.dialogues) == len(compiled.actions) == 0
+        with pytest.raises(KeyError):
+            compiled.get_scene("s0")
+
+def test_identifiers_are_read_back_as_strings(tmp_path) -> None:
+    filename = str(tmp_path / "tree.bin")
+    compile_tree(Tree(), filename)
+    with load_compiled_tree(filename) as compiled:
+        assert compiled.get_scene(1) == Scene({}, "1", "1")
+        assert compiled.get_scene("1") == compiled.get_scene(1)
+
+@pytest.mark.parametrize("content", [
+    b"",
+    b"DLGT",
+    b"NOPE" + bytes(200),
+    b"DLGT" + struct.pack("<H", FORMAT_VERSION + 1) + bytes(200),
+])
+def test_invalid_file(tmp_path, content: bytes) -> None:
+    path = tmp_path / "tree.bin"
+    path.write_bytes(content)
+    with pytest.raises(ValueError):
+        load_compiled_tree(str(path))
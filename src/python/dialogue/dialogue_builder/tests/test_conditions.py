@@ -0,0 +1,36 @@
+"""
+Tests for compiling condition expressions
+"""
+
+import pytest
+
+from ..conditions import ConditionCompiler
+
+@pytest.mark.parametrize("container", [
+    ["list", "tavern", "inn"],
+    ["quote", ["tavern", "inn"]],
+])
+def test_in_literal_list(container: list) -> None:
+    check = ConditionCompiler().compile(["in", ["var", "location"], container])
+    assert check({"location": "inn"})
+    assert not check({"location": "forest"})
+
+def test_literals_are_folded() -> None:
+    compiler = ConditionCompiler()
+    assert compiler.compile(["list", 1, ["quote", [2]]]).value == [1, [2]]
+    assert compiler.compile(["==", ["list", 1, 2], ["quote", [1, 2]]]).value is True
+
+def test_list_evaluates_elements() -> None:
+    check = ConditionCompiler().compile(["==", ["list", ["var", "a"], 2], ["var", "b"]])
+    assert check({"a": 1, "b": [1, 2]})
+    assert not check({"a": 3, "b": [1, 2]})
+
+def test_unknown_operator() -> None:
+    with pytest.raises(ValueError):
+        ConditionCompiler().compile(["in", "inn", ["tavern", "inn"]])
+
+def test_has_without_inventory() -> None:
+    check = ConditionCompiler().compile(["has", "key"])
+    assert not check({"inventory": None})
+    assert not check({})
+    assert check({"inventory": ["key"]})
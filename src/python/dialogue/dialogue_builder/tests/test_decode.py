@@ -0,0 +1,70 @@
+"""
+Tests that every decoder builds the same nodes from the same tree data
+"""
+
+import json
+
+import pytest
+
+from ..tree import _tags, decode_items, read_tree
+
+DATA = {
+    "scenes": [
+        {"scene_id": "intro", "dialogue_id": "d1", "ctx": None},
+        {"scene_id": "shop", "dialogue_id": "d2", "ctx": {"music": "calm"}},
+    ],
+    "dialogues": [
+        {"dialogue_id": "d1", "text": "Hi"},
+        {"dialogue_id": "d2", "text": "Buy", "ctx": {}},
+    ],
+    "actions": [
+        {"action_id": "a1", "dialogue_id": "d1", "next_id": "d2", "ctx": {"condition": "gold > 1"}},
+        {"action_id": "a2", "dialogue_id": "d2", "ctx": None},
+    ],
+}
+
+INVALID_CTX = [[1], "x", 5]
+
+def _json_nodes(data: dict) -> dict:
+    return {tag: dict(decode_items(tag, data.get(tag) or [])) for tag in _tags}
+
+def _typed_nodes(data: dict) -> dict:
+    from ..tree import _typed_decoder
+    return {tag: dict(objects) for tag, objects in _typed_decoder()(json.dumps(data).encode())}
+
+def _with_ctx(ctx: any) -> dict:
+    return {"scenes": [{"scene_id": "intro", "dialogue_id": "d1", "ctx": ctx}]}
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_read_tree_matches_decode_items(tmp_path, stream: bool) -> None:
+    path = tmp_path / "tree.json"
+    path.write_text(json.dumps(DATA))
+    tree = read_tree(str(path), stream=stream)
+    nodes = _json_nodes(DATA)
+    assert tree.scenes == nodes["scenes"]
+    assert tree.dialogues == nodes["dialogues"]
+    assert tree.actions == nodes["actions"]
+
+@pytest.mark.parametrize("stream", [True, False])
+@pytest.mark.parametrize("ctx", INVALID_CTX)
+def test_invalid_ctx_is_rejected(tmp_path, stream: bool, ctx: any) -> None:
+    path = tmp_path / "tree.json"
+    path.write_text(json.dumps(_with_ctx(ctx)))
+    with pytest.raises(ValueError):
+        read_tree(str(path), stream=stream)
+
+def test_typed_decoder_matches_json_path() -> None:
+    pytest.importorskip("msgspec")
+    typed = _typed_nodes(DATA)
+    assert typed == _json_nodes(DATA)
+    # A null or empty ctx becomes the shared empty one either way
+    assert typed["scenes"]["intro"].ctx is _json_nodes(DATA)["scenes"]["intro"].ctx
+    assert typed["dialogues"]["d2"].ctx is typed["scenes"]["intro"].ctx
+
+@pytest.mark.parametrize("ctx", INVALID_CTX)
+def test_typed_decoder_rejects_invalid_ctx(ctx: any) -> None:
+    pytest.importorskip("msgspec")
+    with pytest.raises(ValueError):
+        _typed_nodes(_with_ctx(ctx))
+    with pytest.raises(ValueError):
+        _json_nodes(_with_ctx(ctx))
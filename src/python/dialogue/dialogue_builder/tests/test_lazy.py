@@ -0,0 +1,80 @@
+"""
+Tests for loading scenes lazily and evicting them under a budget
+"""
+
+import pytest
+
+from ..compiled import compile_tree
+from ..lazy import LazyTree, open_lazy_tree
+from ..tree import Action, Dialogue, Scene, Tree
+
+def _tree(scenes: int=4) -> Tree:
+    """
+    Scenes s0..sN, each starting a chain of two dialogues; s0's text is much the longest
+    """
+    tree = Tree(root=False)
+    for i in range(scenes):
+        tree.add_object(f"s{i}", Scene({}, f"s{i}", f"d{i}"))
+        tree.add_object(f"d{i}", Dialogue({}, f"d{i}", "x" * (10000 if i == 0 else 100 * i)))
+        tree.add_object(f"e{i}", Dialogue({}, f"e{i}", "Bye"))
+        tree.add_object(f"a{i}", Action({}, f"a{i}", f"d{i}", f"e{i}"))
+    return tree
+
+def test_scene_holds_what_is_reachable() -> None:
+    lazy = LazyTree(_tree())
+    scene = lazy.scene("s1")
+    assert set(scene.scenes) == {"s1"}
+    assert set(scene.dialogues) == {"d1", "e1"}
+    assert set(scene.actions) == {"a1"}
+    assert lazy.scene("s1") is scene
+
+def test_max_scenes_evicts_least_recently_used() -> None:
+    evicted = []
+    lazy = LazyTree(_tree(), max_scenes=2, on_evict=lambda scene_id, tree: evicted.append(scene_id))
+    lazy.scene("s0")
+    lazy.scene("s1")
+    lazy.scene("s0")
+    lazy.scene("s2")
+    assert lazy.resident == ["s0", "s2"]
+    assert evicted == ["s1"]
+    lazy.scene("s3")
+    assert lazy.resident == ["s2", "s3"]
+    assert evicted == ["s1", "s0"]
+
+def test_max_bytes_evicts_least_recently_used() -> None:
+    tree = _tree()
+    sizes = {}
+    for scene_id in tree.scenes:
+        probe = LazyTree(tree)
+        probe.scene(scene_id)
+        sizes[scene_id] = probe.resident_bytes
+
+    lazy = LazyTree(tree, max_bytes=sizes["s2"] + sizes["s3"])
+    lazy.scene("s1")
+    lazy.scene("s2")
+    assert lazy.resident == ["s1", "s2"]
+    lazy.scene("s3")
+    assert lazy.resident == ["s2", "s3"]
+    assert lazy.resident_bytes == sizes["s2"] + sizes["s3"]
+
+    # The scene just loaded is kept even if it alone is over budget
+    lazy.scene("s0")
+    assert lazy.resident == ["s0"]
+    assert lazy.resident_bytes == sizes["s0"]
+
+def test_invalid_budgets() -> None:
+    with pytest.raises(ValueError):
+        LazyTree(_tree(), max_scenes=0)
+    with pytest.raises(ValueError):
+        LazyTree(_tree(), max_bytes=0)
+
+def test_close_evicts_and_closes_the_source(tmp_path) -> None:
+    filename = str(tmp_path / "tree.bin")
+    compile_tree(_tree(), filename)
+    evicted = []
+    with open_lazy_tree(filename, on_evict=lambda scene_id, tree: evicted.append(scene_id)) as lazy:
+        assert set(lazy.scene("s2").dialogues) == {"d2", "e2"}
+    assert evicted == ["s2"]
+    assert lazy.resident == []
+    with pytest.raises(ValueError):
+        lazy.get_scene("s0")
@@ -0,0 +1,133 @@
+"""
+Tests for the script tokenizer and parser, and how they recover from errors
+"""
+
+import pytest
+
+from ..builder import Statement, Token, interpret, iter_statements, tokenize
+
+def _statements(script: str) -> tuple[list[Statement], list[tuple[int, int, str]]]:
+    """
+    Parses a script collecting every error, returning statements and (line, column, message)
+    """
+    errors = []
+    statements = list(iter_statements(tokenize(script, errors=errors), errors=errors))
+    return statements, [(d.line, d.column, d.message) for d in errors]
+
+def test_tokens_and_positions() -> None:
+    script = 'create action a1 d1 end "Bye"  # a comment\n  update scene s-1.b 12\n'
+    assert list(tokenize(script)) == [
+        Token("command", "create", 1, 1),
+        Token("node_type", "action", 1, 8),
+        Token("identifier", "a1", 1, 15),
+        Token("identifier", "d1", 1, 18),
+        Token("identifier", "end", 1, 21),
+        Token("text", "Bye", 1, 25),
+        Token("command", "update", 2, 3),
+        Token("node_type", "scene", 2, 10),
+        Token("identifier", "s-1.b", 2, 16),
+        Token("number", 12, 2, 22),
+    ]
+
+@pytest.mark.parametrize("word, expected", [
+    ("12", ("number", 12)),
+    ("-5", ("number", -5)),
+    ("12abc", ("identifier", "12abc")),
+    ("1.5", ("identifier", "1.5")),
+    ('"a\\"b"', ("text", 'a"b')),
+    ('"a\\nb\\u00e9"', ("text", "a\nbé")),
+    ('""', ("text", "")),
+])
+def test_token_values(word: str, expected: tuple[str, any]) -> None:
+    [token] = tokenize(word)
+    assert (token.type, token.value) == expected
+
+def test_lines_may_be_given_one_at_a_time() -> None:
+    lines = iter(['create dialogue\n', 'd1 "Hi"\n'])
+    [statement] = iter_statements(tokenize(lines))
+    assert statement == Statement("create", "dialogue", ["d1", "Hi"], 1, 1)
+
+@pytest.mark.parametrize("script, message", [
+    ("create scene s1 d1 ?", "Unexpected character '?'"),
+    ('create dialogue d1 "a\\qb"', "Invalid escape in text"),
+    ('create dialogue d1 "unterminated', "Unexpected character '\"'"),
+])
+def test_tokenize_errors_raise(script: str, message: str) -> None:
+    with pytest.raises(SyntaxError, match=message):
+        list(tokenize(script))
+
+@pytest.mark.parametrize("script, message, line, column", [
+    ("scene s1 d1", "Expected a command (create, update or delete) but found 'scene'", 1, 1),
+    ("create s1 d1", "Expected a node type but found 's1'", 1, 8),
+    ("delete tree", "Cannot delete a tree", 1, 1),
+    ('create dialogue d1\nd2', "Expected quoted text but found 'd2'", 2, 1),
+    ("create scene s1", "Expected an identifier but found end of script", 1, 14),
+    ('create scene "s1" d1', "Expected an identifier but found 's1'", 1, 14),
+])
+def test_parse_errors_raise(script: str, message: str, line: int, column: int) -> None:
+    with pytest.raises(SyntaxError) as info:
+        list(iter_statements(tokenize(script)))
+    assert (info.value.msg, info.value.lineno, info.value.offset) == (message, line, column)
+
+def test_optional_text_and_end() -> None:
+    statements, errors = _statements(
+        'create action a1 d1 end\ncreate action a2 d1 d2 "Next" create action a3 d1 7'
+    )
+    assert errors == []
+    assert [statement.args for statement in statements] == [
+        ["a1", "d1", None, None],
+        ["a2", "d1", "d2", "Next"],
+        ["a3", "d1", 7, None],
+    ]
+
+def test_recovers_at_the_next_command() -> None:
+    statements, errors = _statements(
+        'create scene s1\n'
+        'create create dialogue d1 "x"\n'
+        'delete tree x\n'
+        'create dialogue d2 create action a1 d1 end "bye" ?\n'
+        'create scene s2 d1 create scene'
+    )
+    assert [(s.command, s.node_type, s.args) for s in statements] == [
+        ("create", "dialogue", ["d1", "x"]),
+        ("create", "action", ["a1", "d1", None, "bye"]),
+        ("create", "scene", ["s2", "d1"]),
+    ]
+    assert errors == [
+        (2, 1, "Expected an identifier but found 'create'"),
+        (2, 8, "Expected a node type but found 'create'"),
+        (3, 1, "Cannot delete a tree"),
+        (4, 20, "Expected quoted text but found 'create'"),
+        (4, 50, "Unexpected character '?'"),
+        (5, 27, "Expected an identifier but found end of script"),
+    ]
+
+def test_bad_escape_is_kept_as_written_when_recovering() -> None:
+    statements, errors = _statements('create dialogue d1 "a\\qb"')
+    assert statements[0].args == ["d1", "a\\qb"]
+    assert [message for _, _, message in errors] == ['Invalid escape in text "a\\qb"']
+
+def test_max_errors() -> None:
+    script = "create x\n" * 10
+    errors = []
+    statements = list(iter_statements(tokenize(script), errors=errors, max_errors=3))
+    assert statements == []
+    assert [error.line for error in errors] == [1, 2, 3]
+
+def test_interpret_collects_parse_and_tree_errors() -> None:
+    errors = []
+    script = (
+        'create dialogue d1 "Hi"\n'
+        'create dialogue d1 "Again"\n'
+        'update scene s1 d1\n'
+        'create scene\n'
+        'create scene s2 d1\n'
+    )
+    tree = interpret(tokenize(script, errors=errors), errors=errors)
+    assert set(tree.dialogues) == {"d1"}
+    assert set(tree.scenes) == {"s2"}
+    assert [(error.line, error.message) for error in errors] == [
+        (2, "Dialogue d1 already exists"),
+        (3, "Cannot update scene s1, it does not exist"),
+        (5, "Expected an identifier but found 'create'"),
+    ]
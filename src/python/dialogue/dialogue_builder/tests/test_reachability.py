@@ -0,0 +1,85 @@
+"""
+Tests the precomputed reachability index against a plain BFS
+
+Random graphs, with cycles, self loops, parallel actions, actions leading
+to missing dialogues and endings, are indexed and every query is compared
+with a BFS over the same tree.
+"""
+
+import random
+from collections import deque
+
+import pytest
+
+from ..reachability import ReachabilityIndex
+from ..tree import Action, Dialogue, Scene, Tree
+
+def _tree(rnd: random.Random) -> Tree:
+    tree = Tree(root=False)
+    dialogues = [f"d{i}" for i in range(rnd.randint(1, 15))]
+    for dialogue_id in dialogues:
+        tree.add_object(dialogue_id, Dialogue({}, dialogue_id, "Hi"))
+    targets = dialogues + ["missing", None, None]
+    for i in range(rnd.randint(0, 40)):
+        tree.add_object(f"a{i}", Action({}, f"a{i}", rnd.choice(dialogues), rnd.choice(targets)))
+    for i in range(rnd.randint(1, 4)):
+        tree.add_object(f"s{i}", Scene({}, f"s{i}", rnd.choice(dialogues + ["missing"])))
+    return tree
+
+def _bfs(tree: Tree, source: str) -> dict[str, int]:
+    """
+    Returns dialogue id -> number of actions from source, for every reachable dialogue
+    """
+    distances = {source: 0}
+    pending = deque([source])
+    while pending:
+        dialogue_id = pending.popleft()
+        for action in tree.actions_for(dialogue_id):
+            if action.next_id in tree.dialogues and action.next_id not in distances:
+                distances[action.next_id] = distances[dialogue_id] + 1
+                pending.append(action.next_id)
+    return distances
+
+def _ends(tree: Tree, dialogue_id: str) -> bool:
+    return any(action.next_id is None for action in tree.actions_for(dialogue_id))
+
+@pytest.mark.parametrize("seed", range(200))
+def test_matches_bfs(seed: int) -> None:
+    tree = _tree(random.Random(seed))
+    index = ReachabilityIndex(tree)
+    for scene_id, scene in tree.scenes.items():
+        scene_index = index.scene(scene_id)
+        members = _bfs(tree, scene.dialogue_id) if scene.dialogue_id in tree.dialogues else {}
+        assert scene_index.distances == members
+        assert set(scene_index.endings) == {d for d in members if _ends(tree, d)}
+
+        for source in list(tree.dialogues) + ["missing"]:
+            if source not in members:
+                assert source not in scene_index
+                assert not scene_index.can_end(source)
+                continue
+            reachable = _bfs(tree, source)
+            assert set(scene_index.reachable(source)) == set(reachable)
+            assert scene_index.can_end(source) == any(_ends(tree, d) for d in reachable)
+            for target in tree.dialogues:
+                assert scene_index.can_reach(source, target) == (target in reachable)
+                assert scene_index.distance(source, target) == reachable.get(target)
+                route = scene_index.route(source, target)
+                if target not in reachable:
+                    assert route is None
+                    assert scene_index.next_hop(source, target) is None
+                    continue
+                assert len(route) == reachable[target]
+                # Following the route walks real actions from source to target
+                current = source
+                for action_id in route:
+                    action = tree.actions[action_id]
+                    assert action.dialogue_id == current
+                    current = action.next_id
+                assert current == target
+                assert scene_index.next_hop(source, target) == (route[0] if route else None)
+
+def test_missing_scene() -> None:
+    index = ReachabilityIndex(Tree(root=False))
+    with pytest.raises(KeyError):
+        index.scene("s0")
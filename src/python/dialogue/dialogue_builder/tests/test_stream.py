@@ -0,0 +1,45 @@
+"""
+Tests for streaming JSON arrays across chunk boundaries
+"""
+
+import io
+import json
+
+import pytest
+
+from ..stream import iter_array_items
+from ..tree import read_tree
+
+VALUES = [0.25, 1e5, -3, 12, 0.01, -2.5e-3, True, None, "x", {"next_id": 1.5}]
+
+@pytest.mark.parametrize("chunk_size", range(1, 24))
+def test_numbers_split_across_chunks(chunk_size: int) -> None:
+    document = '{"version": 1.5, "actions": [0.25, 1e5, -3, 12, 1E-2, -2.5e-3, true, null, "x", {"next_id": 1.5}], "n": 7}'
+    items = list(iter_array_items(io.StringIO(document), ("actions",), chunk_size))
+    assert items == [("actions", value) for value in VALUES]
+
+def test_metadata_number_on_chunk_boundary() -> None:
+    # The float ends exactly where the first chunk does
+    prefix = '{"padding": "' + " " * 100 + '", "version": 1'
+    document = prefix + '.5, "scenes": [1]}'
+    items = list(iter_array_items(io.StringIO(document), ("scenes",), len(prefix) + 1))
+    assert items == [("scenes", 1)]
+    assert json.loads(document)["version"] == 1.5
+
+def test_number_at_end_of_file_is_invalid() -> None:
+    with pytest.raises(ValueError):
+        list(iter_array_items(io.StringIO('{"scenes": [1.'), ("scenes",), 3))
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_read_tree_with_empty_arrays(tmp_path, stream: bool) -> None:
+    path = tmp_path / "tree.json"
+    path.write_text('{"scenes": [], "dialogues": [], "actions": []}')
+    tree = read_tree(str(path), stream=stream)
+    assert (len(tree.scenes), len(tree.dialogues), len(tree.actions)) == (0, 0, 0)
+
+@pytest.mark.parametrize("stream", [True, False])
+def test_read_tree_without_tree_data(tmp_path, stream: bool) -> None:
+    path = tmp_path / "tree.json"
+    path.write_text('{"version": 1}')
+    with pytest.raises(ValueError):
+        read_tree(str(path), stream=stream)
@@ -0,0 +1,78 @@
+"""
+Tests for incremental validation
+
+Random sequences of additions, removals and replacements are applied to a
+small tree, and after each batch the incremental result must match a full
+validation of the same tree.
+
+Usage (from src/python):
+    python -m pytest dialogue/dialogue_builder/tests
+"""
+
+import random
+
+import pytest
+
+from ..tree import Action, Dialogue, Scene, Tree
+from ..validation import CHECKS, validate
+
+def _key(issues: list) -> list[tuple[str, str, str]]:
+    return sorted((issue.check, str(issue.identifier), issue.message) for issue in issues)
+
+def _edit(tree: Tree, rnd: random.Random, ids: dict[str, list[str]]) -> None:
+    """
+    Adds, removes or replaces a few random objects of one kind
+    """
+    kind = rnd.choice(("scene", "dialogue", "action", "action"))
+    cls, index = {
+        "scene": (Scene, tree.scenes),
+        "dialogue": (Dialogue, tree.dialogues),
+        "action": (Action, tree.actions),
+    }[kind]
+    for _ in range(rnd.randint(1, 3)):
+        identifier = rnd.choice(ids[kind])
+        if identifier in index:
+            tree.remove_object(identifier, cls)
+            if rnd.random() < 0.5:
+                continue
+        if kind == "scene":
+            obj = Scene({}, identifier, rnd.choice(ids["dialogue"]))
+        elif kind == "dialogue":
+            obj = Dialogue({}, identifier, "Line")
+        else:
+            next_id = rnd.choice(ids["dialogue"] + [None])
+            obj = Action({}, identifier, rnd.choice(ids["dialogue"]), next_id)
+        tree.add_object(identifier, obj)
+
+@pytest.mark.parametrize("check", [None] + [[name] for name in CHECKS])
+def test_incremental_matches_full(check: list[str]) -> None:
+    for seed in range(150):
+        rnd = random.Random(seed)
+        ids = {
+            "scene": [f"s{i}" for i in range(rnd.randint(1, 5))],
+            "dialogue": [f"d{i}" for i in range(rnd.randint(3, 15))],
+            "action": [f"a{i}" for i in range(rnd.randint(3, 30))],
+        }
+        tree = Tree(root=False)
+        validate(tree, check, incremental=True)
+        for step in range(40):
+            _edit(tree, rnd, ids)
+            incremental = _key(validate(tree, check, incremental=True))
+            assert incremental == _key(validate(tree, check)), (seed, step)
+
+def test_replacing_a_dialogue_keeps_its_links() -> None:
+    tree = Tree(root=False)
+    tree.add_object("s", Scene({}, "s", "d1"))
+    tree.add_object("d1", Dialogue({}, "d1", "Hello"))
+    tree.add_object("d2", Dialogue({}, "d2", "Bye"))
+    tree.add_object("a1", Action({}, "a1", "d1", "d2"))
+    tree.add_object("a2", Action({}, "a2", "d2", None))
+    assert validate(tree, incremental=True) == []
+
+    tree.remove_object("d2", Dialogue)
+    messages = [issue.message for issue in validate(tree, incremental=True)]
+    assert "Action a1 leads to missing dialogue d2" in messages
+    assert "Action a2 belongs to missing dialogue d2" in messages
+
+    tree.add_object("d2", Dialogue({}, "d2", "Goodbye"))
+    assert validate(tree, incremental=True) == []
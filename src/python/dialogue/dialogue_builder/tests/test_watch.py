@@ -0,0 +1,57 @@
+"""
+Tests for the scenes revalidated by Watcher.rebuild
+"""
+
+from ..validation import validate
+from ..watch import Watcher
+
+def test_deleting_a_file_revalidates_scenes_leading_into_it(tmp_path) -> None:
+    intro = tmp_path / "a.txt"
+    shop = tmp_path / "b.txt"
+    intro.write_text('create scene intro d1\ncreate dialogue d1 "Hi"\ncreate action a1 d1 shop\n')
+    shop.write_text('create dialogue shop "Buy"\ncreate action a2 shop end\n')
+
+    with Watcher(str(tmp_path), workers=1, use_inotify=False) as watcher:
+        shop.unlink()
+        watcher.rebuild(str(shop))
+        expected = [issue.message for issue in validate(watcher.tree)]
+        assert expected == ["Action a1 leads to missing dialogue shop"]
+        assert [issue.message for issue in watcher.issues[str(intro)]] == expected
+
+        shop.write_text('create dialogue shop "Buy"\ncreate action a2 shop end\n')
+        watcher.rebuild(str(shop))
+        assert watcher.issues[str(intro)] == []
+
+def test_undecodable_save_is_recorded_and_changes_nothing(tmp_path) -> None:
+    script = tmp_path / "a.txt"
+    script.write_text('create scene intro d1\ncreate dialogue d1 "Hi"\ncreate action a1 d1 end\n')
+
+    with Watcher(str(tmp_path), workers=1, use_inotify=False) as watcher:
+        script.write_bytes(b'create dialogue d2 "\xff\xfe"\n')
+        assert watcher.poll() == [str(script)]
+        assert isinstance(watcher.errors[str(script)], UnicodeDecodeError)
+        assert set(watcher.tree.dialogues) == {"d1"}
+
+        script.write_text('create scene intro d2\ncreate dialogue d2 "Hi"\ncreate action a1 d2 end\n')
+        assert watcher.rebuild(str(script)) == []
+        assert watcher.errors == {}
+        assert set(watcher.tree.dialogues) == {"d2"}
+
+def test_scenes_starting_in_another_file_are_revalidated(tmp_path) -> None:
+    scenes = tmp_path / "a.txt"
+    dialogues = tmp_path / "b.txt"
+    scenes.write_text("create scene intro d1\ncreate scene outro d1\n")
+    dialogues.write_text('create dialogue d1 "Hi"\ncreate action a1 d1 end\n')
+
+    with Watcher(str(tmp_path), workers=1, use_inotify=False) as watcher:
+        dialogues.write_text('create dialogue d2 "Hi"\ncreate action a1 d2 end\n')
+        watcher.rebuild(str(dialogues))
+        messages = sorted(issue.message for issue in watcher.issues[str(dialogues)])
+        assert messages == [
+            "Scene intro starts at missing dialogue d1",
+            "Scene outro starts at missing dialogue d1",
+        ]
+
+        scenes.write_text("create scene intro d2\n")
+        watcher.rebuild(str(scenes))
+        assert watcher.issues[str(scenes)] == []
@@ -0,0 +1,58 @@
+"""
+Tests for incremental writing
+
+Random sequences of additions, removals and replacements are applied to a
+small tree, and after each batch the file a TreeWriter rewrote must hold
+exactly the bytes of a full write_sorted of the same tree.
+"""
+
+import io
+import random
+
+from ..tree import Action, Dialogue, Scene, Tree
+from ..writer import TreeWriter, write_sorted
+
+def _edit(tree: Tree, rnd: random.Random, ids: dict[str, list[str]]) -> None:
+    """
+    Adds, removes or replaces a few random objects of one kind
+    """
+    kind = rnd.choice(("scene", "dialogue", "action", "action"))
+    cls, index = {
+        "scene": (Scene, tree.scenes),
+        "dialogue": (Dialogue, tree.dialogues),
+        "action": (Action, tree.actions),
+    }[kind]
+    for _ in range(rnd.randint(1, 3)):
+        identifier = rnd.choice(ids[kind])
+        if identifier in index:
+            tree.remove_object(identifier, cls)
+            if rnd.random() < 0.5:
+                continue
+        if kind == "scene":
+            obj = Scene({}, identifier, rnd.choice(ids["dialogue"]))
+        elif kind == "dialogue":
+            # Texts of different lengths, so lines grow and shrink
+            obj = Dialogue({}, identifier, "Line" * rnd.randint(0, 3))
+        else:
+            next_id = rnd.choice(ids["dialogue"] + [None])
+            obj = Action({}, identifier, rnd.choice(ids["dialogue"]), next_id)
+        tree.add_object(identifier, obj)
+
+def test_incremental_matches_full(tmp_path) -> None:
+    filename = tmp_path / "tree.json"
+    for seed in range(100):
+        rnd = random.Random(seed)
+        ids = {
+            "scene": [f"s{i}" for i in range(rnd.randint(1, 8))],
+            "dialogue": [f"d{i}" for i in range(rnd.randint(2, 10))],
+            "action": [f"a{i}" for i in range(rnd.randint(2, 20))],
+        }
+        tree = Tree(root=False)
+        with TreeWriter(tree, str(filename)) as writer:
+            writer.write()
+            for step in range(30):
+                _edit(tree, rnd, ids)
+                writer.write()
+                expected = io.BytesIO()
+                write_sorted(tree, expected)
+                assert filename.read_bytes() == expected.getvalue(), (seed, step)
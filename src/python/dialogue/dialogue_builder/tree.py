@@ -52,13 +52,27 @@ Dialogue 2
     Reply 2
 
 Example Usage:
-    root = Scene(1, 1)
-    tree = Tree(root)
-    next_scene = tree.traverse(2)
+    tree = Tree()
+    next_dialogue = tree.traverse(action_id)
+
+For repeated questions such as "can the player still reach this ending",
+build a ReachabilityIndex (see reachability.py) once and query it instead
 """
 
-import json
-from dataclasses import dataclass
+import gc
+import sys
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field, fields
+from itertools import groupby, islice
+from operator import attrgetter, itemgetter, methodcaller
+from typing import Any, Callable, Iterable, Iterator
+
+from .conditions import CONDITION_KEY, ConditionCompiler
+from .serializer import get_serializer
+from .stream import iter_array_items
+from .validation import Issue, validate
+from .writer import write_sorted
 
 """
 Class definitions
@@ -71,8 +85,39 @@ These objects are:
 - Action
 
 These objects work together to form a tree of dialogue options
+
+The node classes are slotted to keep large trees small in memory:
+identifiers are interned so repeated ids share one string, and an empty
+ctx is replaced by the shared, read-only EMPTY_CTX
 """
-@dataclass(frozen=True)
+class _FrozenCtx(dict):
+    """
+    A dict that refuses modification, used for the shared empty context
+    """
+    def _readonly(self, *args, **kwargs):
+        raise TypeError("EMPTY_CTX is shared and cannot be modified")
+
+    __setitem__ = __delitem__ = _readonly
+    clear = pop = popitem = setdefault = update = _readonly
+    __ior__ = _readonly
+
+    def __reduce__(self):
+        return "EMPTY_CTX"
+
+EMPTY_CTX = _FrozenCtx()
+
+def _compact(obj: any, *fields: str) -> None:
+    """
+    Shares the empty context and interns the given identifier fields of a node
+    """
+    if not obj.ctx and obj.ctx is not EMPTY_CTX:
+        object.__setattr__(obj, "ctx", EMPTY_CTX)
+    for name in fields:
+        value = getattr(obj, name)
+        if type(value) is str:
+            object.__setattr__(obj, name, sys.intern(value))
+
+@dataclass(frozen=True, slots=True)
 class Action:
     """
     This class is used to store the information for an Action
@@ -87,7 +132,10 @@ class Action:
     dialogue_id: str
     next_id: str
 
-@dataclass(frozen=True)
+    def __post_init__(self) -> None:
+        _compact(self, "action_id", "dialogue_id", "next_id")
+
+@dataclass(frozen=True, slots=True)
 class Dialogue:
     """
     This class is used to store the information for a Dialogue.
@@ -105,9 +153,12 @@ class Dialogue:
     ctx: dict
     dialogue_id: str
     text: str
-    actions: list[Action]
+    actions: list[Action] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        _compact(self, "dialogue_id")
 
-@dataclass(frozen=True)
+@dataclass(frozen=True, slots=True)
 class Scene:
     """
     This class is used to store the information for a Scene.
@@ -125,9 +176,152 @@ class Scene:
             Used to determine if the scene is connected to another scene
     """
     ctx: dict
-    scene_id = str
-    dialogue_id = str
-    dialogues = list[Dialogue]
+    scene_id: str
+    dialogue_id: str
+    dialogues: list[Dialogue] = field(default_factory=list)
+
+    def __post_init__(self) -> None:
+        _compact(self, "scene_id", "dialogue_id")
+
+# Top level keys of tree data, in the order their objects are added
+_tags = ("scenes", "dialogues", "actions")
+
+# The fields of each kind of node in tree data, declared once for every decoder:
+#   tag -> (class, kind, required fields, optional fields and their defaults)
+# The first required field is the identifier. Every item may also hold a ctx
+_schema = {
+    "scenes": (Scene, "scene", ("scene_id", "dialogue_id"), ()),
+    "dialogues": (Dialogue, "dialogue", ("dialogue_id", "text"), ()),
+    "actions": (Action, "action", ("action_id", "dialogue_id"), (("next_id", None),)),
+}
+
+# Items are decoded this many at a time, which bounds the memory used when streaming
+_BATCH = 4096
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pauses the cyclic garbage collector, which would otherwise scan the
+    growing tree again and again while millions of nodes are created
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _make_nodes(cls: type, ctxs: list[dict], columns: dict[str, list]) -> list[any]:
+    """
+    Creates nodes by filling their slots a field at a time, skipping the
+    dataclass __init__ and __post_init__ but compacting the same way
+
+    Args:
+        cls: type
+            Scene, Dialogue or Action
+        ctxs: list[dict]
+            The ctx of each node, None or empty for EMPTY_CTX
+        columns: dict[str, list]
+            Field name -> the value of that field for each node
+    Returns:
+        list
+            The nodes, in order
+    """
+    new = object.__new__
+    intern = sys.intern
+    nodes = [new(cls) for _ in ctxs]
+    deque(map(cls.ctx.__set__, nodes, [ctx or EMPTY_CTX for ctx in ctxs]), maxlen=0)
+    for name, values in columns.items():
+        if name.endswith("_id"):
+            # Identifiers are interned, like _compact does
+            values = [intern(value) if type(value) is str else value for value in values]
+        deque(map(getattr(cls, name).__set__, nodes, values), maxlen=0)
+    for f in fields(cls):
+        if f.name != "ctx" and f.name not in columns:
+            setter = getattr(cls, f.name).__set__
+            for node in nodes:
+                setter(node, f.default_factory())
+    return nodes
+
+def decode_items(tag: str, items: Iterable[dict]) -> Iterator[tuple[any, any]]:
+    """
+    Creates the objects of one kind from their dictionary form
+
+    Items are read in batches and each field is pulled out of a whole batch
+    at once, so no per object constructor runs
+
+    Args:
+        tag: str
+            The key the items were stored under ("scenes", "dialogues" or "actions")
+        items: Iterable[dict]
+            The fields of each object
+    Returns:
+        Generator of tuples of the form (identifier, object)
+    Raises:
+        ValueError: If a required field is missing, or a ctx is not an object or null
+    """
+    cls, _, required, optional = _schema[tag]
+    items = iter(items)
+    while batch := list(islice(items, _BATCH)):
+        try:
+            columns = {name: list(map(itemgetter(name), batch)) for name in required}
+            for name, default in optional:
+                columns[name] = list(map(methodcaller("get", name, default), batch))
+            ctxs = list(map(methodcaller("get", "ctx"), batch))
+        except KeyError as e:
+            raise ValueError(f"Data is not valid, missing field {e}") from e
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Data is not valid, expected an object in {tag}") from e
+        if not all(ctx is None or type(ctx) is dict for ctx in ctxs):
+            raise ValueError(f"Data is not valid, ctx must be an object or null in {tag}")
+        yield from zip(columns[required[0]], _make_nodes(cls, ctxs, columns))
+
+def _typed_decoder() -> Callable[[bytes], Iterator[tuple[str, Iterator]]]:
+    """
+    Builds a decoder that reads tree data into msgspec structs generated
+    from _schema, so no dict is created for the items
+
+    Returns:
+        A function of the file content returning (tag, objects) pairs
+    Raises:
+        ImportError: If msgspec is not installed
+    """
+    import msgspec
+
+    structs = {}
+    for tag, (cls, _, required, optional) in _schema.items():
+        structs[tag] = msgspec.defstruct(
+            f"{cls.__name__}Data",
+            [(name, Any) for name in required]
+            + [(name, Any, default) for name, default in optional]
+            + [("ctx", dict | None, None)],
+        )
+    data_struct = msgspec.defstruct(
+        "TreeData", [(tag, list[structs[tag]] | None, None) for tag in _tags]
+    )
+    decoder = msgspec.json.Decoder(data_struct)
+
+    def objects(tag: str, items: list) -> Iterator[tuple[any, any]]:
+        cls, _, required, optional = _schema[tag]
+        names = required + tuple(name for name, _ in optional)
+        columns = {name: list(map(attrgetter(name), items)) for name in names}
+        ctxs = list(map(attrgetter("ctx"), items))
+        # The structs are no longer needed once their fields are pulled out
+        items.clear()
+        return zip(columns[required[0]], _make_nodes(cls, ctxs, columns))
+
+    def decode(content: bytes) -> Iterator[tuple[str, Iterator]]:
+        try:
+            data = decoder.decode(content)
+        except msgspec.DecodeError as e:
+            raise ValueError(f"Data is not valid, {e}") from None
+        lists = [(tag, getattr(data, tag)) for tag in _tags]
+        if all(items is None for _, items in lists):
+            raise ValueError("Data is not valid, please check for errors")
+        for tag, items in lists:
+            yield tag, objects(tag, items or [])
+    return decode
 
 class Tree:
     """
@@ -142,28 +336,43 @@ class Tree:
         Dialogue trees are composed of every possible dialogue that could occur in a scene
         "Trees" in this instance are really just a list of dialogue nodes that compose a scene
     """
-    def __init__(self, data: dict=None) -> None:
+    def __init__(self, data: dict=None, root: bool=True) -> None:
         """
         Initializes the Tree object
         
         If data is present, it will be used to populate the tree
         It will be parsed and placed into the appropriate data structures
+        Otherwise a root scene is created, unless root is False
         """
         
         self.tree = {} # To be populated
+        self.name = None # Set by scripts with: create tree "name"
+
+        # All are dicts of
+        #   identifier -> object
+        self.scenes = {}
+        self.dialogues = {}
+        self.actions = {}
+
+        # Actions grouped by the dialogue they belong to
+        #   dialogue identifier -> {action identifier -> action}
+        self._dialogue_actions = {}
+
+        # Sets handed out by track_changes, each collecting (kind, identifier)
+        # for every object added since its owner last cleared it
+        self._trackers = []
 
-        # All are list of tuples
-        #   (id, object)
-        self.scenes = []
-        self.dialogues = []
-        self.actions = []
+        # Compiled ctx conditions, (kind, identifier) -> function of the game state
+        self._conditions = {}
+        self._compiler = ConditionCompiler()
 
         if data: # Initialize tree with user data
-            parsed = self.parse_data(data)
-            for identifier, obj in parsed:
-                self.add_object(identifier, obj)
-        else: # Initialize root
-            self.scenes.append((1, Scene({}, 1, 1)))
+            if not any(tag in data for tag in _tags):
+                raise ValueError("Data is not valid, please check for errors")
+            for tag in _tags:
+                self.add_decoded(tag, decode_items(tag, data.get(tag, ())))
+        elif root: # Initialize root
+            self.add_object(1, Scene({}, 1, 1))
     
     def parse_data(self, data: dict) -> list[tuple[str, any]]:
         """
@@ -179,18 +388,14 @@ class Tree:
             ValueError: If the data is not valid
         """
         # Read in data and parse based on tag (Scene, Dialogue, Action)
-        # Add these to appropriate data structures
-        if "scenes" in data:
-            for scene in data["scenes"]:
-                self.scenes.append((scene["scene_id"], Scene(scene)))
-        if "dialogues" in data:
-            for dialogue in data["dialogues"]:
-                self.dialogues.append((dialogue["dialogue_id"], Dialogue(dialogue)))
-        if "actions" in data:
-            for action in data["actions"]:
-                self.actions.append((action["action_id"], Action(action)))
-        else:
+        if not any(tag in data for tag in _tags):
             raise ValueError("Data is not valid, please check for errors")
+
+        return [
+            pair
+            for tag in _tags
+            for pair in decode_items(tag, data.get(tag, ()))
+        ]
     
     def add_object(self, identifier: str, obj: any) -> None:
         """
@@ -205,15 +410,244 @@ class Tree:
             None
         Raises:
             TypeError: If the object is not a valid type
+            ValueError: If an object of the same type already uses the identifier,
+                or its ctx holds a condition that does not compile
         """
         if isinstance(obj, Scene):
-            self.scenes.append((identifier, obj))
+            kind, index = "scene", self.scenes
         elif isinstance(obj, Dialogue):
-            self.dialogues.append((identifier, obj))
+            kind, index = "dialogue", self.dialogues
         elif isinstance(obj, Action):
-            self.actions.append((identifier, obj))
+            kind, index = "action", self.actions
+        else:
+            raise TypeError("Object is not a valid type")
+
+        if identifier in index:
+            raise ValueError(f"{type(obj).__name__} {identifier} already exists")
+        condition = obj.ctx.get(CONDITION_KEY)
+        if condition is not None:
+            self._conditions[(kind, identifier)] = self._compiler.compile(condition)
+        index[identifier] = obj
+        if isinstance(obj, Action):
+            self._dialogue_actions.setdefault(obj.dialogue_id, {})[identifier] = obj
+        self._touch(kind, identifier)
+
+    def add_decoded(self, tag: str, objects: Iterable[tuple[any, any]]) -> None:
+        """
+        Adds many objects of one kind, as produced by decode_items
+
+        This is add_object without the per object type dispatch, for loading
+        whole files. Objects are added in batches with the garbage collector
+        paused, as the nodes hold no reference cycles for it to find
+
+        Args:
+            tag: str
+                "scenes", "dialogues" or "actions"
+            objects: Iterable[tuple[any, any]]
+                Pairs of the form (identifier, object)
+        Raises:
+            ValueError: If an object of the same type already uses an identifier,
+                or its ctx holds a condition that does not compile
+        """
+        cls, kind, _, _ = _schema[tag]
+        index = {"scene": self.scenes, "dialogue": self.dialogues, "action": self.actions}[kind]
+        grouped = self._dialogue_actions if kind == "action" else None
+        objects = iter(objects)
+        with _gc_paused():
+            while batch := list(islice(objects, _BATCH)):
+                identifiers = list(map(itemgetter(0), batch))
+                if not index.keys().isdisjoint(identifiers) or len(set(identifiers)) != len(batch):
+                    seen = set()
+                    for identifier in identifiers:
+                        if identifier in index or identifier in seen:
+                            raise ValueError(f"{cls.__name__} {identifier} already exists")
+                        seen.add(identifier)
+                index.update(batch)
+                for identifier, obj in batch:
+                    if obj.ctx:
+                        condition = obj.ctx.get(CONDITION_KEY)
+                        if condition is not None:
+                            self._conditions[(kind, identifier)] = self._compiler.compile(condition)
+                if grouped is not None:
+                    for identifier, obj in batch:
+                        owned = grouped.get(obj.dialogue_id)
+                        if owned is None:
+                            owned = grouped[obj.dialogue_id] = {}
+                        owned[identifier] = obj
+                if self._trackers:
+                    for identifier, _ in batch:
+                        self._touch(kind, identifier)
+
+    def remove_object(self, identifier: str, obj_type: type) -> any:
+        """
+        Removes an object from the tree data structure
+        
+        Args:
+            identifier: str
+                The identifier for the object
+            obj_type: type
+                The type of the object, Scene, Dialogue or Action
+        Returns:
+            any
+                The removed object
+        Raises:
+            TypeError: If the type is not a valid type
+            KeyError: If no object of the type uses the identifier
+        """
+        if obj_type is Scene:
+            kind, index = "scene", self.scenes
+        elif obj_type is Dialogue:
+            kind, index = "dialogue", self.dialogues
+        elif obj_type is Action:
+            kind, index = "action", self.actions
         else:
             raise TypeError("Object is not a valid type")
+
+        obj = index.pop(identifier)
+        self._conditions.pop((kind, identifier), None)
+        if obj_type is Action:
+            owned = self._dialogue_actions[obj.dialogue_id]
+            del owned[identifier]
+            if not owned:
+                del self._dialogue_actions[obj.dialogue_id]
+        self._touch(kind, identifier)
+        return obj
+
+    def available_actions(self, dialogue_id: str, state: dict) -> list[Action]:
+        """
+        Lists the actions of a dialogue that the player can currently choose
+        
+        An action is available if its own condition holds and, when it leads
+        to another dialogue, that dialogue's condition holds too.
+        Objects without a condition are always available
+        
+        Args:
+            dialogue_id: str
+                The identifier of the dialogue
+            state: dict
+                The game state the conditions are evaluated against
+        Returns:
+            list[Action]
+                The available actions, in insertion order
+        """
+        conditions = self._conditions
+        available = []
+        for identifier, action in self._dialogue_actions.get(dialogue_id, {}).items():
+            check = conditions.get(("action", identifier))
+            if check is not None and not check(state):
+                continue
+            if action.next_id is not None:
+                check = conditions.get(("dialogue", action.next_id))
+                if check is not None and not check(state):
+                    continue
+            available.append(action)
+        return available
+
+    def traverse(self, action_id: str) -> Dialogue:
+        """
+        Follows an action to the dialogue it leads to
+        
+        Args:
+            action_id: str
+                The identifier of the action the player chose
+        Returns:
+            Dialogue
+                The next dialogue, or None if the action ends the conversation
+        Raises:
+            KeyError: If the action or the dialogue it leads to does not exist
+        """
+        next_id = self.actions[action_id].next_id
+        if next_id is None:
+            return None
+        return self.dialogues[next_id]
+
+    def track_changes(self) -> set[tuple[str, any]]:
+        """
+        Starts collecting the objects that change in the tree
+
+        Every later change adds (kind, identifier) to the returned set,
+        where kind is "scene", "dialogue" or "action". The caller clears
+        the set once it has handled the changes
+
+        Returns:
+            set[tuple[str, any]]
+                The set changes are collected into
+        """
+        changes = set()
+        self._trackers.append(changes)
+        return changes
+
+    def untrack_changes(self, changes: set[tuple[str, any]]) -> None:
+        """
+        Stops collecting changes into a set returned by track_changes
+        """
+        self._trackers = [tracker for tracker in self._trackers if tracker is not changes]
+
+    def _touch(self, kind: str, identifier: any) -> None:
+        """
+        Records a change to an object in every tracked change set
+        """
+        for changes in self._trackers:
+            changes.add((kind, identifier))
+
+    def get_scene(self, scene_id: str) -> Scene:
+        """
+        Looks up a scene by identifier
+
+        Args:
+            scene_id: str
+                The identifier of the scene
+        Returns:
+            Scene
+                The scene with the given identifier
+        Raises:
+            KeyError: If no scene has the identifier
+        """
+        return self.scenes[scene_id]
+
+    def get_dialogue(self, dialogue_id: str) -> Dialogue:
+        """
+        Looks up a dialogue by identifier
+
+        Args:
+            dialogue_id: str
+                The identifier of the dialogue
+        Returns:
+            Dialogue
+                The dialogue with the given identifier
+        Raises:
+            KeyError: If no dialogue has the identifier
+        """
+        return self.dialogues[dialogue_id]
+
+    def get_action(self, action_id: str) -> Action:
+        """
+        Looks up an action by identifier
+
+        Args:
+            action_id: str
+                The identifier of the action
+        Returns:
+            Action
+                The action with the given identifier
+        Raises:
+            KeyError: If no action has the identifier
+        """
+        return self.actions[action_id]
+
+    def actions_for(self, dialogue_id: str) -> list[Action]:
+        """
+        Lists the actions that belong to a dialogue, in insertion order
+
+        Args:
+            dialogue_id: str
+                The identifier of the dialogue
+        Returns:
+            list[Action]
+                The actions of the dialogue, empty if it has none
+        """
+        actions = self._dialogue_actions.get(dialogue_id)
+        return list(actions.values()) if actions else []
     
     def populate_tree(self) -> None:
         """
@@ -226,23 +660,23 @@ class Tree:
         Raises:
             None
         """
-        # TODO: check this code for errors
-        for scene_id, scene in self.scenes:
+        # Dialogues and actions are looked up through the indexes kept by
+        # add_object, so each node is visited once
+        for scene_id, scene in self.scenes.items():
+            dialogues = {}
+            dialogue = self.dialogues.get(scene.dialogue_id)
+            if dialogue is not None:
+                dialogues[scene.dialogue_id] = {
+                    "text": dialogue.text,
+                    "actions": {
+                        action_id: {"next_id": action.next_id}
+                        for action_id, action in self._dialogue_actions.get(scene.dialogue_id, {}).items()
+                    }
+                }
             self.tree[scene_id] = {
                 "dialogue_id": scene.dialogue_id,
-                "dialogues": {}
+                "dialogues": dialogues
             }
-            for dialogue_id, dialogue in self.dialogues:
-                if dialogue.dialogue_id == scene.dialogue_id:
-                    self.tree[scene_id]["dialogues"][dialogue_id] = {
-                        "text": dialogue.text,
-                        "actions": {}
-                    }
-                    for action_id, action in self.actions:
-                        if action.dialogue_id == dialogue_id:
-                            self.tree[scene_id]["dialogues"][dialogue_id]["actions"][action_id] = {
-                                "next_id": action.next_id
-                            }
 
 """
 Utility Functions
@@ -261,6 +695,10 @@ parse: parses user script for tree creation
 def write_tree(tree: Tree, filename: str) -> None:
     """
     Writes the Tree structure to a JSON file
+
+    Scenes are written one per line, sorted by id, with sorted keys, so the
+    same tree always produces the same file. See writer.TreeWriter to
+    rewrite only the scenes that changed
     
     Args:
         tree: Tree
@@ -272,27 +710,73 @@ def write_tree(tree: Tree, filename: str) -> None:
     Raises:
         None
     """
-    tree.populate_tree()
-    data = tree.tree
-    
-    # Write data to file
-    json.dump(data, open(filename, "w"))
+    with open(filename, "wb") as f:
+        write_sorted(tree, f)
 
-def read_tree(filename: str) -> Tree:
+def read_tree(filename: str, stream: bool=True) -> Tree:
     """
     Reads the Tree structure from a JSON file
     
+    By default the "scenes", "dialogues" and "actions" arrays are streamed
+    one item at a time into the tree, so the whole document is never held
+    in memory. Otherwise the file is decoded at once, which is quicker but
+    holds the decoded document while the tree is built. With msgspec
+    installed it is decoded straight into typed structs declared by the
+    schema, otherwise by the fastest JSON backend installed (see serializer)
+
+    Either way, objects are created from the schema by filling their slots
+    directly and added to the tree in bulk
+    
     Args:
         filename: str
             The name of the file to read from
+        stream: bool
+            Whether to stream the file rather than decode it at once
     Returns:
         Tree
             The tree read from the file
     Raises:
-        None
+        ValueError: If the file is not valid tree data
     """
-    data = json.load(open(filename, "r"))
-    return Tree(data)
+    if not stream:
+        decode = _get_typed_decoder()
+        if decode is None:
+            with _gc_paused():
+                data = get_serializer().load(filename)
+            if not isinstance(data, dict):
+                raise ValueError("Data is not valid, please check for errors")
+            return Tree(data, root=False)
+        tree = Tree(root=False)
+        with open(filename, "rb") as f:
+            content = f.read()
+        with _gc_paused():
+            for tag, objects in decode(content):
+                tree.add_decoded(tag, objects)
+        return tree
+
+    tree = Tree(root=False)
+    found = set()
+    with open(filename, "r", buffering=1 << 16) as f:
+        # Consecutive items of one kind are decoded and added as a batch
+        items = iter_array_items(f, _tags, found=found)
+        for tag, group in groupby(items, key=itemgetter(0)):
+            tree.add_decoded(tag, decode_items(tag, (item for _, item in group)))
+    if not found:
+        raise ValueError("Data is not valid, please check for errors")
+    return tree
+
+_typed = []
+
+def _get_typed_decoder() -> Callable[[bytes], Iterator[tuple[str, Iterator]]]:
+    """
+    Returns the msgspec decoder, built on first use, or None without msgspec
+    """
+    if not _typed:
+        try:
+            _typed.append(_typed_decoder())
+        except ImportError:
+            _typed.append(None)
+    return _typed[0]
 
 def create_tree(filename: str) -> Tree:
     """
@@ -309,19 +793,24 @@ def create_tree(filename: str) -> Tree:
     """
     # TODO: add
 
-def validate_tree(tree: Tree, check: list[str]) -> None:
+def validate_tree(tree: Tree, check: list[str]=None, incremental: bool=False) -> list[Issue]:
     """
     Validates the Tree structure
     
+    See validation.py for what each check looks for
+    
     Args:
         tree: Tree
             The tree to validate
         check: list[str]
-            The list of checks to perform
+            The list of checks to perform, any of "references", "reachability",
+            "dead_ends" and "cycles", or all of them if empty
+        incremental: bool
+            Whether to only recheck what changed since the last incremental run
     Returns:
-        None
+        list[Issue]
+            The problems found in the tree
     Raises:
-        None
+        ValueError: If a check is not known
     """
-    # TODO: figure way to validate based on user input
-    #   (i.e. if user wants to validate for a specific scene)
+    return validate(tree, check, incremental)
@@ -0,0 +1,695 @@
+"""
+This module is used to validate the structure of a Dialogue Tree
+
+Validation is a single linear pass over the tree indexes.
+The checks that can be selected are:
+
+references
+- Scenes whose starting dialogue does not exist
+- Actions whose dialogue_id or next_id does not exist
+reachability
+- Dialogues that cannot be reached from the starting dialogue of any scene
+dead_ends
+- Dialogues that have no actions, so the player has no way to continue
+cycles
+- Dialogues from which the conversation can never end, because every
+  path from them loops back without reaching a final action
+
+An action with a next_id of None ends the conversation.
+
+A full or scoped run keeps nothing once it is done. Incremental validation
+instead keeps the graph built by the previous run, with reverse indexes, and
+rechecks only the objects added since then, along with the nodes whose
+result depends on them: the dialogues waiting on a new dialogue id, the
+predecessors that may have gained or lost a way to end, and everything newly
+reachable. Objects are learned about through Tree.track_changes.
+A removed or replaced object is first taken out of the graph: its counts
+and edges are given back, the nodes that referred to it wait for it again,
+and reachability and cycles are re-derived only for the dialogues that lost
+an edge or a way to end.
+
+Validation can also be scoped to some scenes. Only those scenes and the
+dialogues and actions reachable from their starting dialogues are checked,
+so the cost follows the size of the scenes rather than of the tree.
+
+Example Usage:
+    for issue in validate(tree, ["references", "cycles"]):
+        print(issue.check, issue.identifier, issue.message)
+
+    # After editing the tree, only the edit is revalidated
+    issues = validate(tree, incremental=True)
+
+    # Only the scenes an edit touched
+    issues = validate(tree, scenes=["tavern"])
+"""
+
+import gc
+import weakref
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Iterator
+
+CHECKS = ("references", "reachability", "dead_ends", "cycles")
+
+@dataclass(frozen=True, slots=True)
+class Issue:
+    """
+    This class is used to store a problem found while validating a tree
+
+    Data:
+        check: str
+            The check that found the problem
+        identifier: str
+            The identifier of the offending scene, dialogue or action
+        message: str
+            A description of the problem
+    """
+    check: str
+    identifier: str
+    message: str
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    """
+    Pauses the cyclic garbage collector, which would otherwise rescan the
+    growing graph again and again while it is built
+    """
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+def _checks(check: list[str]) -> frozenset[str]:
+    """
+    Returns the set of checks to run, all of them if check is empty
+
+    Raises:
+        ValueError: If a check is not known
+    """
+    if not check:
+        return frozenset(CHECKS)
+    unknown = [name for name in check if name not in CHECKS]
+    if unknown:
+        raise ValueError(f"Unknown checks {unknown}, expected some of {list(CHECKS)}")
+    return frozenset(check)
+
+class ValidationState:
+    """
+    This class holds the dialogue graph and the issues of a validated tree,
+    so that later changes can be validated on their own
+
+    Data:
+        checks: frozenset[str]
+            The checks this state computes
+        issues: dict
+            (check, identifier, reason) -> Issue for every current problem
+    """
+    def __init__(self, checks: frozenset[str]) -> None:
+        self.checks = checks
+        self._reset()
+
+    def _reset(self) -> None:
+        self.issues = {}
+
+        # Scene id -> starting dialogue id, and action id -> (dialogue_id, next_id),
+        # as they were when validated
+        self._starts = {}
+        self._actions = {}
+        # Dialogue id -> scenes starting there, actions counted against it,
+        # and actions leading to it
+        self._scene_starts = {}
+        self._attached = {}
+        self._referrers = {}
+
+        # Per dialogue: actions owned, and ways to end (final or dangling actions)
+        self._owned = {}
+        self._exits = {}
+        self._successors = {}
+        self._predecessors = {}
+
+        # Missing dialogue id -> [(reason, scene or action id)] waiting for it
+        self._waiting = {}
+        # Actions counted as exits because their next_id does not exist yet
+        self._dangling = set()
+
+        self._reached = set()
+        self._ending = set()
+
+    def _issue(self, check: str, identifier: any, reason: str, message: str) -> None:
+        if check in self.checks:
+            self.issues[(check, identifier, reason)] = Issue(check, identifier, message)
+
+    def _resolve(self, check: str, identifier: any, reason: str) -> None:
+        self.issues.pop((check, identifier, reason), None)
+
+    def result(self) -> list[Issue]:
+        """
+        Returns the current issues, grouped by check
+        """
+        order = {check: position for position, check in enumerate(CHECKS)}
+        return sorted(self.issues.values(), key=lambda issue: order[issue.check])
+
+    def rebuild(self, tree: any) -> None:
+        """
+        Validates the whole tree from scratch, keeping the graph for later runs
+        """
+        self._reset()
+        with _gc_paused():
+            self._apply(tree, list(tree.dialogues), list(tree.actions), list(tree.scenes))
+
+    def update(self, tree: any, changes: set[tuple[str, any]]) -> None:
+        """
+        Validates the objects added, removed or replaced since the last run
+
+        Objects validated before are taken out of the graph first, then the
+        ones in the tree now are added back
+
+        Args:
+            tree: Tree
+                The tree that was validated before
+            changes: set[tuple[str, any]]
+                The (kind, identifier) pairs collected by Tree.track_changes
+        """
+        known = {"scene": self._starts, "dialogue": self._owned, "action": self._actions}
+        index = {"scene": tree.scenes, "dialogue": tree.dialogues, "action": tree.actions}
+        old = {"scene": [], "dialogue": [], "action": []}
+        new = {"scene": [], "dialogue": [], "action": []}
+        for kind, identifier in changes:
+            if identifier in known[kind]:
+                old[kind].append(identifier)
+            if identifier in index[kind]:
+                new[kind].append(identifier)
+
+        # Dialogues that lost a way to end, and that lost an edge or scene into them
+        touched = set()
+        lost = []
+        for action_id in old["action"]:
+            self._retract_action(action_id, touched, lost)
+        for scene_id in old["scene"]:
+            self._retract_scene(scene_id, lost)
+        for dialogue_id in old["dialogue"]:
+            self._retract_dialogue(dialogue_id, touched, lost)
+        if "reachability" in self.checks:
+            self._unreach(lost)
+        touched = {dialogue_id for dialogue_id in touched if dialogue_id in self._owned}
+        self._apply(tree, new["dialogue"], new["action"], new["scene"], touched)
+
+    def _wait(self, dialogue_id: any, reason: str, identifier: any) -> None:
+        self._waiting.setdefault(dialogue_id, []).append((reason, identifier))
+
+    def _unwait(self, dialogue_id: any, reason: str, identifier: any) -> None:
+        waiting = self._waiting.get(dialogue_id)
+        if waiting and (reason, identifier) in waiting:
+            waiting.remove((reason, identifier))
+            if not waiting:
+                del self._waiting[dialogue_id]
+
+    def _retract_action(self, action_id: any, touched: set, lost: list) -> None:
+        """
+        Takes an action validated before out of the graph
+        """
+        owner, next_id = self._actions.pop(action_id)
+        self._resolve("references", action_id, "next")
+        self._resolve("references", action_id, "owner")
+        if next_id is not None:
+            self._unwait(next_id, "next", action_id)
+            self._referrers[next_id].discard(action_id)
+        if action_id in self._attached.get(owner, ()):
+            self._detach(action_id, owner, next_id, touched, lost)
+        else:
+            self._unwait(owner, "owner", action_id)
+
+    def _detach(self, action_id: any, owner: any, next_id: any, touched: set, lost: list) -> None:
+        """
+        Gives back what an attached action counted against its dialogue
+        """
+        self._attached[owner].discard(action_id)
+        self._owned[owner] -= 1
+        touched.add(owner)
+        if self._owned[owner] == 0:
+            self._issue("dead_ends", owner, "actions", f"Dialogue {owner} has no actions")
+        if next_id is None:
+            self._exits[owner] -= 1
+        elif action_id in self._dangling:
+            self._dangling.discard(action_id)
+            self._exits[owner] -= 1
+        else:
+            self._unlink(owner, next_id)
+            lost.append(next_id)
+
+    def _retract_scene(self, scene_id: any, lost: list) -> None:
+        """
+        Takes a scene validated before out of the graph
+        """
+        start = self._starts.pop(scene_id)
+        self._resolve("references", scene_id, "start")
+        starting = self._scene_starts.get(start)
+        if starting and scene_id in starting:
+            starting.discard(scene_id)
+            lost.append(start)
+        else:
+            self._unwait(start, "start", scene_id)
+
+    def _retract_dialogue(self, dialogue_id: any, touched: set, lost: list) -> None:
+        """
+        Takes a dialogue validated before out of the graph. What refers to
+        it is left waiting for it, as if it had never existed
+        """
+        for action_id in list(self._attached.get(dialogue_id, ())):
+            self._detach(action_id, *self._actions[action_id], touched, lost)
+            self._issue(
+                "references", action_id, "owner",
+                f"Action {action_id} belongs to missing dialogue {dialogue_id}"
+            )
+            self._wait(dialogue_id, "owner", action_id)
+        for action_id in self._referrers.get(dialogue_id, ()):
+            owner = self._actions[action_id][0]
+            if action_id in self._attached.get(owner, ()):
+                self._unlink(owner, dialogue_id)
+                self._dangling.add(action_id)
+                self._exits[owner] = self._exits.get(owner, 0) + 1
+                touched.add(owner)
+            self._issue(
+                "references", action_id, "next",
+                f"Action {action_id} leads to missing dialogue {dialogue_id}"
+            )
+            self._wait(dialogue_id, "next", action_id)
+        for scene_id in self._scene_starts.pop(dialogue_id, ()):
+            self._issue(
+                "references", scene_id, "start",
+                f"Scene {scene_id} starts at missing dialogue {dialogue_id}"
+            )
+            self._wait(dialogue_id, "start", scene_id)
+
+        for table in (self._owned, self._exits, self._successors, self._predecessors,
+                      self._attached):
+            table.pop(dialogue_id, None)
+        self._reached.discard(dialogue_id)
+        self._ending.discard(dialogue_id)
+        self._resolve("dead_ends", dialogue_id, "actions")
+        self._resolve("reachability", dialogue_id, "scene")
+        self._resolve("cycles", dialogue_id, "loop")
+
+    def _link(self, owner: any, next_id: any, edges: list) -> None:
+        self._successors.setdefault(owner, []).append(next_id)
+        self._predecessors.setdefault(next_id, []).append(owner)
+        edges.append((owner, next_id))
+
+    def _unlink(self, owner: any, next_id: any) -> None:
+        self._successors[owner].remove(next_id)
+        self._predecessors[next_id].remove(owner)
+
+    def _unreach(self, lost: list) -> None:
+        """
+        Re-derives reachability for the dialogues that lost an edge or a
+        scene into them, and everything reached through them
+        """
+        reached = self._reached
+        affected = set()
+        pending = [dialogue_id for dialogue_id in lost if dialogue_id in reached]
+        while pending:
+            dialogue_id = pending.pop()
+            if dialogue_id in affected:
+                continue
+            affected.add(dialogue_id)
+            pending.extend(
+                next_id for next_id in self._successors.get(dialogue_id, ())
+                if next_id in reached
+            )
+        if not affected:
+            return
+        reached -= affected
+
+        # Still reached if a scene starts there, or through a dialogue outside the affected part
+        pending = [
+            dialogue_id for dialogue_id in affected
+            if self._scene_starts.get(dialogue_id)
+            or any(previous in reached for previous in self._predecessors.get(dialogue_id, ()))
+        ]
+        reached.update(pending)
+        while pending:
+            dialogue_id = pending.pop()
+            for next_id in self._successors.get(dialogue_id, ()):
+                if next_id not in reached:
+                    reached.add(next_id)
+                    pending.append(next_id)
+
+        for dialogue_id in affected:
+            if dialogue_id not in reached:
+                self._issue(
+                    "reachability", dialogue_id, "scene",
+                    f"Dialogue {dialogue_id} cannot be reached from any scene"
+                )
+
+    def _attach(self, tree: any, action_id: any, edges: list, touched: set) -> None:
+        """
+        Counts an action against its (existing) dialogue and links it
+        """
+        action = tree.actions[action_id]
+        owner = action.dialogue_id
+        self._owned[owner] += 1
+        self._attached.setdefault(owner, set()).add(action_id)
+        touched.add(owner)
+        if self._owned[owner] == 1:
+            self._resolve("dead_ends", owner, "actions")
+        if action.next_id is None:
+            self._exits[owner] = self._exits.get(owner, 0) + 1
+        elif action.next_id not in tree.dialogues:
+            self._exits[owner] = self._exits.get(owner, 0) + 1
+            self._dangling.add(action_id)
+        else:
+            self._link(owner, action.next_id, edges)
+
+    def _apply(self, tree: any, dialogues: list, actions: list, scenes: list,
+               touched: set=None) -> None:
+        """
+        Adds new objects to the graph, then updates reachability and cycles
+        for the part of the graph they affect, along with the dialogues in
+        touched
+        """
+        edges = []
+        seeds = []
+        touched = set(dialogues) | (touched or set())
+
+        for dialogue_id in dialogues:
+            self._owned[dialogue_id] = 0
+            for reason, identifier in self._waiting.pop(dialogue_id, ()):
+                if reason == "start":
+                    self._resolve("references", identifier, reason)
+                    self._scene_starts.setdefault(dialogue_id, set()).add(identifier)
+                    seeds.append(dialogue_id)
+                elif reason == "owner":
+                    self._resolve("references", identifier, reason)
+                    self._attach(tree, identifier, edges, touched)
+                elif identifier in self._dangling:
+                    self._resolve("references", identifier, reason)
+                    self._dangling.discard(identifier)
+                    owner = tree.actions[identifier].dialogue_id
+                    self._exits[owner] -= 1
+                    touched.add(owner)
+                    self._link(owner, dialogue_id, edges)
+                else:
+                    # The action has no dialogue yet and links once it does
+                    self._resolve("references", identifier, reason)
+
+        for action_id in actions:
+            action = tree.actions[action_id]
+            self._actions[action_id] = (action.dialogue_id, action.next_id)
+            if action.next_id is not None:
+                self._referrers.setdefault(action.next_id, set()).add(action_id)
+            if action.next_id is not None and action.next_id not in tree.dialogues:
+                self._issue(
+                    "references", action_id, "next",
+                    f"Action {action_id} leads to missing dialogue {action.next_id}"
+                )
+                self._waiting.setdefault(action.next_id, []).append(("next", action_id))
+            if action.dialogue_id in tree.dialogues:
+                self._attach(tree, action_id, edges, touched)
+            else:
+                self._issue(
+                    "references", action_id, "owner",
+                    f"Action {action_id} belongs to missing dialogue {action.dialogue_id}"
+                )
+                self._waiting.setdefault(action.dialogue_id, []).append(("owner", action_id))
+
+        for dialogue_id in dialogues:
+            if self._owned[dialogue_id] == 0:
+                self._issue("dead_ends", dialogue_id, "actions", f"Dialogue {dialogue_id} has no actions")
+
+        for scene_id in scenes:
+            start = tree.scenes[scene_id].dialogue_id
+            self._starts[scene_id] = start
+            if start in tree.dialogues:
+                self._scene_starts.setdefault(start, set()).add(scene_id)
+                seeds.append(start)
+            else:
+                self._issue(
+                    "references", scene_id, "start",
+                    f"Scene {scene_id} starts at missing dialogue {start}"
+                )
+                self._waiting.setdefault(start, []).append(("start", scene_id))
+
+        if "reachability" in self.checks:
+            self._update_reachability(dialogues, seeds, edges)
+        if "cycles" in self.checks:
+            self._update_cycles(dialogues, touched, edges)
+
+    def _update_reachability(self, dialogues: list, seeds: list, edges: list) -> None:
+        """
+        Extends the reached set from new starts and new edges out of reached dialogues
+        """
+        reached = self._reached
+        pending = [start for start in seeds if start not in reached]
+        pending += [
+            next_id for owner, next_id in edges
+            if owner in reached and next_id not in reached
+        ]
+        reached.update(pending)
+        while pending:
+            dialogue_id = pending.pop()
+            self._resolve("reachability", dialogue_id, "scene")
+            for next_id in self._successors.get(dialogue_id, ()):
+                if next_id not in reached:
+                    reached.add(next_id)
+                    pending.append(next_id)
+
+        for dialogue_id in dialogues:
+            if dialogue_id not in reached:
+                self._issue(
+                    "reachability", dialogue_id, "scene",
+                    f"Dialogue {dialogue_id} cannot be reached from any scene"
+                )
+
+    def _is_exit(self, dialogue_id: any) -> bool:
+        # A dead end is reported on its own, so it also counts as a way to end
+        return self._exits.get(dialogue_id, 0) > 0 or self._owned[dialogue_id] == 0
+
+    def _update_cycles(self, dialogues: list, touched: set, edges: list) -> None:
+        """
+        Updates which dialogues can reach the end of the conversation
+
+        Dialogues that lost a way to end take every ancestor relying on it out
+        of the ending set, then the affected dialogues are re-derived from
+        their successors
+        """
+        ending = self._ending
+        predecessors = self._predecessors
+
+        affected = set()
+        pending = [
+            dialogue_id for dialogue_id in touched
+            if dialogue_id in ending and not self._is_exit(dialogue_id)
+        ]
+        while pending:
+            dialogue_id = pending.pop()
+            if dialogue_id in affected:
+                continue
+            affected.add(dialogue_id)
+            pending.extend(
+                previous for previous in predecessors.get(dialogue_id, ())
+                if previous in ending
+            )
+        ending -= affected
+
+        candidates = affected | touched
+        candidates.update(owner for owner, _ in edges)
+        pending = []
+        for dialogue_id in candidates:
+            if dialogue_id in ending:
+                continue
+            if self._is_exit(dialogue_id) or any(
+                next_id in ending for next_id in self._successors.get(dialogue_id, ())
+            ):
+                ending.add(dialogue_id)
+                pending.append(dialogue_id)
+        while pending:
+            dialogue_id = pending.pop()
+            self._resolve("cycles", dialogue_id, "loop")
+            for previous in predecessors.get(dialogue_id, ()):
+                if previous not in ending:
+                    ending.add(previous)
+                    pending.append(previous)
+
+        for dialogue_id in candidates:
+            if dialogue_id not in ending:
+                self._issue(
+                    "cycles", dialogue_id, "loop",
+                    f"Dialogue {dialogue_id} only leads into a cycle that never ends"
+                )
+
+def _full_pass(tree: any, checks: frozenset[str], dialogues: any, actions: any,
+               scenes: any) -> list[Issue]:
+    """
+    Validates dialogues, actions and scenes of a tree in one pass, keeping
+    nothing for later runs
+
+    Args:
+        tree: Tree
+            The tree they belong to, whose dialogues references are checked against
+        checks: frozenset[str]
+            The checks to perform
+        dialogues: Iterable
+            The identifiers of the dialogues to check
+        actions: Iterable[Action]
+            The actions to check
+        scenes: Iterable[Scene]
+            The scenes to check
+    Returns:
+        list[Issue]
+            The problems found, grouped by check
+    """
+    existing = tree.dialogues
+    issues = []
+
+    # Edges between dialogues, built from a single walk over the actions
+    successors = {}
+    predecessors = {}
+    exits = set()
+    for action in actions:
+        owner = action.dialogue_id
+        owned = owner in existing
+        if "references" in checks and not owned:
+            issues.append(Issue(
+                "references", action.action_id,
+                f"Action {action.action_id} belongs to missing dialogue {owner}"
+            ))
+        if action.next_id is None:
+            exits.add(owner)
+        elif action.next_id not in existing:
+            # Already reported as a dangling reference, so not a trap as well
+            exits.add(owner)
+            if "references" in checks:
+                issues.append(Issue(
+                    "references", action.action_id,
+                    f"Action {action.action_id} leads to missing dialogue {action.next_id}"
+                ))
+        elif owned:
+            successors.setdefault(owner, []).append(action.next_id)
+            predecessors.setdefault(action.next_id, []).append(owner)
+
+    starts = []
+    for scene in scenes:
+        if scene.dialogue_id in existing:
+            starts.append(scene.dialogue_id)
+        elif "references" in checks:
+            issues.append(Issue(
+                "references", scene.scene_id,
+                f"Scene {scene.scene_id} starts at missing dialogue {scene.dialogue_id}"
+            ))
+
+    if "reachability" in checks:
+        reached = set(starts)
+        pending = list(reached)
+        while pending:
+            for next_id in successors.get(pending.pop(), ()):
+                if next_id not in reached:
+                    reached.add(next_id)
+                    pending.append(next_id)
+        for dialogue_id in dialogues:
+            if dialogue_id not in reached:
+                issues.append(Issue(
+                    "reachability", dialogue_id,
+                    f"Dialogue {dialogue_id} cannot be reached from any scene"
+                ))
+
+    if "dead_ends" in checks or "cycles" in checks:
+        for dialogue_id in dialogues:
+            if dialogue_id not in successors and dialogue_id not in exits:
+                # A dead end is its own problem, so it also counts as an exit
+                exits.add(dialogue_id)
+                if "dead_ends" in checks:
+                    issues.append(Issue(
+                        "dead_ends", dialogue_id,
+                        f"Dialogue {dialogue_id} has no actions"
+                    ))
+
+    if "cycles" in checks:
+        # Walk backwards from every exit; whatever is never reached loops forever
+        ending = set(exits)
+        pending = list(ending)
+        while pending:
+            for previous in predecessors.get(pending.pop(), ()):
+                if previous not in ending:
+                    ending.add(previous)
+                    pending.append(previous)
+        for dialogue_id in dialogues:
+            if dialogue_id not in ending:
+                issues.append(Issue(
+                    "cycles", dialogue_id,
+                    f"Dialogue {dialogue_id} only leads into a cycle that never ends"
+                ))
+
+    return issues
+
+def _scope(tree: any, scenes: list) -> tuple[list, list, list]:
+    """
+    Returns the dialogue ids, actions and scenes to check for some scenes:
+    the scenes that still exist and everything reachable from their
+    starting dialogues
+    """
+    scenes = [tree.scenes[scene_id] for scene_id in scenes if scene_id in tree.scenes]
+    dialogues = []
+    actions = []
+    seen = set()
+    pending = [scene.dialogue_id for scene in scenes]
+    while pending:
+        dialogue_id = pending.pop()
+        if dialogue_id in seen or dialogue_id not in tree.dialogues:
+            continue
+        seen.add(dialogue_id)
+        dialogues.append(dialogue_id)
+        for action in tree.actions_for(dialogue_id):
+            actions.append(action)
+            if action.next_id is not None:
+                pending.append(action.next_id)
+    return dialogues, actions, scenes
+
+# Incremental state per tree, with the change set it reads from
+_states = weakref.WeakKeyDictionary()
+
+def validate(tree: any, check: list[str]=None, incremental: bool=False,
+             scenes: list=None) -> list[Issue]:
+    """
+    Validates a tree in one pass over its nodes and edges
+
+    Args:
+        tree: Tree
+            The tree to validate (a Tree or any object with the same surface)
+        check: list[str]
+            The checks to perform, all of CHECKS if empty or None
+        incremental: bool
+            Whether to reuse the previous incremental run on this tree and
+            only check what changed since. The first run is a full pass
+        scenes: list
+            The scenes to check, with everything reachable from them,
+            instead of the whole tree. Cannot be combined with incremental
+    Returns:
+        list[Issue]
+            The problems found, grouped by check
+    Raises:
+        ValueError: If a check is not known, or both scenes and incremental are given
+    """
+    checks = _checks(check)
+    if scenes is not None:
+        if incremental:
+            raise ValueError("Scoped validation cannot be incremental")
+        with _gc_paused():
+            return _full_pass(tree, checks, *_scope(tree, scenes))
+    if not incremental:
+        with _gc_paused():
+            return _full_pass(tree, checks, tree.dialogues, tree.actions.values(), tree.scenes.values())
+
+    state, changes = _states.get(tree, (None, None))
+    if state is None or state.checks != checks:
+        if changes is not None:
+            tree.untrack_changes(changes)
+        state, changes = ValidationState(checks), tree.track_changes()
+        _states[tree] = (state, changes)
+        state.rebuild(tree)
+    else:
+        state.update(tree, changes)
+    changes.clear()
+    return state.result()
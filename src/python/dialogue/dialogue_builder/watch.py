@@ -0,0 +1,337 @@
+"""
+This module is used to rebuild a live Dialogue Tree as its scripts are edited
+
+A Watcher builds a tree from every script in a directory, remembering which
+file defined each scene, dialogue and action. It then watches the
+directory, with inotify when the optional inotify_simple package is
+installed and by comparing file modification times otherwise. When a
+script is saved, only that file is reparsed. Its old objects are removed
+from the tree and its new ones added in place, and validation is rerun
+only for the scenes the file touches: its own scenes, scenes starting at
+its dialogues, and scenes in any file that lead into one of its dialogues
+through an action. The issues of those other files are updated too.
+
+A script that fails to parse, or that defines an identifier owned by
+another file, leaves the tree as it was. The error is kept in
+Watcher.errors until the file is fixed.
+
+Example Usage:
+    watcher = Watcher("scripts", tree=game.dialogue_tree)
+    while game.running:
+        for path in watcher.poll():
+            print(path, watcher.issues[path], watcher.latency)
+"""
+
+import fnmatch
+import gc
+import os
+import time
+from typing import Callable
+
+from .builder import build_all, compile_fragment, merge_fragments
+from .tree import Action, Dialogue, Scene, Tree
+from .validation import Issue, validate
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+_classes = {"scene": Scene, "dialogue": Dialogue, "action": Action}
+
+def _keys(fragment: tuple) -> list[tuple[str, any]]:
+    """
+    Lists the (kind, identifier) of every object in a fragment
+    """
+    _, scenes, dialogues, actions = fragment
+    keys = [("scene", row[0]) for row in scenes]
+    keys += [("dialogue", row[0]) for row in dialogues]
+    keys += [("action", row[0]) for row in actions]
+    return keys
+
+class Watcher:
+    """
+    This class keeps a tree in sync with a directory of user scripts
+
+    Data:
+        directory: str
+            The directory holding the scripts
+        pattern: str
+            The glob the script file names match
+        tree: Tree
+            The live tree, patched in place
+        checks: list[str]
+            The validation checks to run after a rebuild, all if None
+        errors: dict
+            Script path -> the SyntaxError, ValueError, UnicodeDecodeError or
+            OSError of its last failed rebuild
+        issues: dict
+            Script path -> the Issues found in its scenes by its last rebuild
+        latency: float
+            Seconds taken by the last rebuild
+    """
+    def __init__(self, directory: str, tree: Tree=None, pattern: str="*.txt",
+                 cache: any=None, checks: list[str]=None, workers: int=None,
+                 use_inotify: bool=True) -> None:
+        """
+        Builds the tree from every script in the directory and starts watching it
+
+        Args:
+            directory: str
+                The directory holding the scripts
+            tree: Tree
+                The tree to populate and keep in sync, a new empty one if not given
+            pattern: str
+                The glob the script file names match
+            cache: BuildCache
+                The cache of compiled fragments to use, if any
+            checks: list[str]
+                The validation checks to run after a rebuild, all if None
+            workers: int
+                The worker processes for the first build, see build_all
+            use_inotify: bool
+                Whether to use inotify if inotify_simple is installed
+        Raises:
+            SyntaxError: If a script is malformed
+            ValueError: If two scripts define the same identifier
+        """
+        self.directory = directory
+        self.pattern = pattern
+        self.cache = cache
+        self.checks = checks
+        self.errors = {}
+        self.issues = {}
+        self.latency = 0.0
+
+        # (kind, identifier) -> path, and path -> [(kind, identifier)]
+        self._owners = {}
+        self._files = {}
+        # path -> (mtime_ns, size) when polling
+        self._stamps = {}
+        # next_id -> ids of the actions leading there, and
+        # dialogue_id -> ids of the scenes starting there
+        self._leads = {}
+        self._starts = {}
+
+        self._inotify = None
+        if use_inotify and INotify is not None:
+            self._inotify = INotify()
+            self._inotify.add_watch(
+                directory,
+                flags.CLOSE_WRITE | flags.MOVED_TO | flags.MOVED_FROM | flags.DELETE
+            )
+
+        self._stamps = self._scan()
+        self.tree = build_all(sorted(self._stamps), workers, cache, self._owners, tree)
+        for (kind, identifier), path in self._owners.items():
+            self._files.setdefault(path, []).append((kind, identifier))
+        for action_id, action in self.tree.actions.items():
+            self._leads.setdefault(action.next_id, set()).add(action_id)
+        for scene_id, scene in self.tree.scenes.items():
+            self._starts.setdefault(scene.dialogue_id, set()).add(scene_id)
+
+    def _matches(self, name: str) -> bool:
+        return fnmatch.fnmatch(name, self.pattern)
+
+    def _scan(self) -> dict[str, tuple[int, int]]:
+        """
+        Returns the modification time and size of every script
+        """
+        stamps = {}
+        with os.scandir(self.directory) as scan:
+            for entry in scan:
+                if entry.is_file() and self._matches(entry.name):
+                    stat = entry.stat()
+                    stamps[entry.path] = (stat.st_mtime_ns, stat.st_size)
+        return stamps
+
+    def changed(self, timeout: float=0) -> list[str]:
+        """
+        Lists the scripts created, modified or deleted since the last call
+
+        Args:
+            timeout: float
+                Seconds to wait for a change when using inotify
+        Returns:
+            list[str]
+                The paths of the changed scripts
+        """
+        if self._inotify is not None:
+            names = {
+                event.name for event in self._inotify.read(timeout=int(timeout * 1000))
+                if self._matches(event.name)
+            }
+            return sorted(os.path.join(self.directory, name) for name in names)
+
+        stamps = self._scan()
+        changed = [path for path, stamp in stamps.items() if self._stamps.get(path) != stamp]
+        changed += [path for path in self._stamps if path not in stamps]
+        self._stamps = stamps
+        return sorted(changed)
+
+    def poll(self, timeout: float=0) -> list[str]:
+        """
+        Rebuilds every script changed since the last poll
+
+        Args:
+            timeout: float
+                Seconds to wait for a change when using inotify
+        Returns:
+            list[str]
+                The paths rebuilt
+        """
+        changed = self.changed(timeout)
+        for path in changed:
+            self.rebuild(path)
+        return changed
+
+    def run(self, interval: float=0.25, stop: Callable[[], bool]=None) -> None:
+        """
+        Polls for changes until stop returns True, or forever
+
+        Args:
+            interval: float
+                Seconds between polls
+            stop: Callable[[], bool]
+                Checked before every poll
+        """
+        while stop is None or not stop():
+            if self._inotify is not None:
+                self.poll(interval)
+            else:
+                self.poll()
+                time.sleep(interval)
+
+    def rebuild(self, path: str) -> list[Issue]:
+        """
+        Reparses one script and patches its objects in the tree
+
+        Args:
+            path: str
+                The script, which may have been deleted
+        Returns:
+            list[Issue]
+                The problems found in the scenes the script touches, or None
+                if the script could not be applied (see errors)
+        """
+        start = time.perf_counter()
+        # A collection would scan the whole live tree for the few objects a rebuild creates
+        enabled = gc.isenabled()
+        gc.disable()
+        try:
+            issues = self._rebuild(path)
+        finally:
+            if enabled:
+                gc.enable()
+        self.latency = time.perf_counter() - start
+        return issues
+
+    def _rebuild(self, path: str) -> list[Issue]:
+        fragment = None
+        if os.path.exists(path):
+            try:
+                fragment = compile_fragment(path, self.cache)
+            except (SyntaxError, UnicodeDecodeError, OSError) as e:
+                # A bad or half written save must not stop the watch loop
+                self.errors[path] = e
+                return None
+        keys = _keys(fragment) if fragment is not None else []
+
+        # Check everything before touching the tree, so a bad save changes nothing
+        index = {"scene": self.tree.scenes, "dialogue": self.tree.dialogues, "action": self.tree.actions}
+        for kind, identifier in keys:
+            owner = self._owners.get((kind, identifier))
+            if owner is None and identifier in index[kind]:
+                owner = "the tree"
+            if owner is not None and owner != path:
+                self.errors[path] = ValueError(
+                    f"{kind.capitalize()} {identifier} is defined in both {owner} and {path}"
+                )
+                return None
+        name = fragment[0] if fragment is not None else None
+        if name is not None and self.tree.name is not None and name != self.tree.name:
+            self.errors[path] = ValueError(
+                f"{path} names the tree {name!r} but it is already named {self.tree.name!r}"
+            )
+            return None
+
+        old = self._files.pop(path, [])
+        for kind, identifier in old:
+            if kind == "action":
+                self._leads[self.tree.actions[identifier].next_id].discard(identifier)
+            elif kind == "scene":
+                self._starts[self.tree.scenes[identifier].dialogue_id].discard(identifier)
+            self.tree.remove_object(identifier, _classes[kind])
+            del self._owners[(kind, identifier)]
+        if fragment is not None:
+            merge_fragments([(path, fragment)], self.tree, self._owners)
+            self._files[path] = keys
+            for kind, identifier in keys:
+                if kind == "action":
+                    next_id = self.tree.actions[identifier].next_id
+                    self._leads.setdefault(next_id, set()).add(identifier)
+                elif kind == "scene":
+                    dialogue_id = self.tree.scenes[identifier].dialogue_id
+                    self._starts.setdefault(dialogue_id, set()).add(identifier)
+        self.errors.pop(path, None)
+
+        dialogues = {identifier for kind, identifier in old + keys if kind == "dialogue"}
+        scenes = self._scenes_for(old + keys)
+        scenes.update(self._scenes_leading_to(dialogues))
+        issues = validate(self.tree, self.checks, scenes=list(scenes))
+        if fragment is None:
+            self.issues.pop(path, None)
+        else:
+            self.issues[path] = issues
+
+        # Other files whose scenes lead into the changed dialogues
+        others = {self._owners.get(("scene", scene_id)) for scene_id in scenes}
+        others.discard(None)
+        others.discard(path)
+        for other in others:
+            self.issues[other] = validate(
+                self.tree, self.checks, scenes=list(self._scenes_for(self._files[other]))
+            )
+        return issues
+
+    def _scenes_for(self, keys: list[tuple[str, any]]) -> set:
+        """
+        Returns the scenes a file touches: its own, and those starting at one of its dialogues
+        """
+        scenes = set()
+        for kind, identifier in keys:
+            if kind == "scene":
+                scenes.add(identifier)
+            elif kind == "dialogue":
+                scenes.update(self._starts.get(identifier, ()))
+        return scenes
+
+    def _scenes_leading_to(self, dialogues: set) -> set:
+        """
+        Returns the scenes from which an action leading to one of the
+        dialogues can be reached, by walking the actions backwards
+        """
+        seen = set()
+        pending = list(dialogues)
+        while pending:
+            dialogue_id = pending.pop()
+            for action_id in self._leads.get(dialogue_id, ()):
+                owner = self.tree.actions[action_id].dialogue_id
+                if owner not in seen:
+                    seen.add(owner)
+                    pending.append(owner)
+        return {scene_id for dialogue_id in seen for scene_id in self._starts.get(dialogue_id, ())}
+
+    def close(self) -> None:
+        """
+        Stops watching the directory
+        """
+        if self._inotify is not None:
+            self._inotify.close()
+            self._inotify = None
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -0,0 +1,265 @@
+"""
+This module is used to write a Dialogue Tree to JSON deterministically,
+and to rewrite only the parts of the file that changed
+
+The file is a JSON object with one scene per line, sorted by scene id,
+and every object inside a scene is written with sorted keys:
+
+    {
+    "s1":{"dialogue_id":"d1","dialogues":{"d1":{"actions":{...},"text":"..."}}},
+    "s2":{...}
+    }
+
+Writing the same tree twice produces the same bytes, and editing one scene
+changes one line, so the files diff well in version control.
+
+A TreeWriter remembers where each scene line is and a hash of its content.
+On later writes it finds the scenes touched since then (through
+Tree.track_changes), and only writes the lines whose content changed.
+A line of the same length as before is overwritten in place. Otherwise
+the file is truncated at the first line that moved and the rest is
+rewritten, so the file always holds the same bytes as a full write.
+
+Example Usage:
+    with TreeWriter(tree, "dialogue.json") as writer:
+        writer.write()
+        tree.add_object("d9", Dialogue({}, "d9", "Hello again"))
+        writer.write()  # rewrites one line
+"""
+
+import hashlib
+import os
+
+from .serializer import get_serializer
+
+_HEADER = b"{\n"
+_FOOTER = b"}\n"
+
+def _key(identifier: any) -> str:
+    """
+    Returns the JSON object key of an identifier, which is also its sort key
+    """
+    return identifier if isinstance(identifier, str) else str(identifier)
+
+def _digest(line: bytes) -> bytes:
+    return hashlib.blake2b(line, digest_size=16).digest()
+
+def scene_block(tree: any, scene_id: any) -> bytes:
+    """
+    Encodes one scene as a line of the file, without the separator
+
+    The scene holds its starting dialogue and that dialogue's actions,
+    like Tree.populate_tree
+
+    Args:
+        tree: Tree
+            The tree holding the scene (a Tree or any object with the same surface)
+        scene_id: any
+            The identifier of the scene
+    Returns:
+        bytes
+            The UTF-8 encoded line
+    """
+    scene = tree.scenes[scene_id]
+    dialogues = {}
+    dialogue = tree.dialogues.get(scene.dialogue_id)
+    if dialogue is not None:
+        dialogues[_key(scene.dialogue_id)] = {
+            "text": dialogue.text,
+            "actions": {
+                _key(action.action_id): {"next_id": action.next_id}
+                for action in tree.actions_for(scene.dialogue_id)
+            }
+        }
+    value = {"dialogue_id": scene.dialogue_id, "dialogues": dialogues}
+    serializer = get_serializer(compact=True)
+    return b"%s:%s" % (serializer.dumps(_key(scene_id)), serializer.dumps(value, sort_keys=True))
+
+def write_sorted(tree: any, f: any) -> list[tuple[any, int, int, bytes]]:
+    """
+    Writes every scene of a tree to a binary file, in sorted order
+
+    Args:
+        tree: Tree
+            The tree to write
+        f: BinaryIO
+            The file to write to, positioned at its start
+    Returns:
+        list[tuple[any, int, int, bytes]]
+            (scene id, offset, length, content hash) of every line written
+    """
+    order = sorted(tree.scenes, key=_key)
+    blocks = []
+    offset = f.write(_HEADER)
+    for position, scene_id in enumerate(order):
+        line = scene_block(tree, scene_id)
+        blocks.append((scene_id, offset, len(line), _digest(line)))
+        offset += f.write(line)
+        offset += f.write(b",\n" if position < len(order) - 1 else b"\n")
+    f.write(_FOOTER)
+    return blocks
+
+class TreeWriter:
+    """
+    This class writes a tree to a file, then rewrites only what changed
+
+    The writer assumes nothing else modifies the file. If the file's size
+    is not what the writer left, the next write is a full one
+
+    Data:
+        tree: Tree
+            The tree being written
+        filename: str
+            The file written to
+        written: int
+            The bytes written by the last call to write
+    """
+    def __init__(self, tree: any, filename: str) -> None:
+        self.tree = tree
+        self.filename = filename
+        self.written = 0
+        self._changes = tree.track_changes()
+
+        # Scene ids in sorted order and their positions in it,
+        # and scene id -> (offset, length, hash) of its line
+        self._order = None
+        self._positions = {}
+        self._blocks = {}
+        self._size = 0
+        # Dialogue id -> scenes starting there, action id -> its dialogue id
+        self._starts = {}
+        self._owners = {}
+
+    def _remember(self, scene_id: any) -> None:
+        """
+        Records which dialogue and actions a scene's line depends on
+        """
+        scene = self.tree.scenes[scene_id]
+        self._starts.setdefault(scene.dialogue_id, set()).add(scene_id)
+        for action in self.tree.actions_for(scene.dialogue_id):
+            self._owners[action.action_id] = action.dialogue_id
+
+    def _write_all(self) -> int:
+        self._changes.clear()
+        self._starts = {}
+        self._owners = {}
+        with open(self.filename, "wb") as f:
+            blocks = write_sorted(self.tree, f)
+            self._size = f.tell()
+        self._order = [scene_id for scene_id, _, _, _ in blocks]
+        self._positions = {scene_id: position for position, scene_id in enumerate(self._order)}
+        self._blocks = {scene_id: (offset, length, digest) for scene_id, offset, length, digest in blocks}
+        for scene_id in self._order:
+            self._remember(scene_id)
+        return self._size
+
+    def _dirty(self) -> set[any]:
+        """
+        Returns the scenes whose line may have changed since the last write
+        """
+        scenes = set()
+        for kind, identifier in self._changes:
+            if kind == "scene":
+                scenes.add(identifier)
+                continue
+            if kind == "dialogue":
+                owners = [identifier]
+            else:
+                owners = [self._owners.get(identifier)]
+                action = self.tree.actions.get(identifier)
+                if action is not None:
+                    owners.append(action.dialogue_id)
+            for dialogue_id in owners:
+                scenes.update(self._starts.get(dialogue_id, ()))
+        self._changes.clear()
+        return scenes
+
+    def write(self) -> int:
+        """
+        Writes the tree, rewriting only the lines of changed scenes if the
+        file was written before
+
+        Returns:
+            int
+                The number of bytes written
+        """
+        if self._order is None or not os.path.exists(self.filename) \
+                or os.path.getsize(self.filename) != self._size:
+            self.written = self._write_all()
+            return self.written
+
+        dirty = self._dirty()
+        scenes = self.tree.scenes
+        old_order = self._order
+        order = old_order
+        # Lines before `first` stay where they are; from `first` on the file is rewritten
+        first = len(order)
+        if any((scene_id in scenes) != (scene_id in self._blocks) for scene_id in dirty):
+            order = sorted(scenes, key=_key)
+            self._positions = {scene_id: position for position, scene_id in enumerate(order)}
+            first = 0
+            limit = min(len(old_order), len(order))
+            while first < limit and old_order[first] == order[first]:
+                first += 1
+            if first == limit and first > 0:
+                # The old last line gains or loses its separator
+                first -= 1
+
+        in_place = []
+        for scene_id in dirty:
+            if scene_id not in scenes or scene_id not in self._blocks:
+                continue
+            position = self._positions[scene_id]
+            if position >= first:
+                continue
+            line = scene_block(self.tree, scene_id)
+            offset, length, digest = self._blocks[scene_id]
+            new_digest = _digest(line)
+            if new_digest == digest:
+                continue
+            self._remember(scene_id)
+            if len(line) == length:
+                in_place.append((scene_id, offset, line, new_digest))
+            else:
+                first = position
+        in_place = [block for block in in_place if self._positions[block[0]] < first]
+
+        written = 0
+        with open(self.filename, "r+b") as f:
+            for scene_id, offset, line, digest in in_place:
+                f.seek(offset)
+                written += f.write(line)
+                self._blocks[scene_id] = (offset, len(line), digest)
+
+            if first < len(order) or len(order) != len(old_order):
+                offset = self._blocks[old_order[first]][0] if first < len(old_order) else len(_HEADER)
+                for scene_id in old_order[first:]:
+                    self._blocks.pop(scene_id, None)
+                start = offset
+                f.seek(offset)
+                f.truncate()
+                for position in range(first, len(order)):
+                    scene_id = order[position]
+                    line = scene_block(self.tree, scene_id)
+                    self._blocks[scene_id] = (offset, len(line), _digest(line))
+                    self._remember(scene_id)
+                    offset += f.write(line)
+                    offset += f.write(b",\n" if position < len(order) - 1 else b"\n")
+                written += offset - start + f.write(_FOOTER)
+            self._size = f.seek(0, os.SEEK_END)
+
+        self._order = order
+        self.written = written
+        return written
+
+    def close(self) -> None:
+        """
+        Stops tracking changes to the tree
+        """
+        self.tree.untrack_changes(self._changes)
+
+    def __enter__(self) -> "TreeWriter":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
@@ -1,4 +1,15 @@
-from .manager import ImageManager, PygameSoundManager
+from .manager import (
+    ImageManager,
+    PygameSoundManager,
+    ResourceManager,
+    cache_stats,
+    loading_errors,
+    pin,
+    preload,
+    stop_loading,
+    unpin,
+    wait_loaded,
+)
 
 # This is what I used.
 # Take comment as template and use it yourself uwu
@@ -1,12 +1,16 @@
+import functools
 import inspect
 import itertools
+import json
 import logging
 import os
+import queue
 import re
-
-import pygame
-
-import util
+import sys
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import FIRST_EXCEPTION, ThreadPoolExecutor, wait
 
 """
 how image loading works
@@ -35,13 +39,345 @@ audio/
   shout_2.ogg
   # audio.shout[0], shout[1]
 
+lazy loading
+
+  images = ImageManager("resources/images", lazy=True)
+  # only scans the folders, nothing is loaded yet
+  images.part[0]
+  # loads part_0.png now, and keeps it
+
+parallel loading
+
+  images = ImageManager("resources/images", workers=8)
+  # scans first, then decodes every file on 8 threads before returning
+  preload(images.ui, workers=8)
+  # the same for a lazy manager or one of its folders, at any time
+
+background loading
+
+  images = ImageManager("resources/images", "fallback.png", background=True)
+  # returns after the scan, a thread then loads every file
+  images.part[0]
+  # the fallback until part_0.png is loaded, then part_0.png
+  # files read while still loading jump to the front of the queue
+  # without a fallback, a file read before it is loaded is loaded right away
+  wait_loaded(images)
+  # blocks until everything is loaded, loading_errors(images) lists what failed
+
+manifest cache
+
+  images = ImageManager("resources/images", manifest=".cache/images.manifest")
+  # the first run scans the folders and saves what it found as JSON,
+  # later runs only check the folders' modification times
+  # and rescan and reimport only the folders that changed
+
+memory budget
+
+  images = ImageManager("resources/images", max_bytes=256 << 20)
+  # loads on first access like lazy mode, and unloads the least recently
+  # used resources once they take more than 256 MB, to reload on next access
+  # resources loaded ahead (in the background or by preload) are only kept
+  # while they fit, never unloading what is used, and are unloaded first
+  pin(images, "ui")
+  # keeps everything in images.ui loaded until unpin(images, "ui")
+  cache_stats(images)
+  # bytes used, entries and evictions so far
+
+dependencies
+
+  the management functions (preload, wait_loaded, stop_loading,
+  loading_errors, pin, unpin, cache_stats) are module functions, so every
+  attribute name is free for resources
+
+  ResourceManager itself works with any loader_func. pygame and the game's
+  util module are imported by ImageManager, PygameSoundManager and sprites,
+  where they are used
+
 """
 
+# Bump when the format of the index changes, so old manifests are ignored
+_MANIFEST_VERSION = 2
+
+
+def _mtime(path):
+    try:
+        return os.stat(path).st_mtime_ns
+    except OSError:
+        return None
+
+
+def _read_manifest(filename, folder):
+    # The saved index of folder, or None if there is no usable one
+    # (a truncated or corrupted file is only a cache miss)
+    try:
+        with open(filename, "r", encoding="utf-8") as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if not isinstance(manifest, dict) or manifest.get("version") != _MANIFEST_VERSION \
+            or manifest.get("folder") != os.path.abspath(folder) \
+            or not isinstance(manifest.get("index"), dict):
+        return None
+    return manifest["index"]
+
+
+def _write_manifest(filename, folder, index):
+    manifest = {"version": _MANIFEST_VERSION, "folder": os.path.abspath(folder), "index": index}
+    directory = os.path.dirname(filename) or "."
+    os.makedirs(directory, exist_ok=True)
+    # Write to a temporary file and rename, so a reader never sees half a manifest
+    handle, temporary = tempfile.mkstemp(dir=directory, suffix=".tmp")
+    try:
+        with os.fdopen(handle, "w", encoding="utf-8") as f:
+            json.dump(manifest, f)
+        os.replace(temporary, filename)
+    except BaseException:
+        os.unlink(temporary)
+        raise
+
+
+def _once(load):
+    # Like functools.cache, but safe when the first calls come from several threads
+    lock = threading.Lock()
+    result = []
+
+    def get():
+        with lock:
+            if not result:
+                result.append(load())
+        return result[0]
+
+    return get
+
+
+def _tile(sheet, width, height, x, y):
+    import util
+
+    return util.splice_image(sheet(), width, height, x, y)
+
+
+def _estimate_size(value):
+    # Bytes held by a loaded resource: pixels for a Surface, samples for a Sound
+    if hasattr(value, "get_size") and hasattr(value, "get_bytesize"):
+        width, height = value.get_size()
+        return width * height * value.get_bytesize()
+    if hasattr(value, "get_length"):
+        import pygame
+
+        frequency, size, channels = pygame.mixer.get_init() or (44100, -16, 2)
+        return int(value.get_length() * frequency * channels * (abs(size) // 8))
+    return sys.getsizeof(value)
+
+
+class _Pending:
+    """
+    A resource that was found by the scan but not loaded yet
+
+    With a memory budget it stays in place once loaded, holding the value
+    until the cache unloads it
+    """
+    __slots__ = ("load", "requested", "done", "value", "size", "pins")
+
+    def __init__(self, load):
+        self.load = load
+        self.requested = False
+        self.done = False
+        self.value = None
+        self.size = 0
+        self.pins = 0
+
+
+class _ResourceCache:
+    """
+    The loaded resources of a manager with a memory budget, least recently used first
+
+    Resources loaded ahead of use are kept apart until they are read,
+    and unloaded before any resource that was read
+    """
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.bytes = 0
+        self.evictions = 0
+        self.__entries = OrderedDict()
+        self.__prefetched = OrderedDict()
+        # Resources are added by the background and preload threads too
+        self.__lock = threading.RLock()
+
+    def get(self, pending):
+        # Returns (whether it is loaded, its value), marking it as just used
+        with self.__lock:
+            if not pending.done:
+                return False, None
+            if pending in self.__prefetched:
+                del self.__prefetched[pending]
+                self.__entries[pending] = None
+            else:
+                self.__entries.move_to_end(pending)
+            return True, pending.value
+
+    def add(self, pending, value, prefetch=False):
+        """
+        Stores a loaded resource, unloading others if it does not fit
+
+        A resource loaded ahead of use (prefetch) is only kept if it fits
+        without unloading anything
+
+        Returns:
+            bool
+                Whether the resource was kept
+        """
+        with self.__lock:
+            if pending.done:
+                # Loaded twice at once, keep the first
+                return True
+            size = _estimate_size(value)
+            if prefetch and self.bytes + size > self.max_bytes:
+                return False
+            pending.value = value
+            pending.size = size
+            pending.done = True
+            (self.__prefetched if prefetch else self.__entries)[pending] = None
+            self.bytes += size
+            self.evict(keep=pending)
+            return True
+
+    def evict(self, keep=None):
+        """
+        Unloads the least recently used resources until the cache fits in
+        max_bytes, never unloading pinned ones or the one at keep, just loaded.
+        Resources loaded ahead and never read go first
+        """
+        with self.__lock:
+            for entries in (self.__prefetched, self.__entries):
+                if self.bytes <= self.max_bytes:
+                    return
+                # Walk from the least recently used, only as far as needed
+                victims = []
+                excess = self.bytes - self.max_bytes
+                for pending in entries:
+                    if excess <= 0:
+                        break
+                    if pending is keep or pending.pins:
+                        continue
+                    victims.append(pending)
+                    excess -= pending.size
+                for pending in victims:
+                    del entries[pending]
+                    self.bytes -= pending.size
+                    self.evictions += 1
+                    pending.value = None
+                    pending.size = 0
+                    pending.done = False
+                    pending.requested = False
+
+    def pin(self, pending, count):
+        with self.__lock:
+            pending.pins = max(pending.pins + count, 0)
+
+    def __len__(self):
+        return len(self.__entries) + len(self.__prefetched)
+
+
+class LazyList(list):
+    """
+    A list of resources that loads each one the first time it is read
+    """
+    def __init__(self, values, resolve):
+        super().__init__(values)
+        # Called with (pending, assign) to get the value of an item not loaded yet
+        self.__resolve = resolve
+
+    def __getitem__(self, index):
+        value = super().__getitem__(index)
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        if isinstance(value, _Pending):
+            value = self.__resolve(value, functools.partial(list.__setitem__, self, index))
+        return value
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+
+class _BackgroundLoader:
+    """
+    A thread loading resources in priority order, then storing them in place
+
+    Resources asked for by the game go first, in the order they were asked
+    for, then the rest in the order they were found. Once a resource loaded
+    ahead is not kept, for lack of memory, the rest are left to load on access
+    """
+    _REQUESTED, _QUEUED, _STOP = 0, 1, -1
+
+    def __init__(self, loads, finish):
+        self.errors = []
+        # Called with (pending, assign, value, prefetch) to store a loaded value,
+        # returns whether it was kept
+        self.__finish = finish
+        self.__full = False
+        self.__queue = queue.PriorityQueue()
+        self.__order = itertools.count()
+        for pending, assign in loads:
+            self.__queue.put((self._QUEUED, next(self.__order), pending, assign))
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def request(self, pending, assign):
+        if not pending.requested and not pending.done:
+            pending.requested = True
+            self.__queue.put((self._REQUESTED, next(self.__order), pending, assign))
+
+    def __run(self):
+        while True:
+            priority, _, pending, assign = self.__queue.get()
+            try:
+                if priority == self._STOP:
+                    return
+                if pending.done or (priority == self._QUEUED and self.__full):
+                    continue
+                try:
+                    value = pending.load()
+                except Exception as e:
+                    # Keep the fallback rather than retrying on every access
+                    logging.exception("Background loading failed")
+                    self.errors.append(e)
+                    pending.requested = True
+                    continue
+                if not self.__finish(pending, assign, value, not pending.requested):
+                    # The budget is full, loading more ahead would unload what is used
+                    self.__full = True
+            finally:
+                self.__queue.task_done()
+
+    def join(self):
+        self.__queue.join()
+
+    def stop(self):
+        self.__queue.put((self._STOP, next(self.__order), None, None))
+        self.__thread.join()
+
+
 class ResourceManager:
     __organization_regex = re.compile(r"^(.+?)(?:_(\d+))?\.(\w+)$")
     __invalid_index_exception = Exception("Invalid image index")
 
-    def __init__(self, folder=None, fallback=None, loader_func=None):
+    def __init__(self, folder=None, fallback=None, loader_func=None, lazy=False, workers=None,
+                 background=False, manifest=None, max_bytes=None):
+        # name -> _Pending, for resources not loaded yet (see __getattr__)
+        self.__pending = {}
+        # With workers or in the background, the scan is lazy and loading starts at the end.
+        # With a memory budget resources load on access, as in lazy mode
+        self.__lazy = lazy or workers is not None or background or max_bytes is not None
+        self.__fallback = fallback
+        # Shared by every manager of the tree in background mode
+        self.__loader = None
+        # Shared by every manager of the tree with a memory budget
+        self.__cache = None
+        if max_bytes is not None:
+            if max_bytes < 1:
+                raise Exception("max_bytes must be at least 1")
+            self.__cache = _ResourceCache(max_bytes)
         if not folder:
             # Blank instance
             return
@@ -50,6 +386,59 @@ class ResourceManager:
         if fallback:
             if isinstance(fallback, str):
                 fallback = loader_func(os.path.join(folder, fallback))
+        self.__fallback = fallback
+
+        cached = _read_manifest(manifest, folder) if manifest else None
+        index = self.__scan(folder, cached)
+        if manifest and index is not cached:
+            _write_manifest(manifest, folder, index)
+        self.__build(folder, index, loader_func)
+
+        if background:
+            loader = _BackgroundLoader(list(self.__pending_loads()), self.__finish)
+            for manager in self.__managers():
+                manager.__loader = loader
+        elif workers is not None and not lazy:
+            self.__preload(workers)
+
+    @classmethod
+    def __scan(cls, folder, cached=None):
+        """
+        Lists the resources of a folder and its subfolders, without loading them
+
+        The result is plain JSON data, so it can be kept in a manifest file.
+        A cached index is reused for every folder whose modification time,
+        and whose sprite .py files' modification times, have not changed
+
+        Args:
+            folder: str
+                The folder to scan
+            cached: dict
+                The index of the same folder from an earlier scan, if any
+        Returns:
+            dict
+                mtime: the folder's modification time in ns
+                folders: subfolder name -> its index
+                resources: (name, kind, data) tuples, see __build
+                modules: sprite .py file name -> its modification time in ns
+        """
+        try:
+            mtime = os.stat(folder).st_mtime_ns
+        except OSError:
+            raise Exception(f"This folder does not exist {folder}")
+
+        if cached is not None and cached["mtime"] == mtime and all(
+            _mtime(os.path.join(folder, name)) == module_mtime
+            for name, module_mtime in cached["modules"].items()
+        ):
+            # The listing is unchanged, but a subfolder's content may not be
+            folders = {
+                name: cls.__scan(os.path.join(folder, name), index)
+                for name, index in cached["folders"].items()
+            }
+            if all(folders[name] is index for name, index in cached["folders"].items()):
+                return cached
+            return {**cached, "folders": folders}
 
         gen = None
         try:
@@ -59,25 +448,26 @@ class ResourceManager:
         folders = gen[1]
         files = gen[2]
 
+        cached_folders = cached["folders"] if cached is not None else {}
+        index = {"mtime": mtime, "folders": {}, "resources": [], "modules": {}}
         for path in folders:
             if path.startswith("__") and path.endswith("__"):
                 continue
-            self.__setattr__(
-                path,
-                ResourceManager(
-                    os.path.join(folder, path), fallback, loader_func=loader_func
-                ),
+            index["folders"][path] = cls.__scan(
+                os.path.join(folder, path), cached_folders.get(path)
             )
 
         file_groups = [
             m
             for name in files
-            if (m := re.match(self.__organization_regex, name))
+            if (m := re.match(cls.__organization_regex, name))
             or logging.warning(f"{folder} -> {name} is invalid. Ignoring...")
         ]
 
+        # groupby only groups neighbours, so files of one name must be together
+        file_groups.sort(key=lambda x: x.group(1))
         for key, group in itertools.groupby(file_groups, lambda x: x.group(1)):
-            if getattr(self, key, None):
+            if key in index["folders"]:
                 raise Exception(
                     f"{folder} -> {key} already exists. perhaps there is already a folder named {key} in this directory"
                 )
@@ -99,7 +489,11 @@ class ResourceManager:
 
                 resource_file = resource_file_list[0]
 
-                datafile = util.load_module(os.path.join(folder, key + ".py"))
+                module_path = os.path.join(folder, key + ".py")
+                index["modules"][key + ".py"] = _mtime(module_path)
+                import util
+
+                datafile = util.load_module(module_path)
 
                 if datafile.TYPE == "SPRITE":
                     # Deal with sprite logic
@@ -118,14 +512,8 @@ class ResourceManager:
                             "{folder} -> {key}.py: A sprite info file must have a class data"
                         )
 
-                    image = loader_func(os.path.join(folder, resource_file))
-
-                    logging.debug(
-                        f"Creating a new {type(self).__name__} for {key} as it was a folder"
-                    )
-                    store = type(self)()
-                    self.__setattr__(key, store)
-
+                    # attr -> the (x, y) of one tile, or a list of them
+                    tiles = {}
                     for attr, value in inspect.getmembers(
                         data, lambda a: not inspect.isroutine(a)
                     ):
@@ -143,43 +531,21 @@ class ResourceManager:
                             )
                         elif len(value) == 2:
                             # tile at location
-                            logging.debug(
-                                f"{type(self).__name__} loaded image {attr} for {key}.{attr}"
-                            )
-                            store.__setattr__(
-                                attr,
-                                util.splice_image(
-                                    image, width, height, value[0], value[1]
-                                ),
-                            )
+                            tiles[attr] = (value[0], value[1])
                         elif len(value) == 4:
                             # tile array
-                            idx = 0
-                            l = [
-                                self.__invalid_index_exception
-                                for i in range(
-                                    (value[2] - value[0]) * (value[3] - value[1])
-                                )
+                            tiles[attr] = [
+                                (x * width, y * height)
+                                for x in range(value[0], value[2])
+                                for y in range(value[1], value[3])
                             ]
-                            for x in range(value[0], value[2]):
-                                for y in range(value[1], value[3]):
-                                    x_loc = x * width
-                                    y_loc = y * height
-                                    l[idx] = util.splice_image(
-                                        image, width, height, x_loc, y_loc
-                                    )
-                                    idx += 1
-                            logging.debug(
-                                f"{type(self).__name__} loaded an array of {len(l)} images for {key}.{attr}"
-                            )
-                            store.__setattr__(
-                                attr,
-                                l,
-                            )
                         else:
                             raise Exception(
                                 f"{attr} must have either 2 (single tile) or 4 (array of elements)"
                             )
+                    index["resources"].append(
+                        (key, "sprite", (resource_file, width, height, tiles))
+                    )
                 else:
                     raise Exception(f"{datafile.TYPE} is not a valid resource type")
                 continue
@@ -188,36 +554,358 @@ class ResourceManager:
             if count == 0:
                 continue
             elif count == 1:
-                match = matches[0]
-                logging.debug(f"{type(self).__name__} loaded resources for {key}")
-                self.__setattr__(key, loader_func(os.path.join(folder, match.group(0))))
+                index["resources"].append((key, "file", matches[0].group(0)))
             else:
-                l = [
-                    self.__invalid_index_exception
-                    for _ in range(
-                        max(int(m.group(2)) for m in matches if m.group(2) is not None)
-                        + 1
-                    )
-                ]
+                length = max(int(m.group(2)) for m in matches if m.group(2) is not None) + 1
+                files = [(int(m.group(2)), m.group(0)) for m in matches]
+                index["resources"].append((key, "list", (length, files)))
+        return index
+
+    def __build(self, folder, index, loader_func):
+        """
+        Creates the attributes of a folder from its index, loading the
+        resources unless the manager is lazy
+        """
+        for path, folder_index in index["folders"].items():
+            manager = ResourceManager(None, self.__fallback, lazy=self.__lazy)
+            manager.__cache = self.__cache
+            manager.__build(os.path.join(folder, path), folder_index, loader_func)
+            self.__setattr__(path, manager)
+
+        for key, kind, data in index["resources"]:
+            if kind == "file":
+                logging.debug(f"{type(self).__name__} loaded resources for {key}")
+                self.__store(
+                    key,
+                    self.__resource(
+                        functools.partial(loader_func, os.path.join(folder, data))
+                    ),
+                )
+            elif kind == "list":
+                length, files = data
+                l = [self.__invalid_index_exception for _ in range(length)]
                 logging.debug(
                     f"{type(self).__name__} loaded an array of {len(l)} resources for {key}"
                 )
-                self.__setattr__(key, l)
-                for match in matches:
-                    l[int(match.group(2))] = loader_func(
-                        os.path.join(folder, match.group(0))
+                for i, name in files:
+                    l[i] = self.__resource(
+                        functools.partial(loader_func, os.path.join(folder, name))
                     )
+                self.__store(key, l)
+            else:
+                resource_file, width, height, tiles = data
+                # Loaded by the first tile read, then shared by all of them
+                load_image = functools.partial(loader_func, os.path.join(folder, resource_file))
+                if self.__cache is None:
+                    image = _once(load_image)
+                else:
+                    # Counted against the budget like the tiles, so it can be unloaded too
+                    image = functools.partial(self.__cached, _Pending(load_image))
+
+                logging.debug(
+                    f"Creating a new {type(self).__name__} for {key} as it was a folder"
+                )
+                store = ResourceManager(None, self.__fallback, lazy=self.__lazy)
+                store.__cache = self.__cache
+                self.__setattr__(key, store)
+
+                for attr, tile in tiles.items():
+                    # One tile is an (x, y) pair, an array is a list of them
+                    # (both are lists once read back from a manifest)
+                    if tile and not isinstance(tile[0], (list, tuple)):
+                        logging.debug(
+                            f"{type(self).__name__} loaded image {attr} for {key}.{attr}"
+                        )
+                        store.__store(
+                            attr,
+                            self.__resource(functools.partial(_tile, image, width, height, *tile)),
+                        )
+                    else:
+                        l = [
+                            self.__resource(functools.partial(_tile, image, width, height, x, y))
+                            for x, y in tile
+                        ]
+                        logging.debug(
+                            f"{type(self).__name__} loaded an array of {len(l)} images for {key}.{attr}"
+                        )
+                        store.__store(attr, l)
+
+    def __managers(self):
+        yield self
+        for value in list(self.__dict__.values()):
+            if isinstance(value, ResourceManager):
+                yield from value.__managers()
+
+    def __resources(self):
+        # Yields (pending, assign) for every resource still pending, here and in subfolders.
+        # With a memory budget that is every resource, loaded or not
+        for key, pending in list(self.__pending.items()):
+            yield pending, functools.partial(self.__loaded, key)
+        for value in list(self.__dict__.values()):
+            if isinstance(value, ResourceManager):
+                yield from value.__resources()
+            elif isinstance(value, LazyList):
+                yield from _list_resources(value)
+
+    def __pending_loads(self):
+        return [(pending, assign) for pending, assign in self.__resources() if not pending.done]
+
+    def __preload(self, workers):
+        loads = list(self.__pending_loads())
+        if not loads:
+            return 0
+        with ThreadPoolExecutor(workers) as executor:
+            futures = {executor.submit(pending.load): assign for pending, assign in loads}
+            done, not_done = wait(futures, return_when=FIRST_EXCEPTION)
+            for future in not_done:
+                future.cancel()
+            for future in done:
+                # Raises the first error, after the rest were cancelled
+                future.result()
+        for (pending, assign), future in zip(loads, futures):
+            self.__finish(pending, assign, future.result(), prefetch=True)
+        return len(loads)
+
+    def __wait_loaded(self):
+        if self.__loader is not None:
+            self.__loader.join()
+
+    def __stop_loading(self):
+        loader = self.__loader
+        if loader is None:
+            return
+        loader.stop()
+        for manager in self.__managers():
+            manager.__loader = None
+
+    def __loading_errors(self):
+        return list(self.__loader.errors) if self.__loader is not None else []
+
+    def __pin(self, name):
+        if self.__cache is None:
+            return
+        for pending, assign in self.__resources_of(name):
+            self.__cache.pin(pending, 1)
+            if not pending.done:
+                self.__finish(pending, assign, pending.load())
+
+    def __unpin(self, name):
+        if self.__cache is None:
+            return
+        for pending, _ in self.__resources_of(name):
+            self.__cache.pin(pending, -1)
+        self.__cache.evict()
+
+    def __cache_stats(self):
+        cache = self.__cache
+        if cache is None:
+            return None
+        return {
+            "bytes": cache.bytes,
+            "max_bytes": cache.max_bytes,
+            "entries": len(cache),
+            "evictions": cache.evictions,
+        }
+
+    def __resources_of(self, name):
+        # (pending, assign) of every resource under an attribute
+        if name in self.__pending:
+            return [(self.__pending[name], functools.partial(self.__loaded, name))]
+        value = self.__dict__.get(name)
+        if isinstance(value, ResourceManager):
+            return list(value.__resources())
+        if isinstance(value, LazyList):
+            return _list_resources(value)
+        raise AttributeError(f"{type(self).__name__} object has no resource {name!r}")
+
+    def __finish(self, pending, assign, value, prefetch=False):
+        # Stores a loaded value: in the cache with a budget, in its attribute or list slot otherwise.
+        # Returns whether it was kept, see _ResourceCache.add
+        if self.__cache is not None:
+            return self.__cache.add(pending, value, prefetch)
+        if not pending.done:
+            # Loaded by the background thread and on access at once, keep the first
+            pending.done = True
+            assign(value)
+        return True
+
+    def __cached(self, pending):
+        found, value = self.__cache.get(pending)
+        if not found:
+            value = pending.load()
+            # A sprite sheet is only a step towards its tiles, never worth unloading them
+            self.__cache.add(pending, value, prefetch=True)
+        return value
+
+    def __loaded(self, key, value):
+        # Set before removing it from pending, so a concurrent read always finds one
+        self.__setattr__(key, value)
+        self.__pending.pop(key, None)
+
+    def __resolve(self, pending, assign):
+        # The value to return for a resource read before it is loaded
+        # (or ever, with a budget, as it is never stored in place)
+        if self.__cache is not None:
+            found, value = self.__cache.get(pending)
+            if found:
+                return value
+        loader = self.__loader
+        if loader is None or self.__fallback is None:
+            # Nothing to show meanwhile, so load it now rather than return None
+            value = pending.load()
+            self.__finish(pending, assign, value)
+            return value
+        loader.request(pending, assign)
+        return self.__fallback
+
+    def __resource(self, load):
+        # Loads a resource now, or marks it to be loaded on first access when lazy
+        if self.__lazy:
+            return _Pending(load)
+        return load()
+
+    def __store(self, key, value):
+        if isinstance(value, _Pending):
+            self.__pending[key] = value
+        elif isinstance(value, list) and self.__lazy:
+            self.__setattr__(key, LazyList(value, self.__resolve))
+        else:
+            self.__setattr__(key, value)
+
+    def __getattr__(self, name):
+        # Only called when normal lookup fails, so loaded resources cost nothing extra
+        pending = self.__dict__.get("_ResourceManager__pending")
+        item = pending.get(name) if pending else None
+        if item is None:
+            if name in self.__dict__:
+                # Loaded by the background thread since normal lookup failed
+                return self.__dict__[name]
+            raise AttributeError(
+                f"{type(self).__name__} object has no attribute {name!r}"
+            )
+        return self.__resolve(item, functools.partial(self.__loaded, name))
+
+    def __dir__(self):
+        return [*super().__dir__(), *self.__dict__.get("_ResourceManager__pending", ())]
+
+
+def _list_resources(value):
+    return [
+        (item, functools.partial(list.__setitem__, value, i))
+        for i in range(len(value))
+        if isinstance(item := list.__getitem__(value, i), _Pending)
+    ]
+
+
+# The management functions are kept off ResourceManager, whose attributes
+# are the resources, so no file name is reserved
+
+
+def preload(manager, workers=None):
+    """
+    Loads every resource not loaded yet, here and in subfolders, on a thread pool
+
+    Decoders such as pygame.image.load release the GIL while they work,
+    so this scales with the number of cores. The results are stored in
+    this thread as they arrive. With a memory budget, only the results
+    that fit without unloading anything are kept
+
+    Args:
+        manager: ResourceManager
+            The manager, or one of its subfolders
+        workers: int
+            The number of threads, ThreadPoolExecutor's default if None
+    Returns:
+        int
+            The number of resources loaded
+    """
+    return manager._ResourceManager__preload(workers)
+
+
+def wait_loaded(manager):
+    """
+    Blocks until the background thread has loaded every resource
+
+    Does nothing if the manager was not created with background=True
+    """
+    manager._ResourceManager__wait_loaded()
+
+
+def stop_loading(manager):
+    """
+    Stops the background thread, leaving what is not loaded yet to load
+    on access as in lazy mode
+    """
+    manager._ResourceManager__stop_loading()
+
+
+def loading_errors(manager):
+    """
+    Returns the errors raised by the background thread, whose resources
+    stay as the fallback
+    """
+    return manager._ResourceManager__loading_errors()
+
+
+def pin(manager, name):
+    """
+    Keeps a resource loaded until unpin is called as many times
+
+    Does nothing without a memory budget, where nothing is ever unloaded
+
+    Args:
+        manager: ResourceManager
+            The manager holding the resource
+        name: str
+            The attribute of the resource. For a list, a sprite or a
+            subfolder, every resource in it is pinned
+    Raises:
+        AttributeError: If there is no such attribute
+    """
+    manager._ResourceManager__pin(name)
+
+
+def unpin(manager, name):
+    """
+    Lets a pinned resource be unloaded again once the budget is exceeded
+    """
+    manager._ResourceManager__unpin(name)
+
+
+def cache_stats(manager):
+    """
+    Returns the memory used by loaded resources, or None without a budget
+
+    Returns:
+        dict
+            bytes, max_bytes, entries and evictions
+    """
+    return manager._ResourceManager__cache_stats()
 
 
 class ImageManager(ResourceManager):
-    def __init__(self, folder, fallback=None):
+    def __init__(self, folder, fallback=None, lazy=False, workers=None, background=False,
+                 manifest=None, max_bytes=None):
+        import pygame
+
+        import util
+
         super().__init__(
-            folder, fallback, loader_func=util.debug_arguments(pygame.image.load)
+            folder, fallback, loader_func=util.debug_arguments(pygame.image.load),
+            lazy=lazy, workers=workers, background=background, manifest=manifest,
+            max_bytes=max_bytes
         )
 
 
 class PygameSoundManager(ResourceManager):
-    def __init__(self, folder, fallback=None):
+    def __init__(self, folder, fallback=None, lazy=False, workers=None, background=False,
+                 manifest=None, max_bytes=None):
+        import pygame
+
+        import util
+
         super().__init__(
-            folder, fallback, loader_func=util.debug_arguments(pygame.mixer.Sound)
+            folder, fallback, loader_func=util.debug_arguments(pygame.mixer.Sound),
+            lazy=lazy, workers=workers, background=background, manifest=manifest,
+            max_bytes=max_bytes
         )
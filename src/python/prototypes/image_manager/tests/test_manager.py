@@ -0,0 +1,247 @@
+"""
+Tests for ResourceManager, with a stub loader_func instead of pygame
+"""
+
+import json
+import os
+import threading
+
+import pytest
+
+from ..manager import (
+    ResourceManager,
+    cache_stats,
+    loading_errors,
+    pin,
+    preload,
+    stop_loading,
+    unpin,
+    wait_loaded,
+)
+
+FILES = ("a.png", "b.png", "part_0.png", "part_1.png", "part_2.png", "sub/c.png")
+
+class _Image:
+    """
+    Stands in for a Surface, so _estimate_size counts size bytes
+    """
+    def __init__(self, path: str, size: int=100) -> None:
+        self.path = path
+        self.size = size
+
+    def get_size(self) -> tuple[int, int]:
+        return self.size, 1
+
+    def get_bytesize(self) -> int:
+        return 1
+
+class _Loader:
+    """
+    A loader_func recording what it loaded, from which threads
+    """
+    def __init__(self, fail: str=None, gate: threading.Event=None, gated: tuple=None) -> None:
+        self.loaded = []
+        self.threads = set()
+        self.fail = fail
+        # Loads of the gated files, or of every file if None, wait for the gate
+        self.gate = gate
+        self.gated = gated
+        self.lock = threading.Lock()
+
+    def __call__(self, path: str) -> _Image:
+        name = os.path.basename(path)
+        if self.gate is not None and (self.gated is None or name in self.gated):
+            self.gate.wait()
+        with self.lock:
+            self.loaded.append(name)
+            self.threads.add(threading.get_ident())
+        if name == self.fail:
+            raise OSError(f"cannot read {name}")
+        return _Image(name)
+
+@pytest.fixture
+def folder(tmp_path) -> str:
+    for name in FILES:
+        path = tmp_path / "images" / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b"")
+    return str(tmp_path / "images")
+
+def test_eager_loads_everything(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader)
+    assert sorted(loader.loaded) == sorted(os.path.basename(name) for name in FILES)
+    assert manager.a.path == "a.png"
+    assert [image.path for image in manager.part] == ["part_0.png", "part_1.png", "part_2.png"]
+    assert manager.sub.c.path == "c.png"
+
+def test_lazy_loads_on_first_access(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader, lazy=True)
+    assert loader.loaded == []
+    assert manager.a is manager.a
+    assert manager.part[1].path == "part_1.png"
+    assert manager.sub.c.path == "c.png"
+    assert loader.loaded == ["a.png", "part_1.png", "c.png"]
+    assert [image.path for image in manager.part] == ["part_0.png", "part_1.png", "part_2.png"]
+    assert len(loader.loaded) == 5
+    with pytest.raises(AttributeError):
+        manager.missing
+
+def test_workers_load_on_a_thread_pool(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader, workers=4)
+    assert len(loader.loaded) == len(FILES)
+    assert threading.get_ident() not in loader.threads
+    assert manager.b.path == "b.png"
+    assert manager.part[2].path == "part_2.png"
+    assert len(loader.loaded) == len(FILES)
+
+def test_workers_raise_the_first_error(folder: str) -> None:
+    with pytest.raises(OSError):
+        ResourceManager(folder, loader_func=_Loader(fail="b.png"), workers=2)
+
+def test_background_returns_fallback_until_loaded(folder: str) -> None:
+    gate = threading.Event()
+    loader = _Loader(gate=gate)
+    fallback = _Image("fallback")
+    manager = ResourceManager(folder, fallback, loader_func=loader, background=True)
+    try:
+        assert manager.part[2] is fallback
+        assert manager.sub.c is fallback
+        gate.set()
+        wait_loaded(manager)
+        assert manager.part[2].path == "part_2.png"
+        assert manager.sub.c.path == "c.png"
+        # Requested resources jump the queue, behind at most the one already started
+        assert {"part_2.png", "c.png"} <= set(loader.loaded[:3])
+        assert len(loader.loaded) == len(FILES)
+        assert loading_errors(manager) == []
+    finally:
+        stop_loading(manager)
+
+def test_background_keeps_fallback_on_error(folder: str) -> None:
+    fallback = _Image("fallback")
+    manager = ResourceManager(folder, fallback, loader_func=_Loader(fail="a.png"), background=True)
+    wait_loaded(manager)
+    assert manager.a is fallback
+    assert [str(e) for e in loading_errors(manager)] == ["cannot read a.png"]
+    stop_loading(manager)
+    assert manager.b.path == "b.png"
+
+def test_background_without_fallback_loads_on_access(folder: str) -> None:
+    gate = threading.Event()
+    loader = _Loader(gate=gate, gated=("a.png", "b.png", "part_0.png", "part_1.png", "c.png"))
+    manager = ResourceManager(folder, loader_func=loader, background=True)
+    try:
+        # The thread is held up, so these are loaded in this thread
+        assert manager.part[2].path == "part_2.png"
+        assert manager.part[2] is manager.part[2]
+        gate.set()
+        wait_loaded(manager)
+        assert manager.a.path == "a.png"
+        assert loader.loaded.count("part_2.png") == 1
+    finally:
+        stop_loading(manager)
+
+def test_manifest_is_reused_until_a_folder_changes(folder: str, tmp_path, monkeypatch) -> None:
+    manifest = str(tmp_path / "cache" / "images.manifest")
+    ResourceManager(folder, loader_func=_Loader(), lazy=True, manifest=manifest)
+    assert os.path.exists(manifest)
+
+    # An unchanged tree is not listed again
+    walk = os.walk
+    monkeypatch.setattr(os, "walk", None)
+    manager = ResourceManager(folder, loader_func=_Loader(), lazy=True, manifest=manifest)
+    assert manager.sub.c.path == "c.png"
+
+    # A new file changes its folder's modification time, so that folder is rescanned
+    monkeypatch.setattr(os, "walk", walk)
+    (tmp_path / "images" / "sub" / "d.png").write_bytes(b"")
+    stamp = os.stat(os.path.join(folder, "sub")).st_mtime_ns + 10 ** 9
+    os.utime(os.path.join(folder, "sub"), ns=(stamp, stamp))
+    manager = ResourceManager(folder, loader_func=_Loader(), lazy=True, manifest=manifest)
+    assert manager.sub.d.path == "d.png"
+
+@pytest.mark.parametrize("content", [b"", b'{"version": 2, "folder"', b"\x80\x04\x95", b"[]"])
+def test_unreadable_manifest_is_a_miss(folder: str, tmp_path, content: bytes) -> None:
+    manifest = tmp_path / "images.manifest"
+    manifest.write_bytes(content)
+    manager = ResourceManager(folder, loader_func=_Loader(), lazy=True, manifest=str(manifest))
+    assert manager.sub.c.path == "c.png"
+    # and is replaced by a good one
+    assert json.loads(manifest.read_bytes())["folder"] == os.path.abspath(folder)
+
+def test_budget_unloads_least_recently_used(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader, max_bytes=250)
+    assert loader.loaded == []
+    manager.a, manager.b, manager.a
+    manager.part[0]
+    # b was used least recently
+    assert cache_stats(manager) == {"bytes": 200, "max_bytes": 250, "entries": 2, "evictions": 1}
+    manager.a
+    assert loader.loaded == ["a.png", "b.png", "part_0.png"]
+    manager.b
+    assert loader.loaded[-1] == "b.png"
+
+def test_pinned_resources_stay_loaded(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader, max_bytes=250)
+    pin(manager, "part")
+    assert sorted(loader.loaded) == ["part_0.png", "part_1.png", "part_2.png"]
+    assert cache_stats(manager)["bytes"] == 300
+    manager.a, manager.b
+    # Over budget, but only the unpinned resources go
+    assert cache_stats(manager)["entries"] == 4
+    count = len(loader.loaded)
+    assert [image.path for image in manager.part] == ["part_0.png", "part_1.png", "part_2.png"]
+    assert len(loader.loaded) == count
+    unpin(manager, "part")
+    assert cache_stats(manager)["bytes"] <= 250
+    with pytest.raises(AttributeError):
+        pin(manager, "missing")
+
+def test_resources_may_use_any_name(tmp_path) -> None:
+    names = ("pin", "preload", "wait_loaded", "loading_errors", "cache_stats")
+    for name in names:
+        (tmp_path / f"{name}.png").write_bytes(b"")
+    (tmp_path / "unpin").mkdir()
+    (tmp_path / "unpin" / "stop_loading.png").write_bytes(b"")
+    for options in ({}, {"lazy": True}, {"max_bytes": 1000}):
+        manager = ResourceManager(str(tmp_path), loader_func=_Loader(), **options)
+        assert [getattr(manager, name).path for name in names] == [f"{name}.png" for name in names]
+        assert manager.unpin.stop_loading.path == "stop_loading.png"
+    pin(manager, "preload")
+    assert cache_stats(manager)["entries"] == len(names) + 1
+
+def test_background_keeps_requested_resources_within_budget(folder: str) -> None:
+    gate = threading.Event()
+    fallback = _Image("fallback")
+    loader = _Loader(gate=gate)
+    manager = ResourceManager(folder, fallback, loader_func=loader, background=True, max_bytes=250)
+    try:
+        assert manager.a is fallback
+        assert manager.part[0] is fallback
+        gate.set()
+        wait_loaded(manager)
+        # Loading ahead stopped at the budget instead of unloading what was used
+        assert manager.a.path == "a.png"
+        assert manager.part[0].path == "part_0.png"
+        assert cache_stats(manager)["evictions"] == 0
+        assert cache_stats(manager)["bytes"] <= 250
+    finally:
+        stop_loading(manager)
+
+def test_preloaded_resources_are_unloaded_first(folder: str) -> None:
+    loader = _Loader()
+    manager = ResourceManager(folder, loader_func=loader, max_bytes=300)
+    manager.a
+    assert preload(manager) == len(FILES) - 1
+    # Only what fit was kept
+    assert cache_stats(manager) == {"bytes": 300, "max_bytes": 300, "entries": 3, "evictions": 0}
+    manager.sub.c
+    manager.part[2]
+    assert loader.loaded.count("a.png") == 1
+    manager.a
+    assert loader.loaded.count("a.png") == 1
@@ -5,7 +5,8 @@ do not fit in any other module.
 """
 
 import os
-import json
+
+from dialogue.dialogue_builder.serializer import get_serializer
 
 __location__ = os.path.realpath(
     os.path.join(os.getcwd(), os.path.dirname(__file__))
@@ -21,8 +22,7 @@ def read_npc_data() -> dict:
         The dict of NPC data
     """
     path = os.path.join(__location__, "data", "npc_data.json")
-    with open(path, "r", encoding="UTF-8") as data:
-        return json.load(data)
+    return get_serializer().load(path)
 
 def write_npc_data(npc_data: dict, new_npc: dict) -> None:
     """
@@ -41,8 +41,7 @@ def write_npc_data(npc_data: dict, new_npc: dict) -> None:
 
     # Write to file
     path = os.path.join(__location__, "data", "npc_data.json")
-    with open(path, "w", encoding="UTF-8") as data:
-        json.dump(npc_data, data, indent=4)
+    get_serializer().dump(npc_data, path)
 
 def find_next_id(data: dict) -> str:
     """